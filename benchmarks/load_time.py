@@ -0,0 +1,103 @@
+"""Times how long MovieRepo takes to load synthetic movie catalogues of increasing size.
+
+Run from the repository root:
+
+    python -m benchmarks.load_time 1000 2000 4000
+
+Each size is loaded twice: once with the current MovieRepo and once with ListScanMovieRepo, which puts back the
+list scans that add_genre/add_actor/add_director and the add_movie_to_*_dict methods used for de-duplication.
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+
+from movie_web_app.adapters.Movie_repo import MovieRepo, new_load_movie_actor_and_genre
+
+HEADER = ['Rank', 'Title', 'Genre', 'Description', 'Director', 'Actors', 'Year', 'Runtime (Minutes)', 'Rating',
+          'Votes', 'Revenue (Millions)', 'Metascore']
+GENRES = ['Action', 'Adventure', 'Animation', 'Biography', 'Comedy', 'Crime', 'Drama', 'Family', 'Fantasy',
+          'History', 'Horror', 'Music', 'Musical', 'Mystery', 'Romance', 'Sci-Fi', 'Sport', 'Thriller', 'War',
+          'Western']
+
+
+class ListScanMovieRepo(MovieRepo):
+    """ MovieRepo with the linear membership checks it used before it kept hash sets. """
+
+    def add_genre(self, new_g):
+        if new_g not in self._genres:
+            super().add_genre(new_g)
+
+    def add_actor(self, new_a):
+        if new_a not in self._actors:
+            super().add_actor(new_a)
+
+    def add_director(self, new_d):
+        if new_d not in self._director:
+            super().add_director(new_d)
+
+    def add_movie_to_year_dict(self, new_movie, new_year):
+        if new_movie not in self._year_dict.get(new_year, []):
+            super().add_movie_to_year_dict(new_movie, new_year)
+
+    def add_movie_to_genre_dict(self, movie, new_g):
+        if movie not in self._genre_dict.get(new_g, []):
+            super().add_movie_to_genre_dict(movie, new_g)
+
+    def add_movie_to_actor_dict(self, movie, new_a):
+        if movie not in self._actor_dict.get(new_a, []):
+            super().add_movie_to_actor_dict(movie, new_a)
+
+    def add_movie_to_director_dict(self, movie, new_d):
+        if movie not in self._director_dict.get(new_d, []):
+            super().add_movie_to_director_dict(movie, new_d)
+
+
+def write_catalogue(directory, size, seed=235):
+    # Roughly the proportions of Data1000Movies.csv: two actors per movie in the pool, one director per two movies.
+    generator = random.Random(seed)
+    with open(os.path.join(directory, 'Data1000Movies.csv'), 'w', newline='', encoding='utf-8') as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(HEADER)
+        for rank in range(1, size + 1):
+            writer.writerow([
+                rank,
+                f'Movie {rank}',
+                ','.join(generator.sample(GENRES, generator.randint(1, 3))),
+                f'Description of movie {rank}.',
+                f'Director {generator.randrange(size // 2 + 1)}',
+                ', '.join(f'Actor {generator.randrange(size * 2)}' for _ in range(4)),
+                generator.randint(2006, 2016),
+                generator.randint(66, 191),
+                f'{generator.uniform(1, 9):.1f}',
+                generator.randint(100, 1000000),
+                '',
+                ''
+            ])
+
+
+def time_load(repo_class, directory):
+    repo = repo_class()
+    start = time.perf_counter()
+    new_load_movie_actor_and_genre(directory, repo)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sizes', nargs='*', type=int, default=[1000, 2000, 4000])
+    args = parser.parse_args()
+
+    print(f'{"movies":>8} {"list scan (s)":>14} {"hash set (s)":>13} {"speedup":>8}')
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            write_catalogue(directory, size)
+            before = time_load(ListScanMovieRepo, directory)
+            after = time_load(MovieRepo, directory)
+        print(f'{size:>8} {before:>14.3f} {after:>13.3f} {before / after:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Reports the memory each movie costs with the regular and the slotted (compact) domain model classes.
+
+Run from the repository root:
+
+    python -m benchmarks.memory_per_movie 100000
+
+Movies are built the way new_load_movie_actor_and_genre builds them: interned actors, genres and directors, plus a
+description, rating and vote count. tracemalloc measures everything allocated while the catalogue is built.
+"""
+import argparse
+import gc
+import random
+import tracemalloc
+
+from movie_web_app.domainmodel import compact, model
+
+GENRES = ['Action', 'Adventure', 'Comedy', 'Drama', 'Horror', 'Romance', 'Sci-Fi', 'Thriller']
+
+
+def build_catalogue(domain, size, seed=235):
+    generator = random.Random(seed)
+    registry = domain.EntityRegistry()
+    movies = []
+    for rank in range(1, size + 1):
+        movie = domain.Movie(f'Movie {rank}', generator.randint(2006, 2016), new_id=rank)
+        movie.description = f'Description of movie {rank}.'
+        movie.actors = [registry.actor(f'Actor {generator.randrange(size * 2)}') for _ in range(4)]
+        movie.genres = [registry.genre(name) for name in generator.sample(GENRES, 2)]
+        movie.director = registry.director(f'Director {generator.randrange(size // 2 + 1)}')
+        movie.runtime_minutes = generator.randint(66, 191)
+        movie.rating = round(generator.uniform(1, 9), 1)
+        movie.votes = generator.randint(100, 1000000)
+        movies.append(movie)
+    return movies, registry
+
+
+def measure(domain, size):
+    gc.collect()
+    tracemalloc.start()
+    catalogue = build_catalogue(domain, size)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del catalogue
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('size', nargs='?', type=int, default=100000)
+    args = parser.parse_args()
+
+    regular = measure(model, args.size)
+    slotted = measure(compact, args.size)
+    print(f'{"model":>10} {"total (MiB)":>12} {"per movie (bytes)":>18}')
+    for name, used in (('regular', regular), ('slotted', slotted)):
+        print(f'{name:>10} {used / 2 ** 20:>12.1f} {used / args.size:>18.0f}')
+    print(f'slotted classes use {100 * (1 - slotted / regular):.0f}% less memory per movie')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Measures requests per second for /movies_by_genre with the database repository, pooled and unpooled.
+
+Run from the repository root:
+
+    python -m benchmarks.pool_throughput --requests 500 --threads 1 4
+
+The test database CSV files are loaded into a temporary SQLite file once. An app is then created for each
+SQLALCHEMY_POOL mode ('queue' and 'null'), and each thread count sends its share of the requests through Flask's test
+client. Every request runs the before_request/teardown hooks, so it opens and closes a database session the way
+the deployed app does.
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy.orm import clear_mappers
+
+from movie_web_app import create_app
+from movie_web_app.adapters.engine import POOL_MODES
+
+DATA_PATH = os.path.join('test', 'data', 'database')
+GENRES = ['Action', 'Drama', 'Comedy', 'Sci-Fi']
+
+
+def build_app(database_path, pool, populate):
+    # create_app maps the model once per call, so the previous app's mappings are dropped first.
+    clear_mappers()
+    return create_app({
+        'TESTING': 'True' if populate else False,
+        'TEST_DATA_PATH': DATA_PATH,
+        'REPOSITORY': 'database',
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database_path}',
+        'SQLALCHEMY_ECHO': False,
+        'SQLALCHEMY_POOL': pool,
+    })
+
+
+def requests_per_second(app, requests, threads):
+    def worker(count, offset):
+        client = app.test_client()
+        for request_number in range(count):
+            genre = GENRES[(offset + request_number) % len(GENRES)]
+            response = client.get(f'/movies_by_genre?genre={genre}')
+            assert response.status_code == 200
+
+    workers = [threading.Thread(target=worker, args=(requests // threads, offset)) for offset in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return (requests // threads) * threads / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--threads', nargs='*', type=int, default=[1, 4])
+    args = parser.parse_args()
+
+    print(f'{"pool":>6} {"threads":>8} {"requests/s":>11}')
+    with tempfile.TemporaryDirectory() as directory:
+        database_path = os.path.join(directory, 'benchmark.db')
+        results = []
+        # The app and repository print debugging output on every request; keep it out of the table.
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_app(database_path, 'null', populate=True)
+            for pool in POOL_MODES:
+                app = build_app(database_path, pool, populate=False)
+                # One untimed round opens the pooled connections and warms the repository's caches.
+                requests_per_second(app, len(GENRES), 1)
+                for threads in args.threads:
+                    results.append((pool, threads, requests_per_second(app, args.requests, threads)))
+        clear_mappers()
+
+    for pool, threads, rate in results:
+        print(f'{pool:>6} {threads:>8} {rate:>11.1f}')
+
+
+if __name__ == '__main__':
+    main()
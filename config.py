@@ -20,4 +20,19 @@ class Config:
     SQLALCHEMY_ECHO = True
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
-    REPOSITORY = environ.get('REPOSITORY')
\ No newline at end of file
+    # Connection pooling: 'queue' keeps connections open between requests, 'null' opens a new one for every request.
+    SQLALCHEMY_POOL = environ.get('SQLALCHEMY_POOL') or 'queue'
+    SQLALCHEMY_POOL_SIZE = int(environ.get('SQLALCHEMY_POOL_SIZE') or 5)
+    SQLALCHEMY_MAX_OVERFLOW = int(environ.get('SQLALCHEMY_MAX_OVERFLOW') or 10)
+    SQLALCHEMY_POOL_RECYCLE = int(environ.get('SQLALCHEMY_POOL_RECYCLE') or -1)
+    SQLALCHEMY_POOL_PRE_PING = environ.get('SQLALCHEMY_POOL_PRE_PING') == 'True'
+
+    # PRAGMAs for each SQLite connection: 'performance' (WAL, mmap, larger cache) or 'default' (SQLite's own).
+    SQLITE_PROFILE = environ.get('SQLITE_PROFILE') or 'performance'
+    # True for query-only workers: connections refuse writes and the database is never repopulated.
+    SQLALCHEMY_READ_ONLY = environ.get('SQLALCHEMY_READ_ONLY') == 'True'
+
+    REPOSITORY = environ.get('REPOSITORY')
+
+    # Optional file the memory repository is cached in between starts; unset to always populate from the CSV files.
+    REPOSITORY_SNAPSHOT = environ.get('REPOSITORY_SNAPSHOT')
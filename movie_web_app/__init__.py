@@ -1,9 +1,8 @@
 from flask import Flask
-from sqlalchemy import create_engine
 from sqlalchemy.orm import clear_mappers, sessionmaker
-from sqlalchemy.pool import NullPool
 
-from movie_web_app.adapters import Movie_repo, database_repository
+from movie_web_app.adapters import Movie_repo, database_repository, snapshot
+from movie_web_app.adapters.engine import create_database_engine
 # from movie_web_app.adapters.Movie_repo import MovieRepo, populate
 from movie_web_app.adapters.orm import metadata, map_model_to_tables
 # from movie_web_app.datafilereaders.movie_file_csv_reader import MovieFileCSVReader
@@ -25,8 +24,13 @@ def create_app(test_config=None):
 
     if app.config['REPOSITORY'] == 'memory':
         # Create the MemoryRepository instance for a memory-based repository.
-        repo.repo_instance = Movie_repo.MovieRepo()
-        Movie_repo.populate(data_path, repo.repo_instance)
+        snapshot_path = app.config.get('REPOSITORY_SNAPSHOT')
+        if snapshot_path:
+            # Reuse the repository populated by an earlier start, unless the CSV files have changed since.
+            repo.repo_instance = snapshot.load_or_populate(data_path, snapshot_path)
+        else:
+            repo.repo_instance = Movie_repo.MovieRepo()
+            Movie_repo.populate(data_path, repo.repo_instance)
 
     elif app.config['REPOSITORY'] == 'database':
         # Configure database.
@@ -36,11 +40,20 @@ def create_app(test_config=None):
         # For example the file database could be located locally and relative to the application in covid-19.db,
         # leading to a URI of "sqlite:///covid-19.db".
         # Note that create_engine does not establish any actual DB connection directly!
+        # Pooled connections outlive the per-request sessions that reset_session/close_session open and close.
         database_echo = app.config['SQLALCHEMY_ECHO']
-        database_engine = create_engine(database_uri, connect_args={"check_same_thread": False}, poolclass=NullPool,
-                                        echo=database_echo)
-
-        if app.config['TESTING'] == 'True' or len(database_engine.table_names()) == 0:
+        database_engine = create_database_engine(database_uri, echo=database_echo,
+                                                 pool=app.config['SQLALCHEMY_POOL'],
+                                                 pool_size=app.config['SQLALCHEMY_POOL_SIZE'],
+                                                 max_overflow=app.config['SQLALCHEMY_MAX_OVERFLOW'],
+                                                 pool_recycle=app.config['SQLALCHEMY_POOL_RECYCLE'],
+                                                 pool_pre_ping=app.config['SQLALCHEMY_POOL_PRE_PING'],
+                                                 sqlite_profile=app.config['SQLITE_PROFILE'],
+                                                 read_only=app.config['SQLALCHEMY_READ_ONLY'])
+        # A read-only worker serves a database that a writable instance has populated.
+        read_only = app.config['SQLALCHEMY_READ_ONLY']
+
+        if not read_only and (app.config['TESTING'] == 'True' or len(database_engine.table_names()) == 0):
             print("REPOPULATING DATABASE")
             # For testing, or first-time use of the web application, reinitialise the database.
             clear_mappers()
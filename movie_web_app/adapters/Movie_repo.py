@@ -1,133 +1,279 @@
 import abc
 import csv
 import os
-from bisect import insort_left, bisect_left
+from bisect import insort_left, bisect_left, bisect_right
 from datetime import datetime
+from operator import itemgetter
 from typing import List
 
+import numpy as np
 from werkzeug.security import generate_password_hash
 
 from movie_web_app.datafilereaders.movie_file_csv_reader import MovieFileCSVReader
-from movie_web_app.adapters.repository import AbstractRepository
+from movie_web_app.adapters.autocomplete import Autocomplete
+from movie_web_app.adapters.collaboration import CollaborationGraph
+from movie_web_app.adapters.locking import ReadWriteLock, read_locked, write_locked
+from movie_web_app.adapters.movie_columns import MovieColumns
+from movie_web_app.adapters.repository import AbstractRepository, RepositoryException, MOVIE_ORDER_KEYS, TOP_K_KEYS, \
+    title_words
+from movie_web_app.adapters.similarity import SimilarityIndex, movie_features
+from movie_web_app.adapters.text_index import BM25Index
+from movie_web_app.domainmodel import compact
 from movie_web_app.domainmodel.model import Movie, Actor, Director, User, Review, Genre, make_review
 
 
 class MovieRepo(AbstractRepository):
+    """ The memory repository. It is safe to share between threads.
+
+    Public methods run under a ReadWriteLock: reads proceed in parallel and writes run alone. Methods never hand out
+    the lists and dicts the repository keeps, only copies of them, so callers cannot change them outside the lock.
+    """
 
     def __init__(self):
+        self._lock = ReadWriteLock()
+        # Loaded entities are the slotted compact variants; see domainmodel/compact.py.
+        self._registry = compact.EntityRegistry()
         self._movies_index = {}
+        self._columns = MovieColumns()
         self._movies: List[Movie] = []
         self._actors = []
         self._genres = []
         self._reviews = []
         self._director = []
         self._users = []
+        self._users_index = {}
         self._genre_dict = {}
         self._actor_dict = {}
         self._director_dict = {}
         self._year_dict = {}
         self._watch_list = []
+        # Hash-based membership for the lists and bucket dicts above; the lists keep insertion order.
+        self._actor_set = set()
+        self._genre_set = set()
+        self._director_set = set()
+        self._year_pairs = set()
+        self._genre_pairs = set()
+        self._actor_pairs = set()
+        self._director_pairs = set()
+        # Lower-cased name -> entity, so searches are hash lookups rather than scans.
+        self._actor_names = {}
+        self._genre_names = {}
+        self._director_names = {}
+        # Lower-cased title -> movies, and title word -> movies, both kept in self._movies order.
+        self._title_index = {}
+        self._title_words = {}
+        # Relevance-ranked search over titles and descriptions, keyed by movie id.
+        self._text_index = BM25Index()
+        # Prefix completion of titles, actors, directors and genres, scored by votes as movies are filed.
+        self._autocomplete = Autocomplete()
+        # Movies sharing actors, directors and genres, with each movie's nearest neighbours cached.
+        self._similarity = SimilarityIndex()
+        # Actors linked to everyone they appeared in a movie with.
+        self._collaborations = CollaborationGraph()
+        # Genre name / year -> ids of its movies by descending rating, maintained as movies are added.
+        self._genre_rankings = {}
+        self._year_rankings = {}
+        # Distinct years of self._year_dict in ascending order.
+        self._years = []
+        # order_by -> (sort keys, movies) in that order, built when iter_movies or page_movies first needs it;
+        # add_movie drops them.
+        self._orderings = {}
+
+    def __getstate__(self):
+        # Locks cannot be pickled (see snapshot.py); a restored repository gets a fresh one.
+        state = dict(self.__dict__)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = ReadWriteLock()
 
     @property
+    def registry(self):
+        return self._registry
+
+    def batch(self):
+        """ Returns a context manager holding the write lock, so a run of updates takes it once rather than per call. """
+        return self._lock.writing()
+
+    @property
+    @read_locked
     def movies_list(self):
-        return self._movies
+        return list(self._movies)
 
     @property
+    @read_locked
     def actors(self):
-        return self._actors
+        return list(self._actors)
 
     @property
+    @read_locked
     def year_dict(self):
-        return self._year_dict
+        return {year: list(movies) for year, movies in self._year_dict.items()}
 
     @year_dict.setter
+    @write_locked
     def year_dict(self, new_dict):
         self._year_dict = new_dict
 
     @property
+    @read_locked
     def directors(self):
-        return self._director
+        return list(self._director)
 
     @property
+    @read_locked
     def users(self):
-        return self._users
+        return list(self._users)
 
     @property
+    @read_locked
     def genre_list(self):
-        return self._genres
+        return list(self._genres)
 
     @property
     def genre_dict(self):
         return self.genre_dict
 
+    @write_locked
     def remove_from_watch_list(self, user: User, movie: Movie):
         user.watch_list.remove_movie(movie)
 
+    @read_locked
     def get_movie_index(self, new_id):
         return self._movies_index[new_id]
 
+    @write_locked
     def add_movie_to_year_dict(self, new_movie: Movie, new_year):
+        if (new_year, new_movie) in self._year_pairs:
+            return
+        self._year_pairs.add((new_year, new_movie))
         if new_year in self._year_dict:
-            if new_movie not in self._year_dict[new_year]:
-                self._year_dict[new_year] += [new_movie]
+            self._year_dict[new_year] += [new_movie]
         else:
             self._year_dict[new_year] = [new_movie]
+            self._year_rankings[new_year] = RatingRanking(self._columns)
+            insort_left(self._years, new_year)
+        self._year_rankings[new_year].add(self._column_ordinal(new_movie))
 
+    @write_locked
     def add_movie_to_genre_dict(self, movie: Movie, new_g: Genre):
+        if (new_g, movie) in self._genre_pairs:
+            return
+        self._genre_pairs.add((new_g, movie))
         if new_g in self._genre_dict:
-            if movie not in self._genre_dict[new_g]:
-                self._genre_dict[new_g] += [movie]
+            self._genre_dict[new_g] += [movie]
         else:
             self._genre_dict[new_g] = [movie]
-
+            self._genre_rankings[new_g.genre_name] = RatingRanking(self._columns)
+        self._genre_rankings[new_g.genre_name].add(self._column_ordinal(movie))
+        self._autocomplete.add_votes('genre', new_g.genre_name, movie.votes)
+        self._similarity.add(movie.id, [('genre', new_g.genre_name)])
+
+    def _column_ordinal(self, movie: Movie):
+        ordinal = self._columns.ordinal(movie.id)
+        if ordinal is None:
+            # Movies are normally added before they are filed into buckets, but a bucket may be filled first.
+            ordinal = self._columns.add(movie)
+        return ordinal
+
+    @write_locked
     def add_movie_to_actor_dict(self, movie: Movie, new_a: Actor):
+        if (new_a, movie) in self._actor_pairs:
+            return
+        self._actor_pairs.add((new_a, movie))
         if new_a in self._actor_dict:
-            if movie not in self._actor_dict[new_a]:
-                self._actor_dict[new_a] += [movie]
+            self._actor_dict[new_a] += [movie]
         else:
             self._actor_dict[new_a] = [movie]
+        self._autocomplete.add_votes('actor', new_a.actor_full_name, movie.votes)
+        self._similarity.add(movie.id, [('actor', new_a.actor_full_name)])
 
+    @write_locked
     def add_movie_to_director_dict(self, movie: Movie, new_d: Director):
+        if (new_d, movie) in self._director_pairs:
+            return
+        self._director_pairs.add((new_d, movie))
         if new_d in self._director_dict:
-            if movie not in self._director_dict[new_d]:
-                self._director_dict[new_d] += [movie]
+            self._director_dict[new_d] += [movie]
         else:
             self._director_dict[new_d] = [movie]
+        self._autocomplete.add_votes('director', new_d.director_full_name, movie.votes)
+        self._similarity.add(movie.id, [('director', new_d.director_full_name)])
 
+    @write_locked
     def add_user(self, user: User):
         self._users.append(user)
+        # Keep the first User registered under a name, as the old linear scan did.
+        self._users_index.setdefault(user.user_name, user)
 
+    @write_locked
+    def add_users(self, users):
+        for user in users:
+            self.add_user(user)
+
+    @read_locked
     def get_user(self, username) -> User:
-        return next((hi for hi in self._users if hi.user_name == username), None)
+        return self._users_index.get(username)
 
+    @write_locked
     def add_movie(self, movie: Movie):
         insort_left(self._movies, movie)
         self._movies_index[movie.id] = movie
-
+        self._columns.add(movie)
+        self._orderings.clear()
+        self._text_index.add(movie.id, movie.title, movie.description)
+        self._autocomplete.add_votes('title', movie.title, movie.votes)
+        self._similarity.add(movie.id, movie_features(movie))
+        # The cast is linked once per movie, here, rather than again for each actor filed by add_movie_to_actor_dict.
+        cast = list(dict.fromkeys(movie.actors))
+        for actor in cast:
+            for colleague in cast:
+                if colleague != actor:
+                    actor.add_actor_colleague(colleague)
+        self._collaborations.add_cast([actor.actor_full_name for actor in cast])
+        if movie.title is not None:
+            insort_left(self._title_index.setdefault(movie.title.lower(), []), movie)
+            for word in set(title_words(movie.title)):
+                insort_left(self._title_words.setdefault(word, []), movie)
+
+    @write_locked
     def add_genre(self, new_g: Genre):
-        if new_g not in self._genres:
+        if new_g not in self._genre_set:
+            self._genre_set.add(new_g)
             self._genres.append(new_g)
+            index_by_name(self._genre_names, new_g.genre_name, new_g)
 
+    @write_locked
     def add_actor(self, new_a: Actor):
-        if new_a not in self._actors:
+        if new_a not in self._actor_set:
+            self._actor_set.add(new_a)
             self._actors.append(new_a)
+            index_by_name(self._actor_names, new_a.actor_full_name, new_a)
 
+    @write_locked
     def add_director(self, new_d: Director):
-        if new_d not in self._director:
+        if new_d not in self._director_set:
+            self._director_set.add(new_d)
             self._director.append(new_d)
+            index_by_name(self._director_names, new_d.director_full_name, new_d)
 
+    @read_locked
     def get_genre_list(self) -> List[Genre]:
-        return self._genres
+        return list(self._genres)
 
+    @read_locked
     def get_year_list(self) -> List[int]:
-        year_list = list(self._year_dict.keys())
-        year_list.sort()
-        return year_list
+        return list(self._years)
 
+    @read_locked
     def get_genre_dict(self):
-        return self._genre_dict
+        return {genre: list(movies) for genre, movies in self._genre_dict.items()}
 
-    def get_movie(self, new_id: int) -> Movie:
+    @read_locked
+    def get_movie(self, new_id: int, load_plan=None) -> Movie:
+        # Every relationship is in memory already, so load plans are ignored here.
         movie = None
 
         try:
@@ -138,60 +284,76 @@ class MovieRepo(AbstractRepository):
 
         return movie
 
+    @write_locked
     def set_actors(self, actor_list):
         self._actors = actor_list
+        self._actor_set = set(actor_list)
+        self._actor_names = {}
+        for actor in actor_list:
+            index_by_name(self._actor_names, actor.actor_full_name, actor)
 
+    @write_locked
     def set_directors(self, new_d_list):
         self._director = new_d_list
+        self._director_set = set(new_d_list)
+        self._director_names = {}
+        for director in new_d_list:
+            index_by_name(self._director_names, director.director_full_name, director)
 
+    @read_locked
     def get_movies_by_year(self, target_year: int) -> List[Movie]:
         matching_movies = list()
         try:
             if target_year in self._year_dict:
-                matching_movies = self._year_dict[target_year]
+                matching_movies = list(self._year_dict[target_year])
         except KeyError:
             # No movies for specified actor. Simply return an empty list.
             pass
 
         return matching_movies
 
+    @read_locked
     def get_movies_by_actor(self, target_actor: Actor) -> List[Movie]:
         matching_movies = list()
         try:
             if target_actor in self._actor_dict:
-                matching_movies = self._actor_dict[target_actor]
+                matching_movies = list(self._actor_dict[target_actor])
         except ValueError:
             # No movies for specified actor. Simply return an empty list.
             pass
 
         return matching_movies
 
+    @read_locked
     def get_movies_by_genre(self, target_genre: Genre) -> List[Movie]:
         matching_movies = list()
         try:
             if target_genre in self._genre_dict:
-                matching_movies = self._genre_dict[target_genre]
+                matching_movies = list(self._genre_dict[target_genre])
         except ValueError:
             # No movies for specified actor. Simply return an empty list.
             pass
 
         return matching_movies
 
+    @read_locked
     def get_movies_by_director(self, target_director: Director) -> List[Movie]:
         matching_movies = list()
 
         try:
             if target_director in self._director_dict:
-                matching_movies = self._director_dict[target_director]
+                matching_movies = list(self._director_dict[target_director])
         except ValueError:
             # No movie for specified director. Simply return an empty list.
             pass
 
         return matching_movies
 
+    @read_locked
     def get_number_of_movies(self):
         return len(self._movies)
 
+    @read_locked
     def get_first_movie(self):
         movie = None
 
@@ -199,6 +361,7 @@ class MovieRepo(AbstractRepository):
             movie = self._movies[0]
         return movie
 
+    @read_locked
     def get_last_movie(self):
         movie = None
 
@@ -206,7 +369,8 @@ class MovieRepo(AbstractRepository):
             movie = self._movies[-1]
         return movie
 
-    def get_movies_by_id(self, id_list):
+    @read_locked
+    def get_movies_by_id(self, id_list, load_plan=None):
         # Strip out any ids in id_list that don't represent Article ids in the repository.
         existing_ids = [new_id for new_id in id_list if new_id in self._movies_index]
 
@@ -214,160 +378,314 @@ class MovieRepo(AbstractRepository):
         movies = [self._movies_index[new_id] for new_id in existing_ids]
         return movies
 
+    @read_locked
     def get_movie_ids_for_genre(self, new_genre: str):
-        # Linear search, to find the first occurrence of a Genre with the name tag_name.
-        genre: Genre = next((genre for genre in self._genre_dict if genre.genre_name == new_genre), None)
-
-        # Retrieve the ids of articles associated with the Tag.
-        if genre is not None:
-            list1 = self._genre_dict[genre]
-            list1.sort(key=lambda movie: movie.rating, reverse=True)
-            movie_ids = [movie.id for movie in list1]
-        else:
-            # No Tag with name tag_name, so return an empty list.
-            movie_ids = list()
-
-        return movie_ids
+        ranking = self._genre_rankings.get(new_genre)
+        if ranking is None:
+            # No Genre with name new_genre, so return an empty list.
+            return ()
+        return ranking.ids
 
+    @read_locked
     def get_movie_ids_for_year(self, new_year):
-        year = next((year for year in self._year_dict if year == new_year), None)
-
-        # Retrieve the ids of articles associated with the Tag.
-        if year is not None:
-            list1 = self._year_dict[year]
-            list1.sort(key=lambda movie: movie.rating, reverse=True)
-            movie_ids = [movie.id for movie in list1]
+        ranking = self._year_rankings.get(new_year)
+        if ranking is None:
+            # No movies released in new_year, so return an empty list.
+            return ()
+        return ranking.ids
+
+    @read_locked
+    def get_movie_ids_by_rating(self, first_year=None, last_year=None, min_votes=None, min_rating=None):
+        ordinals = self._columns.select(first_year, last_year, min_votes, min_rating)
+        return self._columns.ids_by_rating(ordinals).tolist()
+
+    @read_locked
+    def get_movie_ids_for_facets(self, genre_names=(), first_year=None, last_year=None, min_rating=None):
+        bits = self._facet_bits(genre_names, first_year, last_year, min_rating)
+        return self._columns.ids_by_rating(self._columns.from_bits(bits)).tolist()
+
+    @read_locked
+    def top_k(self, movie_filter=None, key='rating', k=10, load_plan=None):
+        if key not in TOP_K_KEYS:
+            raise RepositoryException(f'Unknown top-k key {key}')
+        if movie_filter is None:
+            ordinals = np.arange(len(self._columns))
         else:
-            # No Tag with name tag_name, so return an empty list.
-            movie_ids = list()
-
-        return movie_ids
-
+            ordinals = self._columns.from_bits(self._facet_bits(
+                movie_filter.genre_names, movie_filter.first_year, movie_filter.last_year, movie_filter.min_rating))
+        return [self._movies_index[movie_id] for movie_id in self._columns.top_ids(ordinals, key, k).tolist()]
+
+    def _facet_bits(self, genre_names, first_year, last_year, min_rating):
+        # Each facet is a bitset over column ordinals, so combining them is a bitwise AND of ints.
+        bits = self._columns.all_bits()
+        for genre_name in set(genre_names):
+            ranking = self._genre_rankings.get(genre_name)
+            if ranking is None:
+                return 0
+            bits &= ranking.bits
+
+        if first_year is not None or last_year is not None:
+            start = 0 if first_year is None else bisect_left(self._years, first_year)
+            end = len(self._years) if last_year is None else bisect_right(self._years, last_year)
+            year_bits = 0
+            for year in self._years[start:end]:
+                year_bits |= self._year_rankings[year].bits
+            bits &= year_bits
+
+        if min_rating is not None:
+            bits &= self._columns.rating_bits(min_rating)
+        return bits
+
+    @read_locked
+    def get_average_rating_for_genre(self, genre_name: str):
+        ranking = self._genre_rankings.get(genre_name)
+        if ranking is None:
+            return None
+        return self._columns.mean_rating(ranking.ordinals)
+
+    @read_locked
     def get_year_of_previous_movie(self, movie: Movie):
         previous_year = None
-        year_list = list(self._year_dict.keys())
-        year_list.sort()
-        position = year_list.index(movie.year)
-        try:
-            index = position - 1
-            if index >= 0:
-                previous_year = year_list[index]
-        except ValueError:
-            # No earlier articles, so return None.
-            pass
+        index = bisect_left(self._years, movie.year)
+        if index > 0:
+            previous_year = self._years[index - 1]
 
         return previous_year
 
+    @read_locked
     def get_year_of_next_movie(self, movie: Movie):
         next_year = None
-        year_list = list(self._year_dict.keys())
-        year_list.sort()
-        position = year_list.index(movie.year)
-        try:
-            index = position + 1
-            if index < len(year_list):
-                next_year = year_list[index]
-        except ValueError:
-            # No subsequent articles, so return None.
-            pass
+        index = bisect_right(self._years, movie.year)
+        if index < len(self._years):
+            next_year = self._years[index]
 
         return next_year
 
+    @write_locked
     def add_comment(self, review: Review):
         super().add_comment(review)
         self._reviews.append(review)
 
+    @read_locked
     def get_comments(self):
-        return self._reviews
+        return list(self._reviews)
 
+    @write_locked
     def add_to_watch_list(self, user: User, movie: Movie):
         # super().add_to_watch_list(user, movie)
         user.add_watch_list(movie)
 
+    @read_locked
     def get_watch_list(self):
-        return self._watch_list
-
-    def __iter__(self):
-        self._current = 0
-        return self
-
-    def __next__(self):
-        if self._current >= len(self._movies):
-            raise StopIteration
+        return list(self._watch_list)
+
+    def iter_movies(self, batch_size=100, order_by='id'):
+        if order_by not in MOVIE_ORDER_KEYS:
+            raise RepositoryException(f'Unknown movie order {order_by}')
+        return self._iter_movies(batch_size, order_by)
+
+    def _iter_movies(self, batch_size, order_by):
+        # Only the lookup of each batch holds the read lock, so writers can run while the caller works on a batch.
+        after_key = None
+        while True:
+            keys, movies = self._movie_batch(order_by, after_key, batch_size)
+            if len(movies) == 0:
+                return
+            yield from movies
+            after_key = keys[-1]
+
+    @read_locked
+    def _movie_batch(self, order_by, after_key, batch_size):
+        keys, movies = self._ordering(order_by)
+        start = 0 if after_key is None else bisect_right(keys, after_key)
+        return keys[start:start + batch_size], movies[start:start + batch_size]
+
+    @read_locked
+    def page_movies(self, movie_filter=None, order_by='rating', after_key=None, limit=10, before_key=None,
+                    from_end=False, load_plan=None):
+        if order_by not in MOVIE_ORDER_KEYS:
+            raise RepositoryException(f'Unknown movie order {order_by}')
+        keys, movies = self._ordering(order_by)
+        matches = None
+        if movie_filter is not None:
+            bits = self._facet_bits(movie_filter.genre_names, movie_filter.first_year, movie_filter.last_year,
+                                    movie_filter.min_rating)
+            matches = set(self._columns.ids[self._columns.from_bits(bits)].tolist())
+
+        # Walk the ordering from the key, one way or the other, until the page is full.
+        if before_key is not None or from_end:
+            end = len(keys) if before_key is None else bisect_left(keys, before_key)
+            positions = range(end - 1, -1, -1)
         else:
-            self._current += 1
-            return self._movies[self._current - 1]
+            positions = range(0 if after_key is None else bisect_right(keys, after_key), len(keys))
+        page = []
+        for position in positions:
+            if len(page) >= limit:
+                break
+            if matches is None or movies[position].id in matches:
+                page.append(movies[position])
+        if before_key is not None or from_end:
+            page.reverse()
+        return page
+
+    @read_locked
+    def count_movies(self, movie_filter=None):
+        if movie_filter is None:
+            return len(self._movies_index)
+        # The rankings cache the bitsets the count is taken from.
+        bits = self._facet_bits(movie_filter.genre_names, movie_filter.first_year, movie_filter.last_year,
+                                movie_filter.min_rating)
+        return bin(bits).count('1')
+
+    def _ordering(self, order_by):
+        ordering = self._orderings.get(order_by)
+        if ordering is None:
+            # Readers racing to build the same ordering build equal ones, so either may win.
+            order_key = MOVIE_ORDER_KEYS[order_by]
+            pairs = sorted(((order_key(movie), movie) for movie in self._movies_index.values()), key=itemgetter(0))
+            ordering = ([key for key, movie in pairs], [movie for key, movie in pairs])
+            self._orderings[order_by] = ordering
+        return ordering
 
     # Helper method to return movie index.
+    @read_locked
     def movie_index(self, movie: Movie):
         index = bisect_left(self._movies, movie)
         if index != len(self._movies) and self._movies[index].year == movie.year:
             return index
         raise ValueError
 
+    @read_locked
     def get_movies(self, movie_name):
-        movie_list = []
-        movie_name = movie_name.lower()
-        for movie in self._movies:
-            pattern = movie.title.lower()
-            if movie_name == pattern:
-                movie_list.append(movie)
-        return movie_list
+        return list(self._title_index.get(movie_name.lower(), []))
+
+    @read_locked
+    def get_movies_for_title_words(self, query):
+        postings = [self._title_words.get(word) for word in set(title_words(query))]
+        if len(postings) == 0 or None in postings:
+            return []
+
+        # Walk the shortest posting list and keep the movies that every other word also points at.
+        postings.sort(key=len)
+        others = [set(map(id, posting)) for posting in postings[1:]]
+        return [movie for movie in postings[0] if all(id(movie) in other for other in others)]
+
+    @read_locked
+    def search_movie_ids(self, query, limit=None):
+        return [movie_id for movie_id, score in self._text_index.search(query, limit)]
+
+    @read_locked
+    def get_completions(self, prefix, kinds=None, limit=10):
+        return self._autocomplete.complete(prefix, kinds, limit)
 
+    @read_locked
+    def get_similar_movie_ids(self, movie_id, limit=10):
+        return [similar_id for similar_id, score in self._similarity.similar(movie_id, limit)]
+
+    @read_locked
+    def actors_worked_together(self, first_name, second_name):
+        return self._collaborations.worked_with(first_name, second_name)
+
+    @read_locked
+    def get_actor_path(self, first_name, second_name):
+        return self._collaborations.path(first_name, second_name)
+
+    @read_locked
     def get_movies_for_actor(self, name):
-        name = name.lower()
         match_list = []
-        result = None
-        for actor in self._actors:
-            pattern = actor.actor_full_name.lower()
-            if name == pattern:
-                result = actor
+        result = self._actor_names.get(name.lower())
         if result is not None:
-            match_list = self._actor_dict[result]
+            match_list = list(self._actor_dict[result])
         return match_list
 
+    @read_locked
     def get_movies_for_genre(self, name):
-        name = name.lower()
         match_list = []
-        result = None
-        for genre in self._genres:
-            pattern = genre.genre_name.lower()
-            if name == pattern:
-                result = genre
+        result = self._genre_names.get(name.lower())
         if result is not None:
-            match_list = self._genre_dict[result]
+            match_list = list(self._genre_dict[result])
         return match_list
 
+    @read_locked
     def get_movies_for_director(self, name):
-        name = name.lower()
         match_list = []
-        result = None
-        for director in self._director:
-            pattern = director.director_full_name.lower()
-            if name == pattern:
-                result = director
+        result = self._director_names.get(name.lower())
         if result is not None:
-            match_list = self._director_dict[result]
+            match_list = list(self._director_dict[result])
         return match_list
 
 
+class RatingRanking:
+    """ Movie ids ordered by descending rating, with ties going to the lower id and unrated movies last.
+
+    Adding a movie inserts its id at its rank with a bisect on the (rating key, id) keys, so the order is kept up to
+    date rather than re-sorted. The ids are published as a tuple that callers can slice freely until another movie
+    arrives. The ordinals are also published as a bitset for faceted queries.
+    """
+
+    def __init__(self, columns: MovieColumns):
+        self._columns = columns
+        self._ordinals = []
+        self._keys = []
+        self._ids = []
+        self._published = ()
+        self._bits = None
+
+    def add(self, ordinal: int):
+        self._ordinals.append(ordinal)
+        rating = self._columns.ratings[ordinal]
+        movie_id = int(self._columns.ids[ordinal])
+        key = (np.inf if np.isnan(rating) else -float(rating), movie_id)
+        index = bisect_left(self._keys, key)
+        self._keys.insert(index, key)
+        self._ids.insert(index, movie_id)
+        self._published = None
+        self._bits = None
+
+    @property
+    def ordinals(self):
+        return self._ordinals
+
+    @property
+    def ids(self):
+        if self._published is None:
+            self._published = tuple(self._ids)
+        return self._published
+
+    @property
+    def bits(self) -> int:
+        if self._bits is None:
+            self._bits = self._columns.to_bits(self._ordinals)
+        return self._bits
+
+    def __len__(self):
+        return len(self._ordinals)
+
+
+def index_by_name(name_index, name, entity):
+    # Later entities win on a case-insensitive clash, matching the previous last-match scan.
+    if name is not None:
+        name_index[name.lower()] = entity
+
+
 def new_load_movie_actor_and_genre(data_path, repo: MovieRepo):
     filename = os.path.join(data_path, "Data1000Movies.csv")
+    registry = repo.registry
     with open(filename, mode='r', encoding='utf-8-sig') as csvfile:
         movie_file_reader = csv.DictReader(csvfile)
         for row in movie_file_reader:
             title = row['Title']
             release_year = int(row['Year'])
             run_time = int(row['Runtime (Minutes)'])
-            director = Director(row["Director"])
-            actor_list = row["Actors"].split(',')
+            director = registry.director(row["Director"])
+            actor_list = [registry.actor(name) for name in row["Actors"].split(',')]
             description = row['Description']
-            genre_list = row['Genre'].split(",")
+            genre_list = [registry.genre(name) for name in row['Genre'].split(",")]
             rating = row['Rating']
             votes = row['Votes']
             rank = int(row['Rank'])
 
-            movie = Movie(title, release_year, new_id=rank)
+            movie = compact.Movie(title, release_year, new_id=rank)
             movie.description = description
             movie.actors = actor_list
             movie.genres = genre_list
@@ -377,17 +695,17 @@ def new_load_movie_actor_and_genre(data_path, repo: MovieRepo):
 
             repo.add_movie(movie)
             repo.add_movie_to_year_dict(movie, release_year)
-            for genre in genre_list:
-                new_g = Genre(genre)
-                new_g.add_movie(movie)
+            # Every row is a new movie, so a plain append replaces Genre.add_movie's scan of the shared list.
+            for new_g in dict.fromkeys(genre_list):
+                new_g.movie_list.append(movie)
                 repo.add_genre(new_g)
                 repo.add_movie_to_genre_dict(movie, new_g)
 
-            for actor in actor_list:
-                new_a = Actor(actor)
-                new_a.movies = movie
+            for new_a in dict.fromkeys(actor_list):
+                new_a.add_movies(movie)
                 repo.add_actor(new_a)
                 repo.add_movie_to_actor_dict(movie, new_a)
+            director.add_movies(movie)
             repo.add_movie_to_director_dict(movie, director)
             repo.add_director(director)
 
@@ -410,12 +728,12 @@ def load_users(data_path: str, repo: MovieRepo):
     users = dict()
     filename = os.path.join(data_path, "users.csv")
     for data_row in read_csv_file(filename):
-        user = User(
+        user = compact.User(
             name=data_row[1],
             password=generate_password_hash(data_row[2])
         )
-        repo.add_user(user)
         users[data_row[0]] = user
+    repo.add_users(users.values())
     return users
 
 
@@ -433,15 +751,16 @@ def load_comments(data_path: str, repo: MovieRepo, users):
 
 
 def populate(data_path: str, repo: MovieRepo):
-    # set up all movies repository
-    # load_movies(data_path, repo)
-    new_load_movie_actor_and_genre(data_path, repo)
+    with repo.batch():
+        # set up all movies repository
+        # load_movies(data_path, repo)
+        new_load_movie_actor_and_genre(data_path, repo)
 
-    # set up user information
-    users = load_users(data_path, repo)
+        # set up user information
+        users = load_users(data_path, repo)
 
-    # set up comments info
-    load_comments(data_path, repo, users)
+        # set up comments info
+        load_comments(data_path, repo, users)
 
 
 
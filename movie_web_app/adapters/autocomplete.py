@@ -0,0 +1,108 @@
+import heapq
+import threading
+from bisect import bisect_left, insort_left
+from typing import Dict, List, Tuple
+
+# Kinds of names that can be completed, in the order results list them when votes tie.
+COMPLETION_KINDS = ('title', 'actor', 'director', 'genre')
+
+
+class PrefixIndex:
+    """ Completes prefixes to the best-scored names, using a sorted array of keys as a flattened trie.
+
+    A name is indexed under its lower-cased text and under each later word in it, so 'pratt' completes 'Chris Pratt'.
+    A prefix selects the contiguous run of keys starting with it by bisection, which is then ranked by score. Runs
+    longer than cache_threshold (only very short prefixes have them) are ranked once and cached until the index
+    changes. Keys added before the first completion are sorted once, in bulk.
+    """
+
+    def __init__(self, cache_threshold: int = 256):
+        self._cache_threshold = cache_threshold
+        # Sorted (key, name) pairs, and pairs added since the last completion.
+        self._keys = []
+        self._pending = []
+        self._scores = {}
+        self._cache = {}
+        self._merge_lock = threading.Lock()
+
+    def __getstate__(self):
+        # Locks cannot be pickled (see snapshot.py); a restored index gets a fresh one.
+        state = dict(self.__dict__)
+        del state['_merge_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._merge_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._scores)
+
+    def add_score(self, name: str, score: int):
+        """ Adds score to name's score, indexing name first if it is new. """
+        if name not in self._scores:
+            self._scores[name] = 0
+            self._pending.extend((key, name) for key in index_keys(name))
+        self._scores[name] += score
+        self._cache.clear()
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Tuple[str, int]]:
+        """ Returns up to limit (name, score) pairs for names with a word starting with prefix, best score first. """
+        prefix = ' '.join(prefix.lower().split())
+        if prefix == '' or limit <= 0:
+            return []
+        if len(self._pending) > 0:
+            self._merge_pending()
+
+        keys = self._keys
+        start = bisect_left(keys, (prefix,))
+        end = bisect_left(keys, (prefix + '\U0010ffff',), start)
+        cacheable = end - start > self._cache_threshold
+        if cacheable and (prefix, limit) in self._cache:
+            return self._cache[(prefix, limit)]
+
+        names = {name for key, name in keys[start:end]}
+        ranked = heapq.nsmallest(limit, ((-self._scores[name], name) for name in names))
+        completions = [(name, -score) for score, name in ranked]
+        if cacheable:
+            self._cache[(prefix, limit)] = completions
+        return completions
+
+    def _merge_pending(self):
+        # Completions may run in parallel (e.g. under MovieRepo's read lock), so merging is serialised. Other
+        # completions may be bisecting the current list meanwhile, so the merge builds a new one and publishes it in a
+        # single assignment.
+        with self._merge_lock:
+            pending, self._pending = self._pending, []
+            if len(pending) > len(self._keys) // 8:
+                merged = sorted(self._keys + pending)
+            else:
+                merged = list(self._keys)
+                for pair in pending:
+                    insort_left(merged, pair)
+            self._keys = merged
+
+
+def index_keys(name: str) -> List[str]:
+    # The whole name and every suffix starting at a later word, all lower-cased with single spaces.
+    words = name.lower().split()
+    return [' '.join(words[start:]) for start in range(len(words))]
+
+
+class Autocomplete:
+    """ One PrefixIndex per completion kind, scoring each name by the votes of the movies it belongs to. """
+
+    def __init__(self):
+        self._indexes: Dict[str, PrefixIndex] = {kind: PrefixIndex() for kind in COMPLETION_KINDS}
+
+    def add_votes(self, kind: str, name, votes):
+        if name is not None and name.strip() != '':
+            self._indexes[kind].add_score(name, 0 if votes is None else int(votes))
+
+    def complete(self, prefix: str, kinds=None, limit: int = 10) -> List[Tuple[str, str, int]]:
+        """ Returns up to limit (kind, name, votes) triples across kinds (default: all), most votes first. """
+        kinds = COMPLETION_KINDS if kinds is None else [kind for kind in COMPLETION_KINDS if kind in kinds]
+        candidates = [(-votes, position, name, kind)
+                      for position, kind in enumerate(kinds)
+                      for name, votes in self._indexes[kind].complete(prefix, limit)]
+        return [(kind, name, -votes) for votes, position, name, kind in heapq.nsmallest(limit, candidates)]
@@ -0,0 +1,109 @@
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+
+class CollaborationGraph:
+    """ Actors linked whenever they appear in a movie together.
+
+    Actors are numbered densely as they are first seen. Each actor's collaborators are kept as a set of those
+    numbers, so asking whether two actors worked together is a hash lookup. Path queries run over the same edges laid
+    out as integer adjacency arrays (CSR: indptr and indices), which are rebuilt the first time a path is asked for
+    after the graph changed.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._names = []
+        self._adjacency: List[set] = []
+        self._arrays = None
+
+    def __len__(self):
+        return len(self._names)
+
+    def add_cast(self, names: Iterable[str]):
+        """ Links every pair of the actors called names, adding actors that are new. """
+        ids = [self._id(name) for name in dict.fromkeys(names) if name is not None]
+        for actor in ids:
+            collaborators = self._adjacency[actor]
+            for collaborator in ids:
+                if collaborator != actor and collaborator not in collaborators:
+                    collaborators.add(collaborator)
+                    self._arrays = None
+
+    def worked_with(self, first_name: str, second_name: str) -> bool:
+        first, second = self._ids.get(first_name), self._ids.get(second_name)
+        return first is not None and second is not None and second in self._adjacency[first]
+
+    def path(self, first_name: str, second_name: str) -> Optional[List[str]]:
+        """ Returns the names along a shortest chain of collaborations from first_name to second_name, both included.
+
+        Returns None if either actor is unknown or the two are not connected. The search is a breadth-first search
+        from both ends, each step expanding a whole level of whichever side has fewer edges to follow.
+        """
+        source, target = self._ids.get(first_name), self._ids.get(second_name)
+        if source is None or target is None:
+            return None
+        if source == target:
+            return [first_name]
+
+        indptr, indices = self._adjacency_arrays()
+        # Per side, the parent of each reached actor on the way back to that side's end (-1: not reached yet) and its
+        # distance from that end.
+        parents = [np.full(len(self._names), -1), np.full(len(self._names), -1)]
+        depths = [np.zeros(len(self._names), dtype=np.int64), np.zeros(len(self._names), dtype=np.int64)]
+        parents[0][source], parents[1][target] = source, target
+        frontiers = [np.array([source]), np.array([target])]
+
+        while len(frontiers[0]) > 0 and len(frontiers[1]) > 0:
+            side = 0 if edge_count(indptr, frontiers[0]) <= edge_count(indptr, frontiers[1]) else 1
+            frontier = frontiers[side]
+            degrees = indptr[frontier + 1] - indptr[frontier]
+            # Positions in indices of every edge leaving the frontier, as one array.
+            offsets = np.arange(degrees.sum()) + np.repeat(indptr[frontier] - (np.cumsum(degrees) - degrees), degrees)
+            reached, via = indices[offsets], np.repeat(frontier, degrees)
+            new = parents[side][reached] == -1
+            reached, first = np.unique(reached[new], return_index=True)
+            parents[side][reached] = via[new][first]
+            depths[side][reached] = depths[side][frontier[0]] + 1
+
+            met = reached[parents[1 - side][reached] != -1]
+            if len(met) > 0:
+                # Every actor met is reached at the same depth from this side; the nearest to the other end is on
+                # a shortest path.
+                meeting = met[np.argmin(depths[1 - side][met])]
+                return self._join(parents, meeting)
+            frontiers[side] = reached
+        return None
+
+    def _join(self, parents, meeting):
+        halves = []
+        for side in (0, 1):
+            half = [int(meeting)]
+            while parents[side][half[-1]] != half[-1]:
+                half.append(int(parents[side][half[-1]]))
+            halves.append(half)
+        return [self._names[actor] for actor in halves[0][::-1] + halves[1][1:]]
+
+    def _id(self, name):
+        actor = self._ids.get(name)
+        if actor is None:
+            actor = self._ids[name] = len(self._names)
+            self._names.append(name)
+            self._adjacency.append(set())
+        return actor
+
+    def _adjacency_arrays(self):
+        if self._arrays is None:
+            degrees = np.fromiter((len(collaborators) for collaborators in self._adjacency), dtype=np.int64,
+                                  count=len(self._adjacency))
+            indptr = np.zeros(len(self._adjacency) + 1, dtype=np.int64)
+            np.cumsum(degrees, out=indptr[1:])
+            indices = np.fromiter((collaborator for collaborators in self._adjacency
+                                   for collaborator in sorted(collaborators)), dtype=np.int64, count=int(indptr[-1]))
+            self._arrays = indptr, indices
+        return self._arrays
+
+
+def edge_count(indptr, frontier) -> int:
+    return int((indptr[frontier + 1] - indptr[frontier]).sum())
@@ -1,20 +1,28 @@
 import csv
 import os
+import threading
+from collections import OrderedDict
 
 from datetime import date
 from typing import List
 
-from sqlalchemy import desc, asc
+from sqlalchemy import and_, desc, asc, or_, select
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm.exc import NoResultFound, MultipleResultsFound
 from werkzeug.security import generate_password_hash
 
-from sqlalchemy.orm import scoped_session
+from sqlalchemy.orm import scoped_session, Load
 from flask import _app_ctx_stack
 
 from movie_web_app.datafilereaders.movie_file_csv_reader import MovieFileCSVReader
 from movie_web_app.domainmodel.model import User, Movie, Review, Genre, Director, Actor
-from movie_web_app.adapters.repository import AbstractRepository
+from movie_web_app.adapters import orm
+from movie_web_app.adapters.autocomplete import Autocomplete
+from movie_web_app.adapters.collaboration import CollaborationGraph
+from movie_web_app.adapters.repository import AbstractRepository, MovieFilter, RepositoryException, TOP_K_KEYS, \
+    title_words
+from movie_web_app.adapters.similarity import SimilarityIndex, movie_features
+from movie_web_app.adapters.text_index import BM25Index
 
 genres = None
 
@@ -51,10 +59,25 @@ class SessionContextManager:
             self.__session.close()
 
 
+# How many MovieFilter counts SqlAlchemyRepository keeps.
+COUNT_CACHE_SIZE = 256
+
+
 class SqlAlchemyRepository(AbstractRepository):
 
     def __init__(self, session_factory):
         self._session_cm = SessionContextManager(session_factory)
+        # In-process indexes, each built from the tables when first used, then kept up to date by add_movie.
+        self._text_index = None
+        self._autocomplete = None
+        self._similarity = None
+        self._collaborations = None
+        self._index_lock = threading.Lock()
+        # MovieFilter -> number of matching movies, for page navigation, least recently used first. Filters come from
+        # query parameters, so only the COUNT_CACHE_SIZE most recent are kept; add_movie clears it. Movies that other
+        # processes add are counted once their filters have dropped out.
+        self._counts = OrderedDict()
+        self._counts_lock = threading.Lock()
 
     def close_session(self):
         self._session_cm.close_current_session()
@@ -67,6 +90,11 @@ class SqlAlchemyRepository(AbstractRepository):
             scm.session.add(user)
             scm.commit()
 
+    def add_users(self, users):
+        with self._session_cm as scm:
+            scm.session.add_all(users)
+            scm.commit()
+
     def get_user(self, username) -> User:
         user_name = username.lower()
         user = None
@@ -82,6 +110,23 @@ class SqlAlchemyRepository(AbstractRepository):
         with self._session_cm as scm:
             scm.session.add(movie)
             scm.commit()
+        with self._counts_lock:
+            self._counts.clear()
+        with self._index_lock:
+            if self._text_index is not None:
+                self._text_index.add(movie.id, movie.title, movie.description)
+            if self._autocomplete is not None:
+                self._autocomplete.add_votes('title', movie.title, movie.votes)
+                for actor in movie.actors:
+                    self._autocomplete.add_votes('actor', actor.actor_full_name, movie.votes)
+                for genre in movie.genres:
+                    self._autocomplete.add_votes('genre', genre.genre_name, movie.votes)
+                if movie.director is not None:
+                    self._autocomplete.add_votes('director', movie.director.director_full_name, movie.votes)
+            if self._similarity is not None:
+                self._similarity.add(movie.id, movie_features(movie))
+            if self._collaborations is not None:
+                self._collaborations.add_cast([actor.actor_full_name for actor in movie.actors])
 
     def add_genre(self, genre: Genre):
         with self._session_cm as scm:
@@ -102,10 +147,11 @@ class SqlAlchemyRepository(AbstractRepository):
         genres_list = self._session_cm.session.query(Genre).all()
         return genres_list
 
-    def get_movie(self, id: int) -> Movie:
+    def get_movie(self, id: int, load_plan=None) -> Movie:
         movie = None
         try:
-            movie = self._session_cm.session.query(Movie).filter(Movie._id == id).one()
+            movie = self._session_cm.session.query(Movie).options(*load_options(load_plan)).filter(
+                Movie._id == id).one()
         except NoResultFound:
             # Ignore any exception and return None.
             pass
@@ -133,8 +179,9 @@ class SqlAlchemyRepository(AbstractRepository):
         movie = self._session_cm.session.query(Movie).order_by(desc(Movie._id)).first()
         return movie
 
-    def get_movies_by_id(self, id_list):
-        movies = self._session_cm.session.query(Movie).filter(Movie._id.in_(id_list)).all()
+    def get_movies_by_id(self, id_list, load_plan=None):
+        movies = self._session_cm.session.query(Movie).options(*load_options(load_plan)).filter(
+            Movie._id.in_(id_list)).all()
         return movies
 
     def get_movie_ids_for_genre(self, genre_name: str):
@@ -159,6 +206,70 @@ class SqlAlchemyRepository(AbstractRepository):
 
         return movie_ids
 
+    def get_movie_ids_by_rating(self, first_year=None, last_year=None, min_votes=None, min_rating=None):
+        query = self._session_cm.session.query(Movie._id)
+        if first_year is not None:
+            query = query.filter(Movie._Movie__year >= first_year)
+        if last_year is not None:
+            query = query.filter(Movie._Movie__year <= last_year)
+        if min_votes is not None:
+            query = query.filter(Movie._votes >= min_votes)
+        if min_rating is not None:
+            query = query.filter(Movie._rating >= min_rating)
+        # SQLite sorts NULL first in ascending order, so a descending sort puts unrated movies last.
+        rows = query.order_by(desc(Movie._rating), asc(Movie._id)).all()
+        return [row[0] for row in rows]
+
+    def get_movie_ids_for_facets(self, genre_names=(), first_year=None, last_year=None, min_rating=None):
+        query = self._facet_query(Movie._id, genre_names, first_year, last_year, min_rating)
+        rows = query.order_by(desc(Movie._rating), asc(Movie._id)).all()
+        return [row[0] for row in rows]
+
+    def top_k(self, movie_filter=None, key='rating', k=10, load_plan=None):
+        if key not in TOP_K_KEYS:
+            raise RepositoryException(f'Unknown top-k key {key}')
+        if movie_filter is None:
+            movie_filter = MovieFilter()
+        query = self._facet_query(Movie, movie_filter.genre_names, movie_filter.first_year, movie_filter.last_year,
+                                  movie_filter.min_rating)
+        # ORDER BY ... LIMIT lets SQLite keep only the best k rows rather than sorting every match.
+        # SQLite sorts NULL first in ascending order, so a descending sort puts movies without a value last.
+        column = Movie._rating if key == 'rating' else Movie._votes
+        query = query.options(*load_options(load_plan)).order_by(desc(column), asc(Movie._id))
+        if k is not None:
+            query = query.limit(max(k, 0))
+        return query.all()
+
+    def _facet_query(self, entity, genre_names, first_year, last_year, min_rating):
+        query = self._session_cm.session.query(entity)
+        for genre_name in set(genre_names):
+            # One IN (...) per genre, so a movie has to be tagged with each of them.
+            tagged = select([orm.movie_genres.c.movie_id]).select_from(
+                orm.movie_genres.join(orm.genres, orm.genres.c.id == orm.movie_genres.c.genre_id)
+            ).where(orm.genres.c.name == genre_name)
+            query = query.filter(Movie._id.in_(tagged))
+        if first_year is not None and first_year == last_year:
+            # An equality lets ix_movies_year_rating return a single year's movies already in rating order.
+            query = query.filter(Movie._Movie__year == first_year)
+        else:
+            if first_year is not None:
+                query = query.filter(Movie._Movie__year >= first_year)
+            if last_year is not None:
+                query = query.filter(Movie._Movie__year <= last_year)
+        if min_rating is not None:
+            query = query.filter(Movie._rating >= min_rating)
+        return query
+
+    def get_average_rating_for_genre(self, genre_name: str):
+        row = self._session_cm.session.execute(
+            'SELECT AVG(movies.rating) FROM movies '
+            'JOIN movie_genres ON movie_genres.movie_id = movies.id '
+            'JOIN genres ON genres.id = movie_genres.genre_id '
+            'WHERE genres.name = :genre_name',
+            {'genre_name': genre_name}
+        ).fetchone()
+        return row[0]
+
     def get_year_of_previous_movie(self, movie: Movie):
         result = None
         prev = self._session_cm.session.query(Movie).filter(Movie._Movie__year < movie.year).order_by(
@@ -189,17 +300,144 @@ class SqlAlchemyRepository(AbstractRepository):
             scm.session.add(review)
             scm.commit()
 
-    def __iter__(self):
-        self._current = 0
-        return self
+    def iter_movies(self, batch_size=100, order_by='id'):
+        return self._iter_movies(batch_size, movie_order_columns(order_by))
+
+    def _iter_movies(self, batch_size, order):
+        # Each window is a keyset query that starts after the sort key of the previous window's last movie, rather
+        # than an OFFSET the database would have to skip. The session's identity map only keeps weak references, so
+        # Movies from earlier windows are released once the caller is done with them.
+        after_key = None
+        while True:
+            query = self._session_cm.session.query(Movie, *order)
+            if after_key is not None:
+                query = query.filter(keyset_clause(order, after_key))
+            rows = query.order_by(*order).limit(batch_size).all()
+            if len(rows) == 0:
+                return
+            for row in rows:
+                yield row[0]
+            after_key = tuple(rows[-1][1:])
+
+    def page_movies(self, movie_filter=None, order_by='rating', after_key=None, limit=10, before_key=None,
+                    from_end=False, load_plan=None):
+        order = movie_order_columns(order_by)
+        if movie_filter is None:
+            movie_filter = MovieFilter()
+        query = self._facet_query(Movie, movie_filter.genre_names, movie_filter.first_year, movie_filter.last_year,
+                                  movie_filter.min_rating)
+        if after_key is not None:
+            query = query.filter(keyset_clause(order, after_key))
+        backward = before_key is not None or from_end
+        if before_key is not None:
+            query = query.filter(keyset_clause(order, before_key, before=True))
+        # A page before a key is read backwards along the same index, then turned around.
+        query = query.options(*load_options(load_plan)).order_by(*(desc(column) if backward else column
+                                                                   for column in order))
+        movies = query.limit(max(limit, 0)).all()
+        if backward:
+            movies.reverse()
+        return movies
 
-    def __next__(self):
-        pass
+    def count_movies(self, movie_filter=None):
+        if movie_filter is None:
+            movie_filter = MovieFilter()
+        with self._counts_lock:
+            count = self._counts.get(movie_filter)
+            if count is not None:
+                self._counts.move_to_end(movie_filter)
+                return count
+
+        query = self._facet_query(Movie._id, movie_filter.genre_names, movie_filter.first_year,
+                                  movie_filter.last_year, movie_filter.min_rating)
+        count = query.count()
+        with self._counts_lock:
+            self._counts[movie_filter] = count
+            if len(self._counts) > COUNT_CACHE_SIZE:
+                self._counts.popitem(last=False)
+        return count
 
     def get_movies(self, movie_name):
         movies = self._session_cm.session.query(Movie).filter(Movie._Movie__movie_name == movie_name).all()
         return movies
 
+    def get_movies_for_title_words(self, query):
+        words = set(title_words(query))
+        if len(words) == 0:
+            return []
+
+        # LIKE narrows the candidates to titles containing every word; keeping only the titles that have each one as
+        # a whole word then matches the title index of the memory repository.
+        movies = self._session_cm.session.query(Movie)
+        for word in words:
+            movies = movies.filter(Movie._Movie__movie_name.ilike('%' + escape_like(word) + '%', escape='\\'))
+        return [movie for movie in movies.order_by(Movie._Movie__year).all()
+                if words <= set(title_words(movie.title))]
+
+    def search_movie_ids(self, query, limit=None):
+        with self._index_lock:
+            if self._text_index is None:
+                self._text_index = BM25Index()
+                rows = self._session_cm.session.query(Movie._id, Movie._Movie__movie_name, Movie._description)
+                for movie_id, title, description in rows:
+                    self._text_index.add(movie_id, title, description)
+            ranked = self._text_index.search(query, limit)
+        return [movie_id for movie_id, score in ranked]
+
+    def get_completions(self, prefix, kinds=None, limit=10):
+        with self._index_lock:
+            if self._autocomplete is None:
+                self._autocomplete = Autocomplete()
+                for kind, statement in (
+                        ('title', 'SELECT title, voting FROM movies'),
+                        ('actor', 'SELECT actors.name, movies.voting FROM movie_actors '
+                                  'JOIN actors ON actors.id = movie_actors.actor_id '
+                                  'JOIN movies ON movies.id = movie_actors.movie_id'),
+                        ('director', 'SELECT directors.name, movies.voting FROM movies '
+                                     'JOIN directors ON directors.id = movies.director_id'),
+                        ('genre', 'SELECT genres.name, movies.voting FROM movie_genres '
+                                  'JOIN genres ON genres.id = movie_genres.genre_id '
+                                  'JOIN movies ON movies.id = movie_genres.movie_id')):
+                    for name, votes in self._session_cm.session.execute(statement):
+                        self._autocomplete.add_votes(kind, name, votes)
+            return self._autocomplete.complete(prefix, kinds, limit)
+
+    def get_similar_movie_ids(self, movie_id, limit=10):
+        with self._index_lock:
+            if self._similarity is None:
+                self._similarity = SimilarityIndex()
+                for kind, statement in (
+                        ('actor', 'SELECT movie_actors.movie_id, actors.name FROM movie_actors '
+                                  'JOIN actors ON actors.id = movie_actors.actor_id'),
+                        ('director', 'SELECT movies.id, directors.name FROM movies '
+                                     'JOIN directors ON directors.id = movies.director_id'),
+                        ('genre', 'SELECT movie_genres.movie_id, genres.name FROM movie_genres '
+                                  'JOIN genres ON genres.id = movie_genres.genre_id')):
+                    for similar_id, name in self._session_cm.session.execute(statement):
+                        self._similarity.add(similar_id, [(kind, name)])
+            similar = self._similarity.similar(movie_id, limit)
+        return [similar_id for similar_id, score in similar]
+
+    def actors_worked_together(self, first_name, second_name):
+        with self._index_lock:
+            return self._collaboration_graph().worked_with(first_name, second_name)
+
+    def get_actor_path(self, first_name, second_name):
+        with self._index_lock:
+            return self._collaboration_graph().path(first_name, second_name)
+
+    def _collaboration_graph(self):
+        if self._collaborations is None:
+            self._collaborations = CollaborationGraph()
+            casts = {}
+            rows = self._session_cm.session.execute('SELECT movie_actors.movie_id, actors.name FROM movie_actors '
+                                                    'JOIN actors ON actors.id = movie_actors.actor_id')
+            for movie_id, name in rows:
+                casts.setdefault(movie_id, []).append(name)
+            for names in casts.values():
+                self._collaborations.add_cast(names)
+        return self._collaborations
+
     def get_movies_for_actor(self, name):
         movie_ids = []
 
@@ -215,11 +453,11 @@ class SqlAlchemyRepository(AbstractRepository):
 
             # Retrieve article ids of articles associated with the tag.
             movie_ids = self._session_cm.session.execute(
-                'SELECT movie_id FROM movie_actors WHERE actor_id = :actor_id ORDER BY rating ASC',
+                'SELECT movie_id FROM movie_actors WHERE actor_id = :actor_id ORDER BY movie_id ASC',
                 {'actor_id': actor_id}
             ).fetchall()
             movie_ids = [id[0] for id in movie_ids]
-        return movie_ids
+        return self.get_movies_by_id(movie_ids)
 
     def get_movies_for_genre(self, name):
         pass
@@ -239,11 +477,11 @@ class SqlAlchemyRepository(AbstractRepository):
 
             # Retrieve article ids of articles associated with the tag.
             movie_ids = self._session_cm.session.execute(
-                'SELECT movie_id FROM movies WHERE director_id = :actor_id ORDER BY rating ASC',
+                'SELECT id FROM movies WHERE director_id = :actor_id',
                 {'actor_id': actor_id}
             ).fetchall()
             movie_ids = [id[0] for id in movie_ids]
-        return movie_ids
+        return self.get_movies_by_id(movie_ids)
 
     def add_to_watch_list(self, user: User, movie: Movie):
         pass
@@ -372,6 +610,66 @@ def populate_user(engine: Engine, data_path):
     conn.close()
 
 
+def movie_order_columns(order_by):
+    # Evaluated per call: Movie only has column attributes once map_model_to_tables() has run.
+    if order_by == 'id':
+        return Movie._id,
+    if order_by == 'year':
+        return Movie._Movie__year, Movie._id
+    if order_by == 'title':
+        return Movie._Movie__movie_name, Movie._id
+    if order_by == 'rating':
+        # Missing ratings sort after every rated movie; see orm.RATING_ORDER.
+        return orm.RATING_ORDER, Movie._id
+    raise RepositoryException(f'Unknown movie order {order_by}')
+
+
+def escape_like(word):
+    # Escapes the LIKE wildcards in word, for a pattern compared with escape='\\'.
+    return word.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def keyset_clause(order, key, before=False):
+    # The rows after (or before) key in order. (a, b) > (x, y) is spelled a >= x AND (a > x OR b > y): SQLite can seek
+    # an index on a with the leading bound, even an expression index such as ix_movies_rating_order, whereas a row
+    # value compared against an expression makes it walk the index from the start.
+    column, value = order[0], key[0]
+    if len(order) == 1:
+        return column < value if before else column > value
+    rest = keyset_clause(order[1:], key[1:], before)
+    if before:
+        return and_(column <= value, or_(column < value, rest))
+    return and_(column >= value, or_(column > value, rest))
+
+
+# The mapped relationship each LOAD_PATHS step follows, as (entity, attribute name).
+RELATIONSHIP_ATTRIBUTES = {
+    'reviews': (Movie, '_review'),
+    'user': (Review, '_user'),
+    'genres': (Movie, '_genres'),
+    'movies': (Genre, '_tagged_movies'),
+    'actors': (Movie, '_actors'),
+    'director': (Movie, '_director'),
+}
+
+# The Load method for each LOAD_STRATEGIES entry.
+LOADERS = {'selectin': 'selectinload', 'joined': 'joinedload'}
+
+
+def load_options(load_plan):
+    # One loader option per path in the plan. The steps before the last keep the loaders their own paths set.
+    if load_plan is None:
+        return []
+    options = []
+    for path, strategy in load_plan.strategies.items():
+        steps = [getattr(*RELATIONSHIP_ATTRIBUTES[step]) for step in path.split('.')]
+        option = Load(Movie)
+        for attribute in steps[:-1]:
+            option = option.defaultload(attribute)
+        options.append(getattr(option, LOADERS[strategy])(steps[-1]))
+    return options
+
+
 def populate_data(session_factory, data_path, data_filename):
     global genres
     genres = dict()
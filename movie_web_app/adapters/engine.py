@@ -0,0 +1,71 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import NullPool, QueuePool, StaticPool
+
+# Values of the SQLALCHEMY_POOL setting: 'queue' keeps connections open between requests, 'null' opens one per request.
+POOL_MODES = ('queue', 'null')
+
+# PRAGMAs run on every new SQLite connection, by the SQLITE_PROFILE setting. 'performance' uses write-ahead logging,
+# so readers keep going while a comment is written, syncs less often than every commit, and keeps up to 64 MiB of
+# pages cached, 256 MiB of the file memory-mapped and temporary tables in memory.
+SQLITE_PROFILES = {
+    'default': {},
+    'performance': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -65536,
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+    },
+}
+
+
+def create_database_engine(database_uri: str, echo: bool = False, pool: str = 'queue', pool_size: int = 5,
+                           max_overflow: int = 10, pool_recycle: int = -1, pool_pre_ping: bool = False,
+                           sqlite_profile: str = 'default', read_only: bool = False) -> Engine:
+    """ Returns an engine for database_uri whose connections are pooled as the pool setting asks.
+
+    With pool 'queue', up to pool_size connections stay open between requests, and up to max_overflow more are opened
+    when all of them are busy. Connections older than pool_recycle seconds (-1: never) are replaced, and with
+    pool_pre_ping each one is tested before it is handed out. An in-memory SQLite database only exists inside its
+    connection, so it shares a single one instead. With pool 'null', every checkout opens a new connection.
+
+    For SQLite, every new connection runs the PRAGMAs of sqlite_profile (see SQLITE_PROFILES). With read_only, it is
+    also made query-only, so any write fails; the journal mode is left to the writers, as changing it is a write.
+    """
+    if pool not in POOL_MODES:
+        raise ValueError(f'Unknown connection pool {pool}; expected one of {", ".join(POOL_MODES)}')
+    if sqlite_profile not in SQLITE_PROFILES:
+        raise ValueError(f'Unknown SQLite profile {sqlite_profile}; expected one of {", ".join(SQLITE_PROFILES)}')
+
+    url = make_url(database_uri)
+    options = {'echo': echo}
+    if url.get_backend_name() == 'sqlite':
+        # Pooled connections move between request threads.
+        options['connect_args'] = {'check_same_thread': False}
+
+    if pool == 'null':
+        options['poolclass'] = NullPool
+    elif url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        options['poolclass'] = StaticPool
+    else:
+        options.update(poolclass=QueuePool, pool_size=pool_size, max_overflow=max_overflow,
+                       pool_recycle=pool_recycle, pool_pre_ping=pool_pre_ping)
+    engine = create_engine(database_uri, **options)
+
+    if url.get_backend_name() == 'sqlite':
+        pragmas = dict(SQLITE_PROFILES[sqlite_profile])
+        if read_only:
+            pragmas.pop('journal_mode', None)
+            pragmas['query_only'] = 'ON'
+        if len(pragmas) > 0:
+            event.listen(engine, 'connect', lambda dbapi_connection, record: set_pragmas(dbapi_connection, pragmas))
+    return engine
+
+
+def set_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+    cursor.close()
@@ -0,0 +1,94 @@
+import functools
+import threading
+from contextlib import contextmanager
+
+
+class ReadWriteLock:
+    """ A lock that any number of readers can hold at once, or a single writer.
+
+    Writers are preferred: once a writer is waiting, threads that do not already hold the lock queue behind it, so a
+    steady stream of readers cannot starve it. Both sides are reentrant, and the thread holding the write lock may
+    also read. A thread that only holds the read lock cannot upgrade to writing, as two readers doing so would
+    deadlock; it gets a RuntimeError instead.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._waiting_writers = 0
+        self._writer = None
+        self._local = threading.local()
+
+    @contextmanager
+    def reading(self):
+        if self._writer == threading.get_ident():
+            # Only this thread can have set _writer to its own ident, so this check needs no lock.
+            yield
+            return
+        self._acquire_read()
+        try:
+            yield
+        finally:
+            self._release_read()
+
+    @contextmanager
+    def writing(self):
+        if self._writer == threading.get_ident():
+            yield
+            return
+        if getattr(self._local, 'reads', 0):
+            raise RuntimeError('Cannot take the write lock while holding the read lock')
+        self._acquire_write()
+        try:
+            yield
+        finally:
+            self._release_write()
+
+    def _acquire_read(self):
+        nested = getattr(self._local, 'reads', 0)
+        with self._condition:
+            if nested == 0:
+                while self._writer is not None or self._waiting_writers:
+                    self._condition.wait()
+            self._readers += 1
+        self._local.reads = nested + 1
+
+    def _release_read(self):
+        self._local.reads -= 1
+        with self._condition:
+            self._readers -= 1
+            if self._readers == 0:
+                self._condition.notify_all()
+
+    def _acquire_write(self):
+        with self._condition:
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = threading.get_ident()
+
+    def _release_write(self):
+        with self._condition:
+            self._writer = None
+            self._condition.notify_all()
+
+
+def read_locked(method):
+    """ Runs method while holding the read side of the instance's ReadWriteLock, self._lock. """
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self._lock.reading():
+            return method(self, *args, **kwargs)
+    return locked
+
+
+def write_locked(method):
+    """ Runs method while holding the write side of the instance's ReadWriteLock, self._lock. """
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self._lock.writing():
+            return method(self, *args, **kwargs)
+    return locked
@@ -0,0 +1,149 @@
+import numpy as np
+
+from movie_web_app.domainmodel.model import Movie
+
+
+class MovieColumns:
+    """ Struct-of-arrays copy of the numeric Movie attributes, addressed by a dense movie ordinal.
+
+    Ordinals are handed out in the order movies are added. Unknown ratings are NaN and unknown years, votes and
+    runtimes are 0.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._size = 0
+        self._ordinals = {}
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._ratings = np.full(capacity, np.nan, dtype=np.float64)
+        self._votes = np.zeros(capacity, dtype=np.int64)
+        self._years = np.zeros(capacity, dtype=np.int32)
+        self._runtimes = np.zeros(capacity, dtype=np.int32)
+
+    def __len__(self):
+        return self._size
+
+    def add(self, movie: Movie) -> int:
+        """ Stores movie's numeric attributes and returns its ordinal; a movie id seen before is overwritten. """
+        ordinal = self._ordinals.get(movie.id)
+        if ordinal is None:
+            if self._size == len(self._ids):
+                self._grow()
+            ordinal = self._size
+            self._size += 1
+            self._ordinals[movie.id] = ordinal
+
+        self._ids[ordinal] = -1 if movie.id is None else movie.id
+        self._ratings[ordinal] = np.nan if movie.rating is None else float(movie.rating)
+        self._votes[ordinal] = 0 if movie.votes is None else int(movie.votes)
+        self._years[ordinal] = 0 if movie.year is None else movie.year
+        self._runtimes[ordinal] = 0 if movie.runtime_minutes is None else movie.runtime_minutes
+        return ordinal
+
+    def ordinal(self, movie_id):
+        return self._ordinals.get(movie_id)
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._view(self._ids)
+
+    @property
+    def ratings(self) -> np.ndarray:
+        return self._view(self._ratings)
+
+    @property
+    def votes(self) -> np.ndarray:
+        return self._view(self._votes)
+
+    @property
+    def years(self) -> np.ndarray:
+        return self._view(self._years)
+
+    @property
+    def runtimes(self) -> np.ndarray:
+        return self._view(self._runtimes)
+
+    def select(self, first_year=None, last_year=None, min_votes=None, min_rating=None) -> np.ndarray:
+        """ Returns, in ordinal order, the ordinals of movies matching every given bound (bounds are inclusive). """
+        mask = np.ones(self._size, dtype=bool)
+        if first_year is not None:
+            mask &= self.years >= first_year
+        if last_year is not None:
+            mask &= self.years <= last_year
+        if min_votes is not None:
+            mask &= self.votes >= min_votes
+        if min_rating is not None:
+            mask &= self.ratings >= min_rating
+        return np.flatnonzero(mask)
+
+    def ids_by_rating(self, ordinals=None) -> np.ndarray:
+        """ Returns the ids for ordinals (default: every movie) by descending rating.
+
+        Ties keep the order they have in ordinals, and unrated movies come last.
+        """
+        if ordinals is None:
+            ordinals = np.arange(self._size)
+        else:
+            ordinals = np.asarray(ordinals, dtype=np.int64)
+        order = np.argsort(-self._ratings[ordinals], kind='stable')
+        return self._ids[ordinals[order]]
+
+    def top_ids(self, ordinals, column: str, k: int = None) -> np.ndarray:
+        """ Returns the ids of the k movies among ordinals with the highest 'rating' or 'votes', best first.
+
+        Ties go to the lower id and unrated movies come last; with k None every movie is ranked. np.partition finds
+        the k-th best value in linear time, so only the movies that reach it are sorted, not all of ordinals.
+        """
+        ordinals = np.asarray(ordinals, dtype=np.int64)
+        values = self._ratings if column == 'rating' else self._votes
+        scores = np.nan_to_num(values[ordinals].astype(np.float64), nan=-np.inf)
+        if k is not None and k < len(ordinals):
+            if k <= 0:
+                return self._ids[:0]
+            threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+            reaching = scores >= threshold
+            ordinals, scores = ordinals[reaching], scores[reaching]
+        order = np.lexsort((self._ids[ordinals], -scores))
+        return self._ids[ordinals[order[:k]]]
+
+    def mean_rating(self, ordinals) -> float:
+        """ Returns the mean rating of the rated movies among ordinals, or None if none of them is rated. """
+        ratings = self._ratings[np.asarray(ordinals, dtype=np.int64)]
+        ratings = ratings[~np.isnan(ratings)]
+        if len(ratings) == 0:
+            return None
+        return float(ratings.mean())
+
+    def to_bits(self, ordinals) -> int:
+        """ Returns ordinals as a bitset: an int whose bit i is set when ordinal i is among them. """
+        flags = np.zeros(self._size, dtype=bool)
+        flags[np.asarray(ordinals, dtype=np.int64)] = True
+        return self._pack(flags)
+
+    def all_bits(self) -> int:
+        return (1 << self._size) - 1
+
+    def rating_bits(self, min_rating) -> int:
+        """ Returns the bitset of movies rated min_rating or higher; unrated movies never match. """
+        return self._pack(self.ratings >= min_rating)
+
+    def from_bits(self, bits: int) -> np.ndarray:
+        """ Returns the ordinals whose bits are set, in ascending order. """
+        packed = np.frombuffer(bits.to_bytes((self._size + 7) // 8, 'little'), dtype=np.uint8)
+        return np.flatnonzero(np.unpackbits(packed, bitorder='little'))
+
+    @staticmethod
+    def _pack(flags) -> int:
+        return int.from_bytes(np.packbits(flags, bitorder='little').tobytes(), 'little')
+
+    def _view(self, column):
+        view = column[:self._size]
+        view.flags.writeable = False
+        return view
+
+    def _grow(self):
+        capacity = 2 * len(self._ids)
+        self._ids = np.resize(self._ids, capacity)
+        self._ratings = np.resize(self._ratings, capacity)
+        self._votes = np.resize(self._votes, capacity)
+        self._years = np.resize(self._years, capacity)
+        self._runtimes = np.resize(self._runtimes, capacity)
@@ -1,6 +1,6 @@
 from sqlalchemy import (
     Table, MetaData, Column, Integer, String, DateTime,
-    ForeignKey, Float
+    ForeignKey, Float, Index, func, literal_column
 )
 from sqlalchemy.orm import mapper, relationship
 
@@ -22,7 +22,9 @@ comments = Table(
     Column('user_id', ForeignKey('users.id')),
     Column('movie_id', ForeignKey('movies.id')),
     Column('comment', String(1024), nullable=False),
-    Column('timestamp', DateTime, nullable=False)
+    Column('timestamp', DateTime, nullable=False),
+    Index('ix_comments_movie_id', 'movie_id'),
+    Index('ix_comments_user_id', 'user_id')
 )
 
 movies = Table(
@@ -35,41 +37,62 @@ movies = Table(
     Column('rating', Float),
     Column('voting', Integer),
     Column('director_id', ForeignKey('directors.id')),
-    Column('running_time', Integer)
+    Column('running_time', Integer),
+    Index('ix_movies_title', 'title', 'id'),
+    Index('ix_movies_director_rating', 'director_id', 'rating')
 )
 
 genres = Table(
     'genres', metadata,
     Column('id', Integer, primary_key=True, autoincrement=True),
-    Column('name', String(255), nullable=False)
+    Column('name', String(255), nullable=False),
+    Index('ix_genres_name', 'name')
 )
 
 actors = Table(
     'actors', metadata,
     Column('id', Integer, primary_key=True, autoincrement=True),
-    Column('name', String(255), nullable=False)
+    Column('name', String(255), nullable=False),
+    Index('ix_actors_name', 'name')
 )
 
 directors = Table(
     'directors', metadata,
     Column('id', Integer, primary_key=True, autoincrement=True),
-    Column('name', String(255), nullable=False)
+    Column('name', String(255), nullable=False),
+    Index('ix_directors_name', 'name')
 )
 
 movie_genres = Table(
     'movie_genres', metadata,
     Column('id', Integer, primary_key=True, autoincrement=True),
     Column('movie_id', ForeignKey('movies.id')),
-    Column('genre_id', ForeignKey('genres.id'))
+    Column('genre_id', ForeignKey('genres.id')),
+    # Covering in both directions: a genre's movies, and (for relationship loads) a movie's genres.
+    Index('ix_movie_genres_genre_movie', 'genre_id', 'movie_id'),
+    Index('ix_movie_genres_movie_genre', 'movie_id', 'genre_id')
 )
 
 movie_actors = Table(
     'movie_actors', metadata,
     Column('id', Integer, primary_key=True, autoincrement=True),
     Column('movie_id', ForeignKey('movies.id')),
-    Column('actor_id', ForeignKey('actors.id'))
+    Column('actor_id', ForeignKey('actors.id')),
+    Index('ix_movie_actors_actor_movie', 'actor_id', 'movie_id'),
+    Index('ix_movie_actors_movie_actor', 'movie_id', 'actor_id')
 )
 
+# Ratings are never negative, so coalescing a missing one to -1 and negating sorts the highest first and the missing
+# ones last, without NULLs that would break iter_movies' keyset comparisons. iter_movies orders by exactly this
+# expression, so SQLite can read it off ix_movies_rating_order.
+RATING_ORDER = -func.coalesce(movies.c.rating, literal_column('-1.0'))
+
+Index('ix_movies_year', movies.c.year, movies.c.id)
+Index('ix_movies_year_rating', movies.c.year, movies.c.rating.desc(), movies.c.id)
+Index('ix_movies_rating', movies.c.rating.desc(), movies.c.id)
+Index('ix_movies_votes', movies.c.voting.desc(), movies.c.id)
+Index('ix_movies_rating_order', RATING_ORDER, movies.c.id)
+
 
 def map_model_to_tables():
     mapper(model.User, users, properties={
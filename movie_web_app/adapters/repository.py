@@ -1,10 +1,40 @@
 import abc
-from typing import List
+import re
+from typing import List, Iterable, Iterator, Tuple
 
-from movie_web_app.domainmodel.model import Movie, Actor, Director, User, Review, Genre
+from movie_web_app.domainmodel.model import Movie, Actor, Director, User, Review, Genre, rating_order
 
 repo_instance = None
 
+WORD_PATTERN = re.compile(r"\w+")
+
+
+# Orders iter_movies accepts. Every order ends with the movie id, so it is total; 'rating' is descending with
+# unrated movies last.
+MOVIE_ORDERINGS = ('id', 'year', 'title', 'rating')
+
+# The sort key of a Movie in each of MOVIE_ORDERINGS, as iter_movies and page_movies compare them. Descending rating
+# puts unrated movies last, as SqlAlchemyRepository's orm.RATING_ORDER does.
+MOVIE_ORDER_KEYS = {
+    'id': lambda movie: (movie.id,),
+    'year': lambda movie: (movie.year, movie.id),
+    'title': lambda movie: (movie.title or '', movie.id),
+    'rating': lambda movie: (rating_order(movie), movie.id),
+}
+
+# Keys top_k ranks by, highest first.
+TOP_K_KEYS = ('rating', 'votes')
+
+# Relationships a LoadPlan can load along with the Movies fetched, as paths from Movie, and the ways it can load them:
+# 'selectin' with one more query per relationship for every Movie fetched, 'joined' in the fetching query itself.
+LOAD_PATHS = ('reviews', 'reviews.user', 'genres', 'genres.movies', 'actors', 'director')
+LOAD_STRATEGIES = ('selectin', 'joined')
+
+
+def title_words(title: str) -> List[str]:
+    """ Splits a title or search query into lower-cased words. """
+    return WORD_PATTERN.findall(title.lower())
+
 
 class RepositoryException(Exception):
 
@@ -12,12 +42,59 @@ class RepositoryException(Exception):
         pass
 
 
+class MovieFilter:
+    """ The facets a Movie must match, as get_movie_ids_for_facets takes them. Facets left as None are not applied. """
+
+    def __init__(self, genre_names: Iterable[str] = (), first_year=None, last_year=None, min_rating=None):
+        self.genre_names = tuple(genre_names)
+        self.first_year = first_year
+        self.last_year = last_year
+        self.min_rating = min_rating
+
+    @classmethod
+    def for_year(cls, year):
+        return cls(first_year=year, last_year=year)
+
+    def _key(self):
+        return frozenset(self.genre_names), self.first_year, self.last_year, self.min_rating
+
+    def __eq__(self, other):
+        return isinstance(other, MovieFilter) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+
+class LoadPlan:
+    """ The relationships to load with fetched Movies, as a dict of LOAD_PATHS to LOAD_STRATEGIES.
+
+    A path may only extend a path that is in the plan too, e.g. 'reviews.user' needs 'reviews'. Relationships left out
+    are loaded when first used. Raises RepositoryException for an unknown path or strategy.
+    """
+
+    def __init__(self, strategies: dict = None):
+        self.strategies = dict(strategies or {})
+        for path, strategy in self.strategies.items():
+            if path not in LOAD_PATHS:
+                raise RepositoryException(f'Unknown load path {path}')
+            if strategy not in LOAD_STRATEGIES:
+                raise RepositoryException(f'Unknown load strategy {strategy}')
+            parent = path.rpartition('.')[0]
+            if parent != '' and parent not in self.strategies:
+                raise RepositoryException(f'Load path {path} needs {parent}')
+
+
 class AbstractRepository(abc.ABC):
 
     @abc.abstractmethod
     def add_user(self, new_user: User):
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def add_users(self, new_users: Iterable[User]):
+        """ Adds a batch of Users to the repository. """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def get_movie_index(self, new_id: int):
         raise NotImplementedError
@@ -65,8 +142,8 @@ class AbstractRepository(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def get_movie(self, new_id: int) -> Movie:
-        """ Returns Movie with id from the repository.
+    def get_movie(self, new_id: int, load_plan: LoadPlan = None) -> Movie:
+        """ Returns Movie with id from the repository, with the relationships in load_plan loaded.
 
         If there is no Movie with the given id, this method returns None.
         """
@@ -130,13 +207,51 @@ class AbstractRepository(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def get_movies_by_id(self, id_list):
-        """ Returns a list of Movies, whose ids match those in id_list, from the repository.
+    def get_movies_by_id(self, id_list, load_plan: LoadPlan = None):
+        """ Returns a list of Movies, whose ids match those in id_list, from the repository, with the relationships in
+        load_plan loaded.
 
         If there are no matches, this method returns an empty list.
         """
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def get_movie_ids_by_rating(self, first_year=None, last_year=None, min_votes=None, min_rating=None):
+        """ Returns the ids of Movies by descending rating, keeping only Movies within every given bound.
+
+        The year bounds are inclusive, as are min_votes and min_rating. Unrated Movies come last.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_movie_ids_for_facets(self, genre_names: Iterable[str] = (), first_year=None, last_year=None,
+                                 min_rating=None) -> List[int]:
+        """ Returns the ids of Movies matching every facet, by descending rating.
+
+        A Movie must have all of genre_names, a year within the inclusive year bounds, and a rating of at least
+        min_rating. Facets left as None are not applied. An unknown genre name matches no Movies.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def top_k(self, movie_filter: MovieFilter = None, key: str = 'rating', k: int = 10,
+              load_plan: LoadPlan = None) -> List[Movie]:
+        """ Returns the k Movies matching movie_filter (default: every Movie) with the highest key, best first.
+
+        key is one of TOP_K_KEYS. Ties go to the lower id, and Movies without a value for key come last. With k None,
+        every match is returned. The relationships in load_plan are loaded with the Movies. Raises RepositoryException
+        for an unknown key.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_average_rating_for_genre(self, genre_name: str):
+        """ Returns the mean rating of the rated Movies with the named Genre.
+
+        If there is no such Genre, or none of its Movies is rated, this method returns None.
+        """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def get_year_of_previous_movie(self, movie: Movie):
         """ Returns the date of an Movie that immediately precedes article.
@@ -177,9 +292,60 @@ class AbstractRepository(abc.ABC):
         """ Returns the Comments stored in the repository. """
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def get_movies_for_title_words(self, query):
+        """ Returns the Movies whose titles contain every word in query, ignoring case.
+
+        If query has no words or no title matches, this method returns an empty list.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def search_movie_ids(self, query: str, limit: int = None) -> List[int]:
+        """ Returns the ids of Movies whose title or description contains a word of query, most relevant first.
+
+        Relevance is the BM25 score of the words in query. With a limit, only the best limit ids are returned.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_completions(self, prefix: str, kinds: Iterable[str] = None, limit: int = 10) -> List[Tuple[str, str, int]]:
+        """ Returns up to limit (kind, name, votes) triples completing prefix, most votes first.
+
+        kind is one of COMPLETION_KINDS ('title', 'actor', 'director' or 'genre'); kinds restricts the search to some
+        of them. A name matches if it, or any word in it, starts with prefix. votes totals the votes of the name's
+        Movies.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_similar_movie_ids(self, movie_id: int, limit: int = 10) -> List[int]:
+        """ Returns the ids of up to limit other Movies sharing actors, a director or genres with the Movie, most similar
+        first.
+
+        Rarely shared actors, directors and genres count for more than common ones. An unknown movie_id has no
+        similar Movies.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def actors_worked_together(self, first_name: str, second_name: str) -> bool:
+        """ Returns whether the Actors called first_name and second_name appeared in a Movie together. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_actor_path(self, first_name: str, second_name: str) -> List[str]:
+        """ Returns the names along a shortest chain of Actors from first_name to second_name, both included, where
+        each Actor appeared in a Movie with the next.
+
+        The degrees of separation are one less than the length of the chain. If either Actor is unknown or the two
+        are not connected, this method returns None.
+        """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def get_movies_for_actor(self, name):
-        """ Returns the Comments stored in the repository. """
+        """ Returns the Movies featuring the Actor called name. """
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -217,9 +383,33 @@ class AbstractRepository(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def __iter__(self):
+    def iter_movies(self, batch_size: int = 100, order_by: str = 'id') -> Iterator[Movie]:
+        """ Returns a generator over every Movie in the repository, ordered by one of MOVIE_ORDERINGS.
+
+        Each call returns an independent generator. Movies are fetched batch_size at a time, resuming after the last
+        Movie of the previous batch, so a generator holds one batch at most and Movies added while it runs are seen
+        if they sort after that point. Raises RepositoryException for an unknown order_by.
+        """
         raise NotImplementedError
 
     @abc.abstractmethod
-    def __next__(self) -> Movie:
+    def page_movies(self, movie_filter: MovieFilter = None, order_by: str = 'rating', after_key: tuple = None,
+                    limit: int = 10, before_key: tuple = None, from_end: bool = False,
+                    load_plan: LoadPlan = None) -> List[Movie]:
+        """ Returns a page of up to limit Movies matching movie_filter (default: every Movie), in order_by order.
+
+        Pages are keyset pages: the keys are MOVIE_ORDER_KEYS sort keys, e.g. (rating_order, id) for 'rating'. The page
+        starts just after after_key, or with the first match. With before_key, it instead ends just before before_key,
+        and with from_end it ends with the last match; either way it is still in order_by order. A page starts by
+        seeking to its key rather than stepping over the Movies before it. The relationships in load_plan are loaded
+        with the Movies. Raises RepositoryException for an unknown order_by.
+        """
         raise NotImplementedError
+
+    @abc.abstractmethod
+    def count_movies(self, movie_filter: MovieFilter = None) -> int:
+        """ Returns the number of Movies matching movie_filter (default: every Movie). """
+        raise NotImplementedError
+
+    def __iter__(self) -> Iterator[Movie]:
+        return self.iter_movies()
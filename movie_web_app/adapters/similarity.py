@@ -0,0 +1,105 @@
+import math
+from typing import Hashable, Iterable, List, Tuple
+
+import numpy as np
+
+
+class SimilarityIndex:
+    """ Finds similar movies from the actors, directors and genres they share.
+
+    Movies are the rows of a sparse binary movie x feature matrix, stored as a posting list of rows per feature. A
+    movie's similarity to every other movie is the dot product of its row with theirs, with each feature weighted
+    1 / log2(1 + number of movies with it), so a rare shared actor counts for more than a shared genre. The dot
+    products for one movie are a single np.bincount over the postings of its features.
+
+    The best `cached` neighbours of each movie are kept once computed. A feature's weight only depends on its own
+    postings, so adding a feature to a movie only changes the scores of the movies that have that feature; only
+    their cached neighbours are dropped.
+    """
+
+    def __init__(self, cached: int = 10):
+        self._cached = cached
+        # Key <-> row, feature -> column, row -> its columns, and column -> rows that have it.
+        self._rows = {}
+        self._keys = []
+        self._columns = {}
+        self._row_columns = []
+        self._postings = []
+        # Column -> its postings as an array, built when first needed.
+        self._posting_arrays = {}
+        # Row -> its best (key, score) neighbours.
+        self._neighbours = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key: Hashable, features: Iterable[Hashable]):
+        """ Adds features to the movie called key, adding the movie first if it is new. """
+        row = self._rows.get(key)
+        if row is None:
+            row = self._rows[key] = len(self._keys)
+            self._keys.append(key)
+            self._row_columns.append(set())
+
+        for feature in features:
+            column = self._columns.get(feature)
+            if column is None:
+                column = self._columns[feature] = len(self._postings)
+                self._postings.append([])
+            if column in self._row_columns[row]:
+                continue
+            self._row_columns[row].add(column)
+            self._postings[column].append(row)
+            self._posting_arrays.pop(column, None)
+            if len(self._neighbours) > 0:
+                for affected in self._postings[column]:
+                    self._neighbours.pop(affected, None)
+
+    def similar(self, key: Hashable, limit: int = 10) -> List[Tuple[Hashable, float]]:
+        """ Returns up to limit (key, score) pairs for the movies sharing a feature with key, most similar first.
+
+        Equal scores are ordered by when the movies were added. An unknown key has no neighbours.
+        """
+        row = self._rows.get(key)
+        if row is None or limit <= 0:
+            return []
+        if limit > self._cached:
+            return self._rank(row, limit)
+        neighbours = self._neighbours.get(row)
+        if neighbours is None:
+            # Readers may fill the cache in parallel; they compute the same list, so either assignment is fine.
+            neighbours = self._neighbours[row] = self._rank(row, self._cached)
+        return neighbours[:limit]
+
+    def _rank(self, row, limit):
+        columns = list(self._row_columns[row])
+        if len(columns) == 0:
+            return []
+        postings = [self._posting_array(column) for column in columns]
+        weights = [1 / math.log2(1 + len(posting)) for posting in postings]
+        rows = np.concatenate(postings)
+        scores = np.bincount(rows, weights=np.repeat(weights, [len(posting) for posting in postings]),
+                             minlength=len(self._keys))
+        scores[row] = 0
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > limit:
+            threshold = np.partition(scores[candidates], len(candidates) - limit)[len(candidates) - limit]
+            candidates = candidates[scores[candidates] >= threshold]
+        order = np.lexsort((candidates, -scores[candidates]))[:limit]
+        return [(self._keys[neighbour], float(scores[neighbour])) for neighbour in candidates[order].tolist()]
+
+    def _posting_array(self, column):
+        posting = self._posting_arrays.get(column)
+        if posting is None:
+            posting = self._posting_arrays[column] = np.array(self._postings[column], dtype=np.int64)
+        return posting
+
+
+def movie_features(movie) -> List[Tuple[str, str]]:
+    """ Returns the (kind, name) features of movie's actors, director and genres. """
+    features = [('actor', actor.actor_full_name) for actor in movie.actors]
+    features += [('genre', genre.genre_name) for genre in movie.genres]
+    if movie.director is not None:
+        features.append(('director', movie.director.director_full_name))
+    return features
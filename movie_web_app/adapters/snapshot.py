@@ -0,0 +1,180 @@
+import hashlib
+import io
+import os
+import pickle
+import tempfile
+
+from movie_web_app.adapters.Movie_repo import MovieRepo, populate
+from movie_web_app.domainmodel import compact
+from movie_web_app.domainmodel.model import Movie, Actor, Director, Genre, Review, User, WatchList
+
+# Bump whenever MovieRepo or the domain classes change what they store, so old snapshots are rebuilt.
+SNAPSHOT_VERSION = 10
+
+SOURCE_FILES = ('Data1000Movies.csv', 'users.csv', 'comments.csv')
+
+DOMAIN_CLASSES = (Movie, Actor, Director, Genre, Review, User, WatchList, compact.Movie, compact.Actor,
+                  compact.Director, compact.Genre, compact.Review, compact.User)
+
+
+def source_checksum(data_path: str) -> str:
+    """ Returns a digest of the CSV files that populate() reads from data_path. """
+    digest = hashlib.sha256()
+    for filename in SOURCE_FILES:
+        digest.update(filename.encode('utf-8'))
+        with open(os.path.join(data_path, filename), 'rb') as infile:
+            for chunk in iter(lambda: infile.read(1 << 16), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_or_populate(data_path: str, snapshot_path: str) -> MovieRepo:
+    """ Returns the MovieRepo stored at snapshot_path, or populates one from the CSV files and stores it there.
+
+    The snapshot is only used if it was written by this SNAPSHOT_VERSION from the current CSV files.
+    """
+    checksum = source_checksum(data_path)
+    repo = load_snapshot(snapshot_path, checksum)
+    if repo is None:
+        repo = MovieRepo()
+        populate(data_path, repo)
+        save_snapshot(repo, snapshot_path, checksum)
+    return repo
+
+
+def save_snapshot(repo: MovieRepo, snapshot_path: str, checksum: str):
+    # Domain objects reference each other (movie -> actor -> movies -> ...), which is too deep for pickle to follow
+    # recursively. Instead each one is written once into a flat table and referred to by its position in it.
+    table = ObjectTable()
+    root = io.BytesIO()
+    FlatPickler(root, table).dump(repo)
+
+    states = io.BytesIO()
+    pickler = FlatPickler(states, table)
+    written = 0
+    while written < len(table.objects):
+        # Pickling a batch of states can reference objects that are not in the table yet; they form the next batch.
+        batch = table.objects[written:]
+        pickler.dump([deferred_state(entity) for entity in batch])
+        written += len(batch)
+
+    # Each writer gets its own temporary file, so workers saving at once never publish each other's partial writes.
+    descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(snapshot_path) or '.',
+                                                  prefix=os.path.basename(snapshot_path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as outfile:
+            pickle.dump({'version': SNAPSHOT_VERSION, 'checksum': checksum}, outfile)
+            pickle.dump(([type(entity) for entity in table.objects], states.getvalue(), root.getvalue()), outfile,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, snapshot_path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def load_snapshot(snapshot_path: str, checksum: str):
+    """ Returns the MovieRepo stored at snapshot_path, or None if it is missing, stale or unreadable. """
+    try:
+        with open(snapshot_path, 'rb') as infile:
+            header = pickle.load(infile)
+            if header != {'version': SNAPSHOT_VERSION, 'checksum': checksum}:
+                return None
+            classes, states, root = pickle.load(infile)
+
+        # Restore every domain object before the repository, whose sets and dicts hash them.
+        entities = [cls.__new__(cls) for cls in classes]
+        unpickler = FlatUnpickler(io.BytesIO(states), entities)
+        restored = 0
+        while restored < len(entities):
+            for state in unpickler.load():
+                set_entity_state(entities[restored], state)
+                restored += 1
+        for entity in entities:
+            for name, value in entity_state(entity).items():
+                if isinstance(value, DeferredContainer):
+                    setattr(entity, name, value.rebuild())
+        return FlatUnpickler(io.BytesIO(root), entities).load()
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, IndexError, KeyError, TypeError,
+            ValueError):
+        return None
+
+
+def deferred_state(entity) -> dict:
+    # A set or dict in a state can hash domain objects whose own state has not been restored yet, so it is written
+    # as a DeferredContainer and rebuilt once every state is back.
+    state = entity_state(entity)
+    for name, value in state.items():
+        if type(value) is set:
+            state[name] = DeferredContainer(set, list(value))
+        elif type(value) is dict:
+            state[name] = DeferredContainer(dict, list(value.items()))
+    return state
+
+
+def slot_names(cls) -> tuple:
+    # Every slot that holds an attribute, from cls and its bases.
+    return tuple(name for base in cls.__mro__ for name in vars(base).get('__slots__', ()) if name != '__weakref__')
+
+
+def entity_state(entity) -> dict:
+    # The attributes of an entity, whether it keeps them in slots (the compact classes) or in its __dict__.
+    state = {name: getattr(entity, name) for name in slot_names(type(entity)) if hasattr(entity, name)}
+    state.update(getattr(entity, '__dict__', {}))
+    return state
+
+
+def set_entity_state(entity, state: dict):
+    slots = slot_names(type(entity))
+    for name, value in state.items():
+        if name in slots:
+            setattr(entity, name, value)
+        else:
+            entity.__dict__[name] = value
+
+
+class DeferredContainer:
+
+    def __init__(self, container_type, items):
+        self.container_type = container_type
+        self.items = items
+
+    def rebuild(self):
+        return self.container_type(self.items)
+
+
+class ObjectTable:
+    """ The domain objects met while pickling, in the order they were first referenced. """
+
+    def __init__(self):
+        self.objects = []
+        self._positions = {}
+
+    def position(self, entity) -> int:
+        position = self._positions.get(id(entity))
+        if position is None:
+            position = len(self.objects)
+            self.objects.append(entity)
+            self._positions[id(entity)] = position
+        return position
+
+
+class FlatPickler(pickle.Pickler):
+
+    def __init__(self, file, table: ObjectTable):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._table = table
+
+    def persistent_id(self, obj):
+        if type(obj) in DOMAIN_CLASSES:
+            return self._table.position(obj)
+        return None
+
+
+class FlatUnpickler(pickle.Unpickler):
+
+    def __init__(self, file, entities):
+        super().__init__(file)
+        self._entities = entities
+
+    def persistent_load(self, pid):
+        return self._entities[pid]
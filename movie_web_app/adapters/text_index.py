@@ -0,0 +1,78 @@
+import heapq
+import math
+from collections import Counter
+from typing import List, Tuple
+
+from movie_web_app.adapters.repository import title_words
+
+
+class BM25Index:
+    """ An inverted index over movie titles and descriptions, ranking matches with Okapi BM25.
+
+    Documents are identified by a key (the movie id). Title words count title_weight times, so a word in the title
+    outweighs the same word in the description. Adding a key that is already indexed replaces its document.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, title_weight: int = 2):
+        self._k1 = k1
+        self._b = b
+        self._title_weight = title_weight
+        # Word -> {key: term frequency}.
+        self._postings = {}
+        # Key -> the words indexed for it, with their frequencies, and key -> number of words.
+        self._documents = {}
+        self._lengths = {}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._documents)
+
+    def add(self, key, title, description):
+        if key in self._documents:
+            self.remove(key)
+        frequencies = Counter()
+        for word in title_words(title or ''):
+            frequencies[word] += self._title_weight
+        frequencies.update(title_words(description or ''))
+
+        self._documents[key] = frequencies
+        self._lengths[key] = sum(frequencies.values())
+        self._total_length += self._lengths[key]
+        for word, frequency in frequencies.items():
+            self._postings.setdefault(word, {})[key] = frequency
+
+    def remove(self, key):
+        frequencies = self._documents.pop(key)
+        self._total_length -= self._lengths.pop(key)
+        for word in frequencies:
+            posting = self._postings[word]
+            del posting[key]
+            if len(posting) == 0:
+                del self._postings[word]
+
+    def search(self, query: str, limit: int = None) -> List[Tuple[object, float]]:
+        """ Returns (key, score) pairs for documents containing any word of query, best first.
+
+        Equal scores are ordered by key. With a limit, only the best limit pairs are returned.
+        """
+        scores = {}
+        document_count = len(self._documents)
+        if document_count == 0:
+            return []
+        average_length = self._total_length / document_count
+
+        for word in set(title_words(query)):
+            posting = self._postings.get(word)
+            if posting is None:
+                continue
+            idf = math.log(1 + (document_count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for key, frequency in posting.items():
+                norm = self._k1 * (1 - self._b + self._b * self._lengths[key] / average_length)
+                scores[key] = scores.get(key, 0.0) + idf * frequency * (self._k1 + 1) / (frequency + norm)
+
+        ranked = ((-score, key) for key, score in scores.items())
+        if limit is None:
+            ranked = sorted(ranked)
+        else:
+            ranked = heapq.nsmallest(limit, ranked)
+        return [(key, -score) for score, key in ranked]
@@ -0,0 +1,43 @@
+"""Slotted, __dict__-free variants of the domain model classes, for the memory repository.
+
+model.py's Actor, Director, Movie, Review, Genre and User carry an instance __dict__, which SQLAlchemy's classical
+mappings in adapters/orm.py store their state in. The classes here derive from the same slotted bases (model._Movie,
+...) without adding one, so they share every method and the name-mangled attribute names (_Movie__year, ...), compare
+equal to and hash like their model.py counterparts, and can still be weakly referenced. They must not be mapped.
+
+WatchList and EntityRegistry are never mapped, so model.py's classes are already slotted.
+"""
+from movie_web_app.domainmodel import model
+
+
+class Actor(model._Actor):
+    __slots__ = ()
+
+
+class Director(model._Director):
+    __slots__ = ()
+
+
+class Movie(model._Movie):
+    __slots__ = ()
+
+
+class Review(model._Review):
+    __slots__ = ()
+
+
+class Genre(model._Genre):
+    __slots__ = ()
+
+
+class User(model._User):
+    __slots__ = ()
+
+
+class EntityRegistry(model.EntityRegistry):
+    """ An EntityRegistry interning compact Actors, Directors and Genres. """
+    __slots__ = ()
+
+    actor_class = Actor
+    director_class = Director
+    genre_class = Genre
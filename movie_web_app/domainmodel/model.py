@@ -1,3 +1,4 @@
+from bisect import bisect_left, insort_left
 from datetime import datetime
 from typing import List, Iterable
 
@@ -6,13 +7,19 @@ class ModelException(Exception):
     pass
 
 
-class Actor:
+# Actor, Director, Movie, Review, Genre and User keep their behaviour in a slotted base class (_Actor, ...), whose
+# name-mangled attribute names match the ones adapters/orm.py maps. The public classes add the instance __dict__ that
+# SQLAlchemy stores mapped state in; domainmodel/compact.py derives __dict__-free variants from the same bases.
+class _Actor:
+    __slots__ = ('_Actor__actor_full_name', 'colleague', '_movies', '__weakref__')
+
     def __init__(self, actor_full_name: str):
         if actor_full_name == "" or type(actor_full_name) is not str:
             self.__actor_full_name = None
         else:
             self.__actor_full_name = actor_full_name.strip()
-        self.colleague = []
+        # A set, so check_if_this_actor_worked_with is a hash lookup.
+        self.colleague = set()
         self._movies = []
 
     @property
@@ -41,7 +48,7 @@ class Actor:
         return f"<Actor {self.actor_full_name}>"
 
     def __eq__(self, other):
-        if not (isinstance(other, Actor) or other.actor_full_name is None):
+        if not (isinstance(other, _Actor) or other.actor_full_name is None):
             return False
         else:
             return self.actor_full_name == other.actor_full_name
@@ -53,13 +60,18 @@ class Actor:
         return hash(self.actor_full_name)
 
     def add_actor_colleague(self, colleague: "Actor"):
-        self.colleague.append(colleague)
+        self.colleague.add(colleague)
 
     def check_if_this_actor_worked_with(self, colleague: "Actor"):
         return colleague in self.colleague
 
 
-class Director:
+class Actor(_Actor):
+    """ An Actor with an instance __dict__, which the SQLAlchemy mapping in adapters/orm.py needs. """
+
+
+class _Director:
+    __slots__ = ('_Director__director_full_name', '_movies', '__weakref__')
 
     def __init__(self, director_full_name: str):
         if director_full_name == "" or type(director_full_name) is not str:
@@ -83,7 +95,7 @@ class Director:
         return f"<Director {self.director_full_name}>"
 
     def __eq__(self, other):
-        if not (isinstance(other, Director) or other.director_full_name is None):
+        if not (isinstance(other, _Director) or other.director_full_name is None):
             return False
         else:
             return self.director_full_name == other.director_full_name
@@ -95,7 +107,14 @@ class Director:
         return hash(self.director_full_name)
 
 
-class Movie:
+class Director(_Director):
+    """ A Director with an instance __dict__, which the SQLAlchemy mapping in adapters/orm.py needs. """
+
+
+class _Movie:
+    __slots__ = ('_Movie__movie_name', '_Movie__year', '_description', '_director', '_actors', '_genres',
+                 '_runtime_minutes', '_id', '_review', '_hyperlink', '_rating', '_votes', '_key', '__weakref__')
+
     def __init__(self, movie_name, release_year=None, new_id=None, hyperlink=None):
         if movie_name == "" or type(movie_name) is not str:
             self.__movie_name = None
@@ -173,7 +192,7 @@ class Movie:
 
     @director.setter
     def director(self, new_direct: Director):
-        if isinstance(new_direct, Director):
+        if isinstance(new_direct, _Director):
             self._director = new_direct
 
     @property
@@ -182,9 +201,12 @@ class Movie:
 
     @actors.setter
     def actors(self, new_actor_list):
+        # Accepts names or Actor objects; objects are kept as they are so that shared (interned) Actors stay shared.
         actor_list = []
         for actor in new_actor_list:
-            actor_list += [Actor(actor)]
+            if not isinstance(actor, _Actor):
+                actor = Actor(actor)
+            actor_list += [actor]
         self._actors = actor_list
 
     @property
@@ -195,7 +217,9 @@ class Movie:
     def genres(self, new_genre_list):
         genre_list = []
         for genre in new_genre_list:
-            genre_list += [Genre(genre)]
+            if not isinstance(genre, _Genre):
+                genre = Genre(genre)
+            genre_list += [genre]
         self._genres = genre_list
 
     @property
@@ -217,18 +241,22 @@ class Movie:
             raise ValueError
 
     def concate(self) -> str:
-        return str(self.__movie_name) + str(self.__year)
+        # Title and year never change, so the identity string is built once and reused by __eq__ and __hash__.
+        # It is filled in lazily because SQLAlchemy creates loaded Movies without calling __init__.
+        try:
+            return self._key
+        except AttributeError:
+            self._key = str(self.__movie_name) + str(self.__year)
+            return self._key
 
     def __repr__(self):
         return f"<Movie {self.__movie_name}, {self.__year}, {self.id}>"
 
     def __eq__(self, other: "Movie"):
-        if not isinstance(other, Movie):
+        if not isinstance(other, _Movie):
             return False
         else:
-            string1 = self.concate()
-            string2 = other.concate()
-            return string1 == string2
+            return self is other or self.concate() == other.concate()
 
     def __lt__(self, other):
         return self.year < other.year
@@ -237,35 +265,41 @@ class Movie:
         return f"<Movie {self.__movie_name}, {self.__year}, {self.id}>"
 
     def __hash__(self):
-        string1 = self.concate()
-        return hash(string1)
+        return hash(self.concate())
 
     def add_actor(self, new_actor: Actor):
-        if isinstance(new_actor, Actor):
+        if isinstance(new_actor, _Actor):
             self._actors.append(new_actor)
 
     def remove_actor(self, new_actor: Actor):
-        if isinstance(new_actor, Actor) and new_actor in self._actors and (len(self._actors) > 0):
+        if isinstance(new_actor, _Actor) and new_actor in self._actors and (len(self._actors) > 0):
             self._actors.remove(new_actor)
 
     def add_genre(self, new_genre: 'Genre'):
-        if isinstance(new_genre, Genre):
+        if isinstance(new_genre, _Genre):
             self._genres.append(new_genre)
 
     def add_review(self, review: 'Review'):
         self._review.append(review)
 
     def remove_genre(self, new_genre: 'Genre'):
-        if isinstance(new_genre, Genre) and new_genre in self._genres and (len(self._genres) > 0):
+        if isinstance(new_genre, _Genre) and new_genre in self._genres and (len(self._genres) > 0):
             self._genres.remove(new_genre)
 
     def is_genred_by(self, genre: 'Genre'):
         return genre in self._genres
 
 
-class Review:
+class Movie(_Movie):
+    """ A Movie with an instance __dict__, which the SQLAlchemy mapping in adapters/orm.py needs. """
+
+
+class _Review:
+    __slots__ = ('_Review__movie', '_Review__review_text', '_Review__rating_number', '_Review__timestamp', '_user',
+                 '__weakref__')
+
     def __init__(self, movie1: Movie, text, rating_number, user):
-        if movie1 == "" or type(movie1) is not Movie:
+        if movie1 == "" or not isinstance(movie1, _Movie):
             self.__movie = None
         else:
             self.__movie = movie1
@@ -308,7 +342,7 @@ class Review:
         return f"<Review: {self.__movie} Time: {self.__timestamp}>"
 
     def __eq__(self, other):
-        if not (isinstance(other, Review)):
+        if not (isinstance(other, _Review)):
             return False
         else:
             return (self.__movie == other.__movie and
@@ -317,7 +351,13 @@ class Review:
                     self.__timestamp == other.__timestamp)
 
 
-class Genre:
+class Review(_Review):
+    """ A Review with an instance __dict__, which the SQLAlchemy mapping in adapters/orm.py needs. """
+
+
+class _Genre:
+    __slots__ = ('_Genre__genre_name', '_tagged_movies', '__weakref__')
+
     def __init__(self, genre_name: str):
         if genre_name == "" or type(genre_name) is not str:
             self.__genre_name = None
@@ -356,7 +396,7 @@ class Genre:
         return f"<Genre {self.__genre_name}>"
 
     def __eq__(self, other):
-        if not (isinstance(other, Genre) or other.genre_name is None):
+        if not (isinstance(other, _Genre) or other.genre_name is None):
             return False
         else:
             return self.genre_name == other.genre_name
@@ -371,7 +411,14 @@ class Genre:
         return len(self._tagged_movies)
 
 
-class User:
+class Genre(_Genre):
+    """ A Genre with an instance __dict__, which the SQLAlchemy mapping in adapters/orm.py needs. """
+
+
+class _User:
+    __slots__ = ('_User__user_name', '_User__password', '_watched_movies', '_reviews', '_time_spent', '_watch_list',
+                 '__weakref__')
+
     def __init__(self, name: str, password: str):
         if name == "" or type(name) is not str:
             self.__user_name = None
@@ -425,45 +472,66 @@ class User:
         return f"<User {self.__user_name}>"
 
     def __eq__(self, other):
-        if not isinstance(other, User):
+        if not isinstance(other, _User):
             return False
         else:
             return self.__user_name == other.__user_name
 
     def __lt__(self, other):
-        if isinstance(other, User):
+        if isinstance(other, _User):
             return self.__user_name < other.__user_name
 
     def __hash__(self):
         return hash(self.__user_name)
 
     def watch_movie(self, movie1: Movie):
-        if isinstance(movie1, Movie) and movie1 not in self._watched_movies:
+        if isinstance(movie1, _Movie) and movie1 not in self._watched_movies:
             self._watched_movies.append(movie1)
             if type(movie1.runtime_minutes) is int:
                 self._time_spent += movie1.runtime_minutes
 
     def add_review(self, review1):
-        if isinstance(review1, Review) and review1 not in self._reviews:
+        if isinstance(review1, _Review) and review1 not in self._reviews:
             self._reviews.append(review1)
 
     def add_watch_list(self, new_movie: Movie):
-        if isinstance(new_movie, Movie):
+        if isinstance(new_movie, _Movie):
             self._watch_list.add_movie(new_movie)
 
     def remove_watch_list(self, new_movie: Movie):
-        if isinstance(new_movie, Movie):
+        if isinstance(new_movie, _Movie):
             self._watch_list.remove_movie(new_movie)
 
 
+class User(_User):
+    """ A User with an instance __dict__, which the SQLAlchemy mapping in adapters/orm.py needs. """
+
+
 class WatchList:
+    """ A User's movies to watch, kept in the order they were added and, alongside, by descending rating.
+
+    Movies are held in an insertion-ordered dict used as a set, so membership, adding and removing are hash
+    lookups. The rating view is a sorted list of (rating_order, insertion number) keys updated with bisect; it uses a
+    movie's rating at the time it was added.
+    """
+    __slots__ = ('_WatchList__watchlist', '_WatchList__user', '_WatchList__rating_keys', '_WatchList__by_rating',
+                 '_WatchList__added', '__weakref__')
+
     def __init__(self):
-        self.__watchlist: List[Movie] = []
+        # Movie -> its key in the rating view.
+        self.__watchlist = {}
         self.__user = None
+        self.__rating_keys = []
+        self.__by_rating: List[Movie] = []
+        self.__added = 0
 
     @property
-    def watch_list(self):
-        return self.__watchlist
+    def watch_list(self) -> List[Movie]:
+        return list(self.__watchlist)
+
+    @property
+    def by_rating(self) -> List[Movie]:
+        return list(self.__by_rating)
 
     @property
     def user(self):
@@ -471,25 +539,36 @@ class WatchList:
 
     @watch_list.setter
     def watch_list(self, new_list: list):
-        self.__watchlist = new_list
+        self.__watchlist = {}
+        self.__rating_keys = []
+        self.__by_rating = []
+        for movie in new_list:
+            self.add_movie(movie)
 
     @user.setter
     def user(self, new_user: User):
         self.__user = new_user
 
     def add_movie(self, movie: Movie):
-        if isinstance(movie, Movie):
-            self.__watchlist.append(movie)
+        if isinstance(movie, _Movie) and movie not in self.__watchlist:
+            key = (rating_order(movie), self.__added)
+            self.__added += 1
+            self.__watchlist[movie] = key
+            index = bisect_left(self.__rating_keys, key)
+            self.__rating_keys.insert(index, key)
+            self.__by_rating.insert(index, movie)
 
     def remove_movie(self, movie: Movie):
-        if isinstance(movie, Movie) and movie in self.__watchlist:
-            self.__watchlist.remove(movie)
+        if isinstance(movie, _Movie) and movie in self.__watchlist:
+            index = bisect_left(self.__rating_keys, self.__watchlist.pop(movie))
+            del self.__rating_keys[index]
+            del self.__by_rating[index]
 
     def select_movie_to_watch(self, index):
         if type(index) is not int or index >= len(self.__watchlist):
             return None
         else:
-            return self.__watchlist[index]
+            return list(self.__watchlist)[index]
 
     def size(self):
         return len(self.__watchlist)
@@ -498,22 +577,59 @@ class WatchList:
         if len(self.__watchlist) == 0:
             return None
         else:
-            return self.__watchlist[0]
+            return next(iter(self.__watchlist))
 
     def __repr__(self):
         return ", ".join(str(x) for x in self.__watchlist)
 
+    def __len__(self):
+        return len(self.__watchlist)
+
+    def __contains__(self, movie):
+        return movie in self.__watchlist
+
     def __iter__(self):
-        self.n = 0
-        return self
-
-    def __next__(self):
-        if self.n < len(self.__watchlist):
-            result = self.__watchlist[self.n]
-            self.n += 1
-            return result
-        else:
-            raise StopIteration
+        # Iterate over a copy, so a movie added or removed meanwhile does not break the loop.
+        return iter(list(self.__watchlist))
+
+
+def rating_order(movie: Movie):
+    """ Sort key putting movies in descending order of rating, with unrated movies last. """
+    return 1.0 if movie.rating is None else -float(movie.rating)
+
+
+class EntityRegistry:
+    """ Interns Actors, Directors and Genres so that every movie referring to a name shares one object. """
+    __slots__ = ('_actors', '_directors', '_genres')
+
+    # The classes interned entities are created as.
+    actor_class = Actor
+    director_class = Director
+    genre_class = Genre
+
+    def __init__(self):
+        self._actors = {}
+        self._directors = {}
+        self._genres = {}
+
+    def actor(self, name: str) -> Actor:
+        return self._intern(self._actors, self.actor_class, name)
+
+    def director(self, name: str) -> Director:
+        return self._intern(self._directors, self.director_class, name)
+
+    def genre(self, name: str) -> Genre:
+        return self._intern(self._genres, self.genre_class, name)
+
+    @staticmethod
+    def _intern(entities: dict, entity_class, name):
+        # Key on the stripped name, as that is what the entity constructors store.
+        key = name.strip() if type(name) is str else name
+        entity = entities.get(key)
+        if entity is None:
+            entity = entity_class(name)
+            entities[key] = entity
+        return entity
 
 
 def make_review(comment_text: str, user: User, movie: Movie, timestamp: datetime = datetime.today()):
@@ -1,7 +1,7 @@
 from datetime import date
 
 from flask import Blueprint
-from flask import request, render_template, redirect, url_for, session
+from flask import request, render_template, redirect, url_for, session, jsonify
 
 from better_profanity import profanity
 from flask_wtf import FlaskForm
@@ -20,6 +20,20 @@ from movie_web_app.domainmodel.model import Actor, Director, Genre, Movie
 movies_blueprint = Blueprint(
     'movies_bp', __name__)
 
+# How many movies /top_movies lists unless k is given, and the most it lists.
+TOP_MOVIES = 10
+MAX_TOP_MOVIES = 100
+
+# The movie lists a comment can be started from, by the page query parameter of comment_on_movies, and the query
+# parameters of those lists that the comment round trip passes back to them.
+COMMENT_LIST_VIEWS = {
+    'date': 'movies_bp.movies_by_date',
+    'genre': 'movies_bp.movies_by_genre',
+    'facets': 'movies_bp.movies_by_facets',
+    'top': 'movies_bp.top_movies',
+}
+COMMENT_LIST_ARGS = ('page', 'year', 'genre', 'min_rating', 'key', 'k', 'after', 'before', 'last')
+
 
 # @movies_blueprint.route('/movies_by_date', methods=['GET'])
 # def movies_by_date():
@@ -117,6 +131,19 @@ movies_blueprint = Blueprint(
 #     return redirect(url_for('home_bp.home'))
 
 
+def page_position():
+    # The page cursor query parameters of a paged movie list, as get_movie_page takes them. url_for leaves out the
+    # ones that are None, so they can be passed on to the URLs that lead back to the same page.
+    position = dict(after=request.args.get('after'), before=request.args.get('before'), last=request.args.get('last'))
+    try:
+        services.parse_page_cursor(position['after'])
+        services.parse_page_cursor(position['before'])
+    except ValueError:
+        # A cursor the list did not hand out, so show its first page.
+        return dict(after=None, before=None, last=None)
+    return position
+
+
 @movies_blueprint.route('/movies_by_date', methods=['GET'])
 def movies_by_date():
     # if 'username' not in session:
@@ -136,7 +163,8 @@ def movies_by_date():
     movies_per_page = 10
 
     target_year = request.args.get('year')
-    cursor = request.args.get('cursor')
+    # The page shown: just after or before a cursor, the last one, or else the first.
+    position = page_position()
     # username = request.args.get('username')
     movies_to_show_comments = request.args.get('view_comments_for')
     # Fetch the first and last movies in the series.
@@ -154,56 +182,44 @@ def movies_by_date():
         # Convert movies_to_show_comments from string to int.
         movies_to_show_comments = int(movies_to_show_comments)
 
-    if cursor is None:
-        # No cursor query parameter, so initialise cursor to start at the beginning.
-        cursor = 0
-    else:
-        # Convert cursor from string to int.
-        cursor = int(cursor)
-
-    # Retrieve movies ids for movies that are classified with genre_name.
-    movie_ids = services.get_movie_ids_for_year(target_year, repo.repo_instance)
-
-    # Retrieve the batch of movies to display on the Web page.
-    movies = services.get_movies_by_id(movie_ids[cursor:cursor + movies_per_page], repo.repo_instance)
+    # Retrieve the page of movies released in target_year to display on the Web page.
+    page = services.get_movie_page(repo.MovieFilter.for_year(target_year), per_page=movies_per_page,
+                                   repo=repo.repo_instance, **position)
+    movies = page['movies']
 
     first_movie_url = None
     last_movie_url = None
     next_movie_url = None
     prev_movie_url = None
 
-    if cursor > 0:
+    if page['previous'] is not None:
         # There are preceding movies, so generate URLs for the 'previous' and 'first' navigation buttons.
-        prev_movie_url = url_for('movies_bp.movies_by_date', year=target_year, cursor=cursor - movies_per_page)
+        prev_movie_url = url_for('movies_bp.movies_by_date', year=target_year, before=page['previous'])
         first_movie_url = url_for('movies_bp.movies_by_date', year=int(first_movie['year']))
 
-    if cursor + movies_per_page < len(movie_ids):
+    if page['next'] is not None:
         # There are further movies, so generate URLs for the 'next' and 'last' navigation buttons.
-        next_movie_url = url_for('movies_bp.movies_by_date', year=target_year, cursor=cursor + movies_per_page)
-
-        last_cursor = movies_per_page * int(len(movie_ids) / movies_per_page)
-        if len(movie_ids) % movies_per_page == 0:
-            last_cursor -= movies_per_page
-        last_movie_url = url_for('movies_bp.movies_by_date', year=target_year, cursor=last_cursor)
+        next_movie_url = url_for('movies_bp.movies_by_date', year=target_year, after=page['next'])
+        last_movie_url = url_for('movies_bp.movies_by_date', year=target_year, last=1)
 
     # Construct urls for viewing movies comments and adding comments.
 
     for movie in movies:
         added = False
-        movie['view_comment_url'] = url_for('movies_bp.movies_by_date', year=target_year, cursor=cursor,
-                                            view_comments_for=movie['id'])
-        movie['add_comment_url'] = url_for('movies_bp.comment_on_movies', movie=movie['id'], cursor=cursor, page='date')
+        movie['view_comment_url'] = url_for('movies_bp.movies_by_date', year=target_year,
+                                            view_comments_for=movie['id'], **position)
+        movie['add_comment_url'] = url_for('movies_bp.comment_on_movies', movie=movie['id'], page='date',
+                                           year=target_year, **position)
         # movie['add_to_watch_list_url'] =
         if user is not None:
             if movie['id'] not in id_list:
                 movie['add_to_watch_list_url'] = url_for('movies_bp.watch_list_dates', movie_id=movie['id'],
-                                                         cursor=cursor,
-                                                         show=movies_to_show_comments)
+                                                         show=movies_to_show_comments, **position)
             else:
                 added = True
                 movie['remove_from_watch_list_url'] = url_for('movies_bp.remove_movie_watch_list_dates',
-                                                              cursor=cursor,
-                                                              movie_id=movie['id'], show=movies_to_show_comments)
+                                                              movie_id=movie['id'], show=movies_to_show_comments,
+                                                              **position)
 
                 movie['add_to_watch_list_url'] = ""
         else:
@@ -245,7 +261,7 @@ def movies_by_genre():
     movies_per_page = 10
     # Read query parameters.
     genre_name = request.args.get('genre')
-    cursor = request.args.get('cursor')
+    position = page_position()
     movies_to_show_comments = request.args.get('view_comments_for')
 
     if movies_to_show_comments is None:
@@ -255,55 +271,43 @@ def movies_by_genre():
         # Convert movies_to_show_comments from string to int.
         movies_to_show_comments = int(movies_to_show_comments)
 
-    if cursor is None:
-        # No cursor query parameter, so initialise cursor to start at the beginning.
-        cursor = 0
-    else:
-        # Convert cursor from string to int.
-        cursor = int(cursor)
-
-    # Retrieve movies ids for movies that are classified with genre_name.
-    movie_ids = services.get_movie_ids_for_genre(genre_name, repo.repo_instance)
-
-    # Retrieve the batch of movies to display on the Web page.
-    movies = services.get_movies_by_id(movie_ids[cursor:cursor + movies_per_page], repo.repo_instance)
+    # Retrieve the page of movies classified with genre_name to display on the Web page.
+    page = services.get_movie_page(repo.MovieFilter([genre_name]), per_page=movies_per_page,
+                                   repo=repo.repo_instance, **position)
+    movies = page['movies']
 
     first_movie_url = None
     last_movie_url = None
     next_movie_url = None
     prev_movie_url = None
 
-    if cursor > 0:
+    if page['previous'] is not None:
         # There are preceding movies, so generate URLs for the 'previous' and 'first' navigation buttons.
-        prev_movie_url = url_for('movies_bp.movies_by_genre', genre=genre_name, cursor=cursor - movies_per_page)
+        prev_movie_url = url_for('movies_bp.movies_by_genre', genre=genre_name, before=page['previous'])
         first_movie_url = url_for('movies_bp.movies_by_genre', genre=genre_name)
 
-    if cursor + movies_per_page < len(movie_ids):
+    if page['next'] is not None:
         # There are further movies, so generate URLs for the 'next' and 'last' navigation buttons.
-        next_movie_url = url_for('movies_bp.movies_by_genre', genre=genre_name, cursor=cursor + movies_per_page)
-
-        last_cursor = movies_per_page * int(len(movie_ids) / movies_per_page)
-        if len(movie_ids) % movies_per_page == 0:
-            last_cursor -= movies_per_page
-        last_movie_url = url_for('movies_bp.movies_by_genre', genre=genre_name, cursor=last_cursor)
+        next_movie_url = url_for('movies_bp.movies_by_genre', genre=genre_name, after=page['next'])
+        last_movie_url = url_for('movies_bp.movies_by_genre', genre=genre_name, last=1)
     # Construct urls for viewing movies comments and adding comments.
 
     for movie in movies:
-        movie['view_comment_url'] = url_for('movies_bp.movies_by_genre', genre=genre_name, cursor=cursor,
-                                            view_comments_for=movie['id'])
-        movie['add_comment_url'] = url_for('movies_bp.comment_on_movies', movie=movie['id'], cursor=cursor,
-                                           page='genre', genre=genre_name)
+        movie['view_comment_url'] = url_for('movies_bp.movies_by_genre', genre=genre_name,
+                                            view_comments_for=movie['id'], **position)
+        movie['add_comment_url'] = url_for('movies_bp.comment_on_movies', movie=movie['id'], page='genre',
+                                           genre=genre_name, **position)
         # if movie not in;
         # print("movie id", movie['id'])
         if user is not None:
             if movie['id'] not in id_list:
                 movie['add_to_watch_list_url'] = url_for('movies_bp.watch_list_genres', movie_id=movie['id'],
-                                                         genre=genre_name, cursor=cursor, show=movies_to_show_comments)
+                                                         genre=genre_name, show=movies_to_show_comments, **position)
             else:
                 movie['add_to_watch_list_url'] = ""
                 movie['remove_from_watch_list_url'] = url_for('movies_bp.remove_movie_watch_list_genres',
                                                               movie_id=movie['id'], genre=genre_name,
-                                                              cursor=cursor, show=movies_to_show_comments)
+                                                              show=movies_to_show_comments, **position)
         else:
             movie['add_to_watch_list_url'] = None
 
@@ -323,6 +327,131 @@ def movies_by_genre():
     )
 
 
+@movies_blueprint.route('/movies_by_facets', methods=['GET'])
+def movies_by_facets():
+    movies_per_page = 10
+    # Read query parameters, e.g. ?genre=Action&genre=Sci-Fi&year=2010..2016&min_rating=7
+    genre_names = request.args.getlist('genre')
+    year_range = request.args.get('year')
+    min_rating = request.args.get('min_rating')
+    position = page_position()
+    movies_to_show_comments = request.args.get('view_comments_for')
+
+    if movies_to_show_comments is None:
+        # No view-comments query parameter, so set to a non-existent movies id.
+        movies_to_show_comments = -1
+    else:
+        # Convert movies_to_show_comments from string to int.
+        movies_to_show_comments = int(movies_to_show_comments)
+
+    try:
+        # Retrieve the page of movies matching every facet to display on the Web page.
+        page = services.get_movie_page(services.parse_facets(genre_names, year_range, min_rating),
+                                       per_page=movies_per_page, repo=repo.repo_instance, **position)
+    except ValueError:
+        # Malformed year range or rating, so return the homepage.
+        return redirect(url_for('home_bp.home'))
+    movies = page['movies']
+
+    # Every navigation URL repeats the facets; url_for leaves out the ones that are None.
+    facets = dict(genre=genre_names, year=year_range, min_rating=min_rating)
+    first_movie_url = None
+    last_movie_url = None
+    next_movie_url = None
+    prev_movie_url = None
+
+    if page['previous'] is not None:
+        # There are preceding movies, so generate URLs for the 'previous' and 'first' navigation buttons.
+        prev_movie_url = url_for('movies_bp.movies_by_facets', before=page['previous'], **facets)
+        first_movie_url = url_for('movies_bp.movies_by_facets', **facets)
+
+    if page['next'] is not None:
+        # There are further movies, so generate URLs for the 'next' and 'last' navigation buttons.
+        next_movie_url = url_for('movies_bp.movies_by_facets', after=page['next'], **facets)
+        last_movie_url = url_for('movies_bp.movies_by_facets', last=1, **facets)
+
+    # Construct urls for viewing movies comments and adding comments.
+    for movie in movies:
+        movie['view_comment_url'] = url_for('movies_bp.movies_by_facets', view_comments_for=movie['id'], **position,
+                                            **facets)
+        movie['add_comment_url'] = url_for('movies_bp.comment_on_movies', movie=movie['id'], page='facets',
+                                           **position, **facets)
+        movie['add_to_watch_list_url'] = None
+
+    description = list(genre_names)
+    if year_range:
+        description.append(year_range)
+    if min_rating:
+        description.append(f'rated {min_rating}+')
+    return render_template(
+        'movies/movies.html',
+        title='Movies',
+        movies_title='Movies Matching ' + ', '.join(description) if description else 'All Movies',
+        movies=movies,
+        selected_movies=utilities.get_selected_movies(6),
+        genre_urls=utilities.get_genres_and_urls(),
+        first_movie_url=first_movie_url,
+        last_movie_url=last_movie_url,
+        prev_movie_url=prev_movie_url,
+        next_movie_url=next_movie_url,
+        show_comments_for_movies=movies_to_show_comments,
+        id_list=[]
+    )
+
+
+@movies_blueprint.route('/top_movies', methods=['GET'])
+def top_movies():
+    # Read query parameters, e.g. ?genre=Action&year=2010..2016&key=votes&k=20
+    genre_names = request.args.getlist('genre')
+    year_range = request.args.get('year')
+    min_rating = request.args.get('min_rating')
+    key = request.args.get('key', 'rating')
+    movies_to_show_comments = request.args.get('view_comments_for')
+
+    if movies_to_show_comments is None:
+        # No view-comments query parameter, so set to a non-existent movies id.
+        movies_to_show_comments = -1
+    else:
+        # Convert movies_to_show_comments from string to int.
+        movies_to_show_comments = int(movies_to_show_comments)
+
+    try:
+        # Only the k best matches are selected; the rest are never sorted.
+        k = min(int(request.args.get('k', TOP_MOVIES)), MAX_TOP_MOVIES)
+        if key not in repo.TOP_K_KEYS or k <= 0:
+            raise ValueError(f'Cannot rank the top {k} movies by {key}')
+        movies = services.get_top_movies(genre_names, year_range, min_rating, key, k, repo.repo_instance)
+    except ValueError:
+        # Malformed facets, key or k, so return the homepage.
+        return redirect(url_for('home_bp.home'))
+
+    ranking = dict(genre=genre_names, year=year_range, min_rating=min_rating, key=key, k=k)
+    for movie in movies:
+        movie['view_comment_url'] = url_for('movies_bp.top_movies', view_comments_for=movie['id'], **ranking)
+        movie['add_comment_url'] = url_for('movies_bp.comment_on_movies', movie=movie['id'], page='top', **ranking)
+        movie['add_to_watch_list_url'] = None
+
+    description = list(genre_names)
+    if year_range:
+        description.append(year_range)
+    if min_rating:
+        description.append(f'rated {min_rating}+')
+    return render_template(
+        'movies/movies.html',
+        title='Movies',
+        movies_title=f'Top {k} by {key}' + (' in ' + ', '.join(description) if description else ''),
+        movies=movies,
+        selected_movies=utilities.get_selected_movies(6),
+        genre_urls=utilities.get_genres_and_urls(),
+        first_movie_url=None,
+        last_movie_url=None,
+        prev_movie_url=None,
+        next_movie_url=None,
+        show_comments_for_movies=movies_to_show_comments,
+        id_list=[]
+    )
+
+
 @movies_blueprint.route('/show_watchlist', methods=['GET'])
 @login_required
 def show_watchlist():
@@ -418,25 +547,23 @@ def watch_list_show():
 @login_required
 def watch_list_genres():
     genre = request.args.get('genre')
-    cursor = request.args.get('cursor')
     username = session['username']
     movie_id = request.args.get('movie_id')
     services.add_to_watch_list(movie_id, username, repo.repo_instance)
-    return redirect(url_for('movies_bp.movies_by_genre', genre=genre, cursor=cursor,
-                            view_comments_for=request.args.get('show')))
+    return redirect(url_for('movies_bp.movies_by_genre', genre=genre, view_comments_for=request.args.get('show'),
+                            **page_position()))
 
 
 @movies_blueprint.route('/remove_movie_watch_list_genres', methods=['GET'])
 @login_required
 def remove_movie_watch_list_genres():
     genre = request.args.get('genre')
-    cursor = int(request.args.get('cursor'))
     username = session['username']
     movie_id = request.args.get('movie_id')
     services.remove_from_watch_list(movie_id, username, repo.repo_instance)
     # movie = services.get_movie(movie_id, repo.repo_instance)
-    return redirect(url_for('movies_bp.movies_by_genre', genre=genre, cursor=cursor,
-                            view_comments_for=request.args.get('show')))
+    return redirect(url_for('movies_bp.movies_by_genre', genre=genre, view_comments_for=request.args.get('show'),
+                            **page_position()))
 
 
 @movies_blueprint.route('/remove_movie_watch_list_dates', methods=['GET'])
@@ -467,12 +594,12 @@ def remove_movie_watch_list_show():
 @login_required
 def watch_list_dates():
     username = session['username']
-    cursor = request.args.get('cursor')
     movie_id = request.args.get('movie_id')
     services.add_to_watch_list(movie_id, username, repo.repo_instance)
 
     movie = services.get_movie(movie_id, repo.repo_instance)
-    return redirect(url_for('movies_bp.movies_by_date', year=int(movie['year']), cursor=cursor, username=username))
+    return redirect(url_for('movies_bp.movies_by_date', year=int(movie['year']), username=username,
+                            **page_position()))
 
 
 @movies_blueprint.route('/comment_on_movies', methods=['GET', 'POST'])
@@ -484,13 +611,9 @@ def comment_on_movies():
     # the form with an movies id, when subsequently called with a HTTP POST request, the movies id remains in the
     # form.
     form = CommentForm()
-    page = request.args.get('page')
-    cursor = request.args.get('cursor')
-    genre_name = request.args.get('genre')
-    print("page", page)
-    print("genre", genre_name)
-    print("cursor", cursor)
-    print(request.args)
+    # The list the form was opened from (page), its query parameters and its page cursor. They ride along on the
+    # form's POST, so that a successful comment leads back to the same page of that list.
+    list_args = {name: request.args.getlist(name) for name in COMMENT_LIST_ARGS if name in request.args}
     if form.validate_on_submit():
         # Successful POST, i.e. the comment text has passed data validation.
         # Extract the movies id, representing the commented movies, from the form.
@@ -502,12 +625,13 @@ def comment_on_movies():
         # Retrieve the movies in dict form.
         movie = services.get_movie(movie_id, repo.repo_instance)
 
-        # Cause the web browser to display the page of all movies that have the same date as the commented movies,
-        # and display all comments, including the new comment.
-
-        # print("oage", page)
-        return redirect(url_for('home_bp.home'))
-        # return redirect(url_for('movies_bp.movies_by_date', year=int(movie['year']), view_comments_for=movie_id))
+        # Cause the web browser to display the page of the list the comment was started from, showing all comments
+        # of the commented movie, including the new comment.
+        list_view = COMMENT_LIST_VIEWS.get(request.args.get('page'))
+        if list_view is None:
+            return redirect(url_for('home_bp.home'))
+        return redirect(url_for(list_view, view_comments_for=movie_id,
+                                **{name: values for name, values in list_args.items() if name != 'page'}))
 
     if request.method == 'GET':
         # Request is a HTTP GET to display the form.
@@ -524,17 +648,21 @@ def comment_on_movies():
     # For a GET or an unsuccessful POST, retrieve the movies to comment in dict form, and return a Web page that allows
     # the user to enter a comment. The generated Web page includes a form object.
     movie = services.get_movie(movie_id, repo.repo_instance)
+
+    # The 'more like this' panel links to the comment page of each similar movie.
+    similar_movies = services.get_similar_movies(movie_id, 5, repo.repo_instance)
+    for similar_movie in similar_movies:
+        similar_movie['url'] = url_for('movies_bp.comment_on_movies', movie=similar_movie['id'], **list_args)
+
     return render_template(
         'movies/comment_on_movie.html',
         title='Edit movies',
         movie=movie,
+        similar_movies=similar_movies,
         form=form,
-        handler_url=url_for('movies_bp.comment_on_movies'),
+        handler_url=url_for('movies_bp.comment_on_movies', **list_args),
         selected_movies=utilities.get_selected_movies(),
-        genre_urls=utilities.get_genres_and_urls(),
-        genre=genre_name,
-        cursor=cursor,
-        page=page
+        genre_urls=utilities.get_genres_and_urls()
     )
 
 
@@ -615,7 +743,7 @@ def search_movies():
     if form.validate_on_submit():
         name = form.search_info.data
         movies = services.get_search_info(name, repo.repo_instance)
-        if movies is not None:
+        if len(movies) > 0:
             movie_ids = []
             for movie in movies:
                 movie_ids.append(int(movie['id']))
@@ -627,6 +755,7 @@ def search_movies():
                                    )
     return render_template('search.html',
                            search_url=url_for('movies_bp.search_movies'),
+                           autocomplete_url=url_for('movies_bp.autocomplete'),
                            form=form,
                            selected_movies=utilities.get_selected_movies()
                            )
@@ -652,6 +781,28 @@ class CommentForm(FlaskForm):
     submit = SubmitField('Submit')
 
 
+@movies_blueprint.route('/autocomplete', methods=['GET'])
+def autocomplete():
+    # Read query parameters, e.g. ?q=chr&kind=actor&kind=director&limit=5
+    prefix = request.args.get('q', '')
+    kinds = request.args.getlist('kind')
+    limit = min(request.args.get('limit', 10, type=int), 50)
+
+    return jsonify(services.get_completions(prefix, kinds, limit, repo.repo_instance))
+
+
+@movies_blueprint.route('/degrees_of_separation', methods=['GET'])
+def degrees_of_separation():
+    # Read query parameters, e.g. ?from=Chris Pratt&to=Matt Damon
+    first_name = request.args.get('from', '')
+    second_name = request.args.get('to', '')
+
+    path = services.get_actor_path(first_name, second_name, repo.repo_instance)
+    if path is None:
+        return jsonify({'error': f'No chain of movies links {first_name} and {second_name}'}), 404
+    return jsonify(path)
+
+
 class SearchForm(FlaskForm):
     search_info = TextAreaField('search_info', [DataRequired(message='Please give me some information')])
     submit = SubmitField('Search')
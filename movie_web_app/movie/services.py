@@ -1,7 +1,13 @@
 from typing import List, Iterable
 
-from movie_web_app.adapters.repository import AbstractRepository
-from movie_web_app.domainmodel.model import make_review, Movie, Review, Genre, Actor, Director, User
+from movie_web_app.adapters.repository import AbstractRepository, LoadPlan, MovieFilter, MOVIE_ORDER_KEYS
+from movie_web_app.domainmodel.model import make_review, Movie, Review, Genre, Actor, Director, User, rating_order
+
+
+# What comments_to_dict and movie_to_dict read, loaded with the Movies so a page of them takes a fixed number of
+# queries however many Movies, comments and genres it has.
+COMMENTS_PLAN = LoadPlan({'reviews': 'selectin', 'reviews.user': 'joined'})
+MOVIE_DICT_PLAN = LoadPlan({**COMMENTS_PLAN.strategies, 'genres': 'selectin', 'genres.movies': 'selectin'})
 
 
 class NonExistentMovieException(Exception):
@@ -43,7 +49,7 @@ def add_to_watch_list(movie_id: int, username: str, repo: AbstractRepository):
 
 
 def get_movie(movie_id: int, repo: AbstractRepository):
-    movie = repo.get_movie(int(movie_id))
+    movie = repo.get_movie(int(movie_id), MOVIE_DICT_PLAN)
 
     if movie is None:
         raise NonExistentMovieException
@@ -70,11 +76,11 @@ def get_user(username: str, repo: AbstractRepository):
 
 
 def get_movies_by_year(year, repo: AbstractRepository):
-    # Returns Movies for the target year (empty if no matches), the year of the previous movie (might be null),
-    # the date of the next movie (might be null)
+    # Returns Movies for the target year, best rated first (empty if no matches), the year of the previous movie
+    # (might be null), the date of the next movie (might be null)
 
     movies = repo.get_movies_by_year(target_year=int(year))
-    movies.sort(key=lambda movie: movie.rating, reverse=True)
+    movies.sort(key=lambda movie: (rating_order(movie), movie.id))
     movies_dto = list()
     prev_year = next_year = None
 
@@ -100,6 +106,80 @@ def get_movie_ids_for_genre(genre_name, repo: AbstractRepository):
     return movie_ids
 
 
+def parse_year_range(year_range):
+    # Accepts '2010', '2010..2016', '2010..' or '..2016'; raises ValueError for anything else.
+    if year_range is None or year_range == '':
+        return None, None
+    first_year, separator, last_year = year_range.partition('..')
+    if separator == '':
+        last_year = first_year
+    return (int(first_year) if first_year else None), (int(last_year) if last_year else None)
+
+
+def parse_facets(genre_names, year_range, min_rating):
+    # The MovieFilter for facets given as query parameters; raises ValueError for a malformed year range or rating.
+    first_year, last_year = parse_year_range(year_range)
+    min_rating = float(min_rating) if min_rating else None
+    return MovieFilter(genre_names, first_year, last_year, min_rating)
+
+
+def get_movie_ids_for_facets(genre_names, year_range, min_rating, repo: AbstractRepository):
+    movie_filter = parse_facets(genre_names, year_range, min_rating)
+    movie_ids = repo.get_movie_ids_for_facets(movie_filter.genre_names, movie_filter.first_year,
+                                              movie_filter.last_year, movie_filter.min_rating)
+    return movie_ids
+
+
+def get_top_movies(genre_names, year_range, min_rating, key, k, repo: AbstractRepository):
+    # The k Movies matching every facet with the highest rating or votes, without sorting every match.
+    movies = repo.top_k(parse_facets(genre_names, year_range, min_rating), key, k, MOVIE_DICT_PLAN)
+    return movies_to_dict(movies)
+
+
+def page_cursor(movie: Movie):
+    # A Movie's place in rating order, (rating_order, id), as a query parameter.
+    score, movie_id = MOVIE_ORDER_KEYS['rating'](movie)
+    return f'{score!r}:{movie_id}'
+
+
+def parse_page_cursor(cursor):
+    # Raises ValueError for anything page_cursor did not make.
+    if cursor is None or cursor == '':
+        return None
+    score, separator, movie_id = cursor.partition(':')
+    if separator == '':
+        raise ValueError(f'Malformed page cursor {cursor}')
+    return float(score), int(movie_id)
+
+
+def get_movie_page(movie_filter, after, before, last, per_page, repo: AbstractRepository):
+    # A page of the Movies matching movie_filter, best rated first, and the cursors of the pages either side of it
+    # (None at either end). after and before are such cursors; with neither, this is the first page, or with last the
+    # final one. The final page holds what is left over after whole pages, so stepping back from it lands on the same
+    # pages as stepping forward from the first. Each page is one keyset query, however deep it is; the count it is
+    # sized from is cached by the repository.
+    count = repo.count_movies(movie_filter)
+    after_key, before_key = parse_page_cursor(after), parse_page_cursor(before)
+    from_end = last and before_key is None
+    limit = (count - 1) % per_page + 1 if from_end and count > 0 else per_page
+    backward = before_key is not None or from_end
+
+    # One Movie more than the page shows tells whether there is another page beyond it.
+    movies = repo.page_movies(movie_filter, 'rating', after_key, limit + 1, before_key, from_end, MOVIE_DICT_PLAN)
+    more = len(movies) > limit
+    if more:
+        movies = movies[1:] if backward else movies[:limit]
+    has_previous = more if backward else after_key is not None
+    has_next = before_key is not None if backward else more
+
+    return {
+        'movies': movies_to_dict(movies),
+        'count': count,
+        'previous': page_cursor(movies[0]) if has_previous and len(movies) > 0 else None,
+        'next': page_cursor(movies[-1]) if has_next and len(movies) > 0 else None,
+    }
+
+
 def remove_from_watch_list(movie_id, username, repo: AbstractRepository):
     # Check that the movie exists.
     movie = repo.get_movie(int(movie_id))
@@ -112,7 +192,7 @@ def remove_from_watch_list(movie_id, username, repo: AbstractRepository):
 
 
 def get_movies_by_id(id_list, repo: AbstractRepository):
-    movies = repo.get_movies_by_id(id_list)
+    movies = repo.get_movies_by_id(id_list, MOVIE_DICT_PLAN)
     print("get movies by is", movies)
 
     # Convert Articles to dictionary form.
@@ -122,23 +202,52 @@ def get_movies_by_id(id_list, repo: AbstractRepository):
 
 
 def get_search_info(name, repo: AbstractRepository):
-    movies_ids = repo.get_movies_for_actor(name)
-    movies = []
-    for id in movies_ids:
-        movies.append(repo.get_movie(id))
-    movies += repo.get_movies(name)
-    movies_ids += repo.get_movie_ids_for_genre(name)
-    for id in movies_ids:
-        movies.append(repo.get_movie(id))
-    # movies += repo.get_movies_for_director(name)
-    movies = set(movies)
-    movies = list(movies)
-    movies.sort(key=lambda movie: movie.rating, reverse=True)
+    # Movies titled name come first, then movies whose title has every word of name, then the other movies whose
+    # title or description matches, most relevant first. Movies featuring an actor or tagged with a genre called name
+    # follow, best rated first.
+    title_matches = repo.get_movies(name) + repo.get_movies_for_title_words(name)
+    movie_ids = list(dict.fromkeys([movie.id for movie in title_matches] + repo.search_movie_ids(name)))
+    ranks = {movie_id: rank for rank, movie_id in enumerate(movie_ids)}
+
+    other_ids = {movie.id for movie in repo.get_movies_for_actor(name)}
+    other_ids.update(repo.get_movie_ids_for_genre(name))
+    other_ids.difference_update(ranks)
+    # Both groups are fetched together, so the relationships they render are loaded in one go.
+    fetched = repo.get_movies_by_id(movie_ids + sorted(other_ids), MOVIE_DICT_PLAN)
+    movies = sorted((movie for movie in fetched if movie.id in ranks), key=lambda movie: ranks[movie.id])
+    movies += sorted((movie for movie in fetched if movie.id not in ranks),
+                     key=lambda movie: (rating_order(movie), movie.id))
+    return movies_to_dict(movies)
+
+
+def get_similar_movies(movie_id, limit, repo: AbstractRepository):
+    movie_ids = repo.get_similar_movie_ids(int(movie_id), limit)
+    ranks = {similar_id: rank for rank, similar_id in enumerate(movie_ids)}
+    movies = sorted(repo.get_movies_by_id(movie_ids, MOVIE_DICT_PLAN), key=lambda movie: ranks[movie.id])
     return movies_to_dict(movies)
 
 
+def get_actor_path(first_name, second_name, repo: AbstractRepository):
+    # The shortest chain of collaborations between two actors, with a movie each neighbouring pair appeared in, or
+    # None if the actors are not connected.
+    names = repo.get_actor_path(first_name, second_name)
+    if names is None:
+        return None
+    movies = []
+    for name, next_name in zip(names, names[1:]):
+        shared = set(repo.get_movies_for_actor(name)) & set(repo.get_movies_for_actor(next_name))
+        movie = min(shared, key=lambda movie: movie.id)
+        movies.append({'id': movie.id, 'title': movie.title, 'year': movie.year})
+    return {'actors': names, 'movies': movies, 'degrees': len(names) - 1}
+
+
+def get_completions(prefix, kinds, limit, repo: AbstractRepository):
+    completions = repo.get_completions(prefix, kinds or None, limit)
+    return [{'kind': kind, 'name': name, 'votes': votes} for kind, name, votes in completions]
+
+
 def get_comments_for_movie(movie_id, repo: AbstractRepository):
-    movie = repo.get_movie(movie_id)
+    movie = repo.get_movie(movie_id, COMMENTS_PLAN)
 
     if movie is None:
         raise NonExistentMovieException
@@ -150,8 +259,7 @@ def get_watch_list_for_user(username, repo: AbstractRepository):
     user = repo.get_user(username)
     if user is None:
         raise UnknownUserException
-    user.watch_list.watch_list.sort(key=lambda movie:movie.rating, reverse=True)
-    return movies_to_dict(user.watch_list)
+    return movies_to_dict(user.watch_list.by_rating)
 
 
 # ============================================
@@ -1,9 +1,11 @@
 import os
+import shutil
+from contextlib import contextmanager
 
 import pytest
 
 # import movie_web_app.adapters.Movie_repo as movie_repo
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import clear_mappers, sessionmaker
 
 from movie_web_app import create_app
@@ -24,6 +26,14 @@ def in_memory_repo():
     return repo
 
 
+@pytest.fixture
+def memory_data_path(tmp_path):
+    # A writable copy of the memory repository's CSV files.
+    data_path = tmp_path / 'data'
+    shutil.copytree(TEST_DATA_PATH, data_path)
+    return str(data_path)
+
+
 @pytest.fixture
 def database_engine():
     engine = create_engine(TEST_DATABASE_URI_FILE)
@@ -88,6 +98,28 @@ def session_factory():
     metadata.drop_all(engine)
     clear_mappers()
 
+
+@pytest.fixture
+def captured_selects(session_factory):
+    # A context manager collecting the (statement, parameters) of every SELECT session_factory's engine runs within it.
+    engine = session_factory.kw['bind']
+
+    @contextmanager
+    def capture_selects():
+        statements = []
+
+        def capture(connection, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith('SELECT'):
+                statements.append((statement, parameters))
+
+        event.listen(engine, 'before_cursor_execute', capture)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', capture)
+
+    return capture_selects
+
 @pytest.fixture
 def client():
     my_app = create_app({
@@ -139,6 +139,86 @@ def test_movies_with_genre(client):
     assert response.status_code == 200
 
 
+def test_movies_with_genre_pages(client):
+    response = client.get('/movies_by_genre?genre=Sci-Fi&last=1')
+    assert response.status_code == 200
+    assert b'before=' in response.data
+
+    response = client.get('/movies_by_genre?genre=Sci-Fi&after=-8.1:1')
+    assert response.status_code == 200
+    assert b'Guardians of the Galaxy' not in response.data
+
+    # A cursor the list did not hand out shows its first page.
+    response = client.get('/movies_by_genre?genre=Sci-Fi&after=soon')
+    assert response.status_code == 200
+    assert b'Guardians of the Galaxy' in response.data
+    assert client.get('/movies_by_date?year=2014&before=8.1').status_code == 200
+
+
+def test_movies_with_facets(client):
+    response = client.get('/movies_by_facets?genre=Action&genre=Sci-Fi&year=2010..2016&min_rating=7')
+    assert response.status_code == 200
+    assert b'Movies Matching Action, Sci-Fi, 2010..2016, rated 7+' in response.data
+    assert b'Guardians of the Galaxy' in response.data
+
+    response = client.get('/movies_by_facets?year=soon')
+    assert response.status_code == 302
+
+
+def test_top_movies(client):
+    response = client.get('/top_movies?genre=Action&year=2010..2016&k=3')
+    assert response.status_code == 200
+    assert b'Top 3 by rating in Action, 2010..2016' in response.data
+    assert b'The Dark Knight Rises' in response.data
+
+    assert client.get('/top_movies?key=title').status_code == 302
+    assert client.get('/top_movies?k=none').status_code == 302
+
+
+def test_search_movies(client):
+    response = client.post('/search_movies', data={'search_info': 'intergalactic criminals'})
+    assert response.status_code == 302
+    assert '/movies_by_search?movies=1' in response.headers['Location']
+
+
+def test_autocomplete(client):
+    response = client.get('/autocomplete?q=chris+p&kind=actor&limit=2')
+    assert response.status_code == 200
+    assert [completion['name'] for completion in response.get_json()] == ['Chris Pratt', 'Chris Pine']
+
+
+def test_comment_returns_to_the_same_page_of_the_list(client, auth):
+    auth.login()
+
+    response = client.get('/comment_on_movies?movie=2&page=genre&genre=Sci-Fi&after=-8.1:1')
+    assert b'action="/comment_on_movies?page=genre&amp;genre=Sci-Fi&amp;after=-8.1%3A1"' in response.data
+
+    response = client.post(
+        '/comment_on_movies?page=genre&genre=Sci-Fi&after=-8.1:1',
+        data={'comment': 'Who needs quarantine?', 'movie_id': 2}
+    )
+    assert response.headers['Location'] == \
+        'http://localhost/movies_by_genre?view_comments_for=2&genre=Sci-Fi&after=-8.1%3A1'
+
+
+def test_movie_page_shows_similar_movies(client, auth):
+    auth.login()
+
+    response = client.get('/comment_on_movies?movie=1')
+    assert response.status_code == 200
+    assert b'More like this' in response.data
+    assert b'Star Trek Beyond' in response.data
+
+
+def test_degrees_of_separation(client):
+    response = client.get('/degrees_of_separation?from=Chris+Pratt&to=Matt+Damon')
+    assert response.status_code == 200
+    assert response.get_json()['degrees'] == 2
+
+    response = client.get('/degrees_of_separation?from=Chris+Pratt&to=Nobody')
+    assert response.status_code == 404
+
+
 def test_movies_can_show_watch_list(client):
     response = client.get('/show_watchlist')
     assert response.status_code == 302
@@ -2,9 +2,12 @@ from datetime import date, datetime
 
 import pytest
 
+from movie_web_app.adapters import database_repository
 from movie_web_app.adapters.database_repository import SqlAlchemyRepository
 from movie_web_app.domainmodel.model import User, Movie, Genre, make_review, Review
-from movie_web_app.adapters.repository import RepositoryException
+
+from movie_web_app.adapters.repository import MovieFilter, MOVIE_ORDER_KEYS, RepositoryException
+from movie_web_app.movie import services
 
 
 def test_repository_can_add_a_user(session_factory):
@@ -291,3 +294,186 @@ def test_can_retrieve_an_article_and_add_a_comment_to_it(session_factory):
 
     assert comment in article_fetched.reviews
     assert comment in author_fetched.reviews
+
+
+def test_repository_returns_movie_ids_by_rating_within_bounds(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    movie_ids = repo.get_movie_ids_by_rating(first_year=2010, last_year=2012, min_votes=100000)
+    movies = sorted(repo.get_movies_by_id(movie_ids), key=lambda movie: movie_ids.index(movie.id))
+
+    assert len(movies) > 0
+    assert all(2010 <= movie.year <= 2012 and movie.votes >= 100000 for movie in movies)
+    ratings = [movie.rating for movie in movies]
+    assert ratings == sorted(ratings, reverse=True)
+    assert repo.get_movie_ids_by_rating(min_rating=9.5) == []
+
+
+def test_repository_returns_average_rating_for_genre(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    assert 5 < repo.get_average_rating_for_genre('War') < 9
+    assert repo.get_average_rating_for_genre('United States') is None
+
+
+def test_repository_iterates_movies_in_windows(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    movie_ids = [movie.id for movie in repo.iter_movies(batch_size=7)]
+    assert movie_ids == sorted(movie_ids)
+    assert len(movie_ids) == repo.get_number_of_movies()
+
+    by_rating = list(repo.iter_movies(batch_size=50, order_by='rating'))
+    assert len(by_rating) == len(movie_ids)
+    keys = [(-movie.rating, movie.id) for movie in by_rating]
+    assert keys == sorted(keys)
+
+    by_year = repo.iter_movies(batch_size=3, order_by='year')
+    by_title = repo.iter_movies(batch_size=3, order_by='title')
+    first_by_year, first_by_title = next(by_year), next(by_title)
+    assert next(by_year).year >= first_by_year.year
+    assert next(by_title).title >= first_by_title.title
+
+    with pytest.raises(RepositoryException):
+        repo.iter_movies(order_by='votes')
+
+
+def test_repository_intersects_facets(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    movie_ids = repo.get_movie_ids_for_facets(['Action', 'Sci-Fi'], 2010, 2016, 7)
+    movies = repo.get_movies_by_id(movie_ids)
+
+    assert len(movie_ids) > 0
+    assert len(movies) == len(movie_ids)
+    for movie in movies:
+        assert 2010 <= movie.year <= 2016 and movie.rating >= 7
+        assert {'Action', 'Sci-Fi'} <= {genre.genre_name for genre in movie.genres}
+    assert repo.get_movie_ids_for_facets(['War', 'United States']) == []
+
+
+def test_repository_selects_top_k_movies(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    movies = repo.top_k(MovieFilter(['Action'], 2010, 2016), 'votes', 5)
+    assert len(movies) == 5
+    assert [movie.votes for movie in movies] == sorted((movie.votes for movie in movies), reverse=True)
+    assert [movie.id for movie in repo.top_k(k=20)] == repo.get_movie_ids_by_rating()[:20]
+    with pytest.raises(RepositoryException):
+        repo.top_k(key='title')
+
+
+def test_repository_pages_movies_by_keyset(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    movie_filter = MovieFilter(['Action'], 2010, 2016)
+    movie_ids = repo.get_movie_ids_for_facets(['Action'], 2010, 2016)
+    assert repo.count_movies(movie_filter) == len(movie_ids)
+    assert repo.count_movies() == repo.get_number_of_movies()
+
+    pages = [repo.page_movies(movie_filter, limit=10)]
+    while len(pages[-1]) == 10:
+        pages.append(repo.page_movies(movie_filter, after_key=MOVIE_ORDER_KEYS['rating'](pages[-1][-1])))
+    assert [movie.id for page in pages for movie in page] == movie_ids
+
+    before_key = MOVIE_ORDER_KEYS['rating'](pages[1][0])
+    assert repo.page_movies(movie_filter, before_key=before_key, limit=10) == pages[0]
+    assert [movie.id for movie in repo.page_movies(movie_filter, limit=3, from_end=True)] == movie_ids[-3:]
+    with pytest.raises(RepositoryException):
+        repo.page_movies(order_by='votes')
+
+
+def test_repository_keeps_the_most_recently_used_counts(session_factory, captured_selects, monkeypatch):
+    monkeypatch.setattr(database_repository, 'COUNT_CACHE_SIZE', 2)
+    repo = SqlAlchemyRepository(session_factory)
+    action, drama, war = MovieFilter(['Action']), MovieFilter(['Drama']), MovieFilter(['War'])
+
+    with captured_selects() as selects:
+        repo.count_movies(action)
+        repo.count_movies(drama)
+    assert len(selects) == 2
+    with captured_selects() as selects:
+        repo.count_movies(action)
+    assert len(selects) == 0
+    # Counting War drops Drama, the least recently used.
+    with captured_selects() as selects:
+        repo.count_movies(war)
+    assert len(selects) == 1
+    with captured_selects() as selects:
+        repo.count_movies(action)
+    assert len(selects) == 0
+    with captured_selects() as selects:
+        repo.count_movies(drama)
+    assert len(selects) == 1
+    assert repo.count_movies(drama) == len(repo.get_movie_ids_for_genre('Drama'))
+
+
+def test_repository_matches_whole_title_words(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    titles = [movie.title for movie in repo.get_movies_for_title_words('party')]
+    assert sorted(titles) == ['Office Christmas Party', 'Sausage Party', 'Search Party']
+    assert 'Sausage Party' not in [movie.title for movie in repo.get_movies_for_title_words('part')]
+    assert repo.get_movies_for_title_words('_') == []
+
+
+def test_repository_finds_similar_movies(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    movie = repo.get_movies_for_title_words('guardians galaxy')[0]
+    similar = repo.get_movies_by_id(repo.get_similar_movie_ids(movie.id, 5))
+
+    assert len(similar) == 5 and movie not in similar
+    for similar_movie in similar:
+        assert set(similar_movie.genres) & set(movie.genres) or set(similar_movie.actors) & set(movie.actors) \
+            or similar_movie.director == movie.director
+
+
+def test_repository_links_actors_who_worked_together(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    assert repo.actors_worked_together('Chris Pratt', 'Vin Diesel')
+    assert not repo.actors_worked_together('Chris Pratt', 'Matt Damon')
+    assert len(repo.get_actor_path('Chris Pratt', 'Matt Damon')) == 3
+    assert repo.get_actor_path('Chris Pratt', 'Nobody') is None
+
+
+def test_repository_searches_titles_and_descriptions(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    movie_ids = repo.search_movie_ids('intergalactic criminals')
+    assert len(movie_ids) > 0
+    assert 'intergalactic' in repo.get_movie(movie_ids[0]).description.lower()
+    assert repo.search_movie_ids('xyzzy') == []
+
+
+def test_repository_completes_names_by_votes(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    completions = repo.get_completions('chr', kinds=['actor', 'director'], limit=5)
+    assert len(completions) == 5
+    assert all(kind in ('actor', 'director') for kind, name, votes in completions)
+    votes = [votes for kind, name, votes in completions]
+    assert votes == sorted(votes, reverse=True)
+    assert repo.get_completions('xyzzy') == []
+
+
+def test_repository_loads_what_movie_to_dict_renders_with_the_movies(session_factory, captured_selects):
+    repo = SqlAlchemyRepository(session_factory)
+    user = User('Dave', '123456789')
+    repo.add_user(user)
+    for movie_id in (1, 2):
+        repo.add_comment(make_review(f'Comment on {movie_id}', user, repo.get_movie(movie_id)))
+
+    queries = []
+    for movie_ids in ([1, 2], list(range(1, 11)), list(range(1, 51))):
+        # A fresh session, so nothing is in the identity map from the previous page.
+        repo.reset_session()
+        with captured_selects() as selects:
+            services.get_movies_by_id(movie_ids, repo)
+        queries.append(len(selects))
+    assert queries[0] == queries[1] == queries[2] <= 5
+
+    repo.reset_session()
+    movie_dict = services.get_movie(1, repo)
+    assert 'dave' in [comment['username'] for comment in movie_dict['comments']]
+    assert 1 in movie_dict['genres'][0]['tagged_movies']
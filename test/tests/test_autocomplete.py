@@ -0,0 +1,40 @@
+from movie_web_app.adapters.autocomplete import Autocomplete, PrefixIndex
+
+
+def test_prefix_index_matches_the_start_of_any_word():
+    prefix_index = PrefixIndex()
+    prefix_index.add_score('Chris Pratt', 10)
+    prefix_index.add_score('Chris Pine', 20)
+    prefix_index.add_score('Christian Bale', 5)
+    prefix_index.add_score('Brad Pitt', 7)
+
+    assert prefix_index.complete('chris') == [('Chris Pine', 20), ('Chris Pratt', 10), ('Christian Bale', 5)]
+    assert prefix_index.complete('P') == [('Chris Pine', 20), ('Chris Pratt', 10), ('Brad Pitt', 7)]
+    assert prefix_index.complete('chris  p', limit=1) == [('Chris Pine', 20)]
+    assert prefix_index.complete('ris') == []
+    assert prefix_index.complete('  ') == []
+
+
+def test_prefix_index_accumulates_scores_after_it_is_queried():
+    prefix_index = PrefixIndex(cache_threshold=0)
+    prefix_index.add_score('Chris Pratt', 10)
+    prefix_index.add_score('Chris Pine', 20)
+    assert prefix_index.complete('chris', limit=1) == [('Chris Pine', 20)]
+
+    prefix_index.add_score('Chris Pratt', 15)
+    prefix_index.add_score('Chris Evans', 1)
+    assert prefix_index.complete('chris') == [('Chris Pratt', 25), ('Chris Pine', 20), ('Chris Evans', 1)]
+    assert len(prefix_index) == 3
+
+
+def test_autocomplete_merges_kinds_by_votes():
+    autocomplete = Autocomplete()
+    autocomplete.add_votes('title', 'Drag Me to Hell', '90')
+    autocomplete.add_votes('genre', 'Drama', '100')
+    autocomplete.add_votes('genre', 'Drama', '50')
+    autocomplete.add_votes('actor', 'Adam Driver', '80')
+    autocomplete.add_votes('actor', '', '80')
+
+    assert autocomplete.complete('dr') == [('genre', 'Drama', 150), ('title', 'Drag Me to Hell', 90),
+                                           ('actor', 'Adam Driver', 80)]
+    assert autocomplete.complete('dr', kinds=['actor', 'title'], limit=1) == [('title', 'Drag Me to Hell', 90)]
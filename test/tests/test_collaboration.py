@@ -0,0 +1,42 @@
+import pytest
+
+from movie_web_app.adapters.collaboration import CollaborationGraph
+
+
+@pytest.fixture
+def graph():
+    graph = CollaborationGraph()
+    graph.add_cast(['Chris Pratt', 'Zoe Saldana', 'Vin Diesel'])
+    graph.add_cast(['Zoe Saldana', 'Chris Pine'])
+    graph.add_cast(['Chris Pine', 'Zachary Quinto'])
+    graph.add_cast(['Chris Pratt', 'Jessica Chastain'])
+    graph.add_cast(['Jessica Chastain', 'Matt Damon'])
+    graph.add_cast(['Matt Damon', 'Zachary Quinto'])
+    graph.add_cast(['Ryan Gosling'])
+    return graph
+
+
+def test_graph_knows_who_worked_together(graph):
+    assert len(graph) == 8
+    assert graph.worked_with('Chris Pratt', 'Vin Diesel')
+    assert graph.worked_with('Vin Diesel', 'Chris Pratt')
+    assert not graph.worked_with('Chris Pratt', 'Chris Pine')
+    assert not graph.worked_with('Chris Pratt', 'Nobody')
+
+
+def test_graph_finds_shortest_paths(graph):
+    assert graph.path('Chris Pratt', 'Matt Damon') == ['Chris Pratt', 'Jessica Chastain', 'Matt Damon']
+    assert graph.path('Vin Diesel', 'Zachary Quinto') == ['Vin Diesel', 'Zoe Saldana', 'Chris Pine', 'Zachary Quinto']
+    assert len(graph.path('Vin Diesel', 'Matt Damon')) == 4
+    assert graph.path('Chris Pine', 'Chris Pine') == ['Chris Pine']
+
+
+def test_graph_reports_unconnected_and_unknown_actors(graph):
+    assert graph.path('Chris Pratt', 'Ryan Gosling') is None
+    assert graph.path('Chris Pratt', 'Nobody') is None
+
+
+def test_graph_paths_follow_new_casts(graph):
+    assert graph.path('Chris Pratt', 'Ryan Gosling') is None
+    graph.add_cast(['Ryan Gosling', 'Zoe Saldana'])
+    assert graph.path('Chris Pratt', 'Ryan Gosling') == ['Chris Pratt', 'Zoe Saldana', 'Ryan Gosling']
@@ -0,0 +1,159 @@
+import sys
+import threading
+import time
+
+import pytest
+
+from movie_web_app.adapters.locking import ReadWriteLock
+from movie_web_app.domainmodel.model import Movie, make_review
+from movie_web_app.movie import services
+
+
+def run_threads(targets):
+    errors = []
+
+    def guarded(target):
+        try:
+            target()
+        except Exception as error:  # Reported to the test thread below.
+            errors.append(error)
+
+    threads = [threading.Thread(target=guarded, args=(target,)) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=60)
+    assert not any(thread.is_alive() for thread in threads)
+    return errors
+
+
+def test_readers_share_the_lock():
+    lock = ReadWriteLock()
+    both_reading = threading.Barrier(2, timeout=5)
+
+    def reader():
+        with lock.reading():
+            both_reading.wait()
+
+    assert run_threads([reader, reader]) == []
+
+
+def test_writer_excludes_readers_and_other_writers():
+    lock = ReadWriteLock()
+    inside = []
+
+    def worker(side):
+        for _ in range(200):
+            with side():
+                inside.append(side)
+                assert all(entry == lock.reading for entry in inside) or len(inside) == 1
+                time.sleep(0)
+                inside.remove(side)
+
+    assert run_threads([lambda: worker(lock.writing), lambda: worker(lock.writing),
+                        lambda: worker(lock.reading), lambda: worker(lock.reading)]) == []
+
+
+def test_waiting_writer_goes_before_new_readers():
+    lock = ReadWriteLock()
+    order = []
+    reader_in = threading.Event()
+    release_reader = threading.Event()
+
+    def first_reader():
+        with lock.reading():
+            reader_in.set()
+            release_reader.wait(5)
+
+    def writer():
+        with lock.writing():
+            order.append('writer')
+
+    def late_reader():
+        with lock.reading():
+            order.append('reader')
+
+    threads = [threading.Thread(target=first_reader)]
+    threads[0].start()
+    reader_in.wait(5)
+    threads.append(threading.Thread(target=writer))
+    threads[1].start()
+    while lock._waiting_writers == 0:
+        time.sleep(0.001)
+    threads.append(threading.Thread(target=late_reader))
+    threads[2].start()
+    release_reader.set()
+    for thread in threads:
+        thread.join(5)
+    assert order == ['writer', 'reader']
+
+
+def test_lock_is_reentrant_but_does_not_upgrade():
+    lock = ReadWriteLock()
+    with lock.writing():
+        with lock.writing():
+            with lock.reading():
+                pass
+    with lock.reading():
+        with lock.reading():
+            with pytest.raises(RuntimeError):
+                with lock.writing():
+                    pass
+    with lock.writing():
+        pass
+
+
+@pytest.fixture
+def frequent_thread_switches():
+    # Switch threads far more often than the default 5 ms, so that reads and writes interleave.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-4)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def test_repository_survives_concurrent_reads_and_writes(in_memory_repo, frequent_thread_switches):
+    repo = in_memory_repo
+    user = repo.get_user('thorke')
+    movies_in_2016 = len(repo.get_movies_by_year(2016))
+    comments = len(repo.get_comments())
+    writers, movies_per_writer = 4, 50
+
+    def writer(first_id):
+        stress = repo.registry.genre('Stress')
+        for movie_id in range(first_id, first_id + movies_per_writer):
+            movie = Movie(f'Stress Test {movie_id}', 2016, new_id=movie_id)
+            movie.rating = '5.0'
+            movie.votes = '10'
+            movie.genres = [stress]
+            repo.add_movie(movie)
+            repo.add_movie_to_year_dict(movie, 2016)
+            repo.add_genre(stress)
+            repo.add_movie_to_genre_dict(movie, stress)
+            repo.add_comment(make_review('Stress', user, movie))
+            repo.add_to_watch_list(user, movie)
+
+    def reader():
+        seen = 0
+        for _ in range(25):
+            movie_ids = repo.get_movie_ids_for_year(2016)
+            assert len(movie_ids) >= seen
+            seen = len(movie_ids)
+            # A ranked id was added to the repository by an earlier write, so it always resolves.
+            assert None not in repo.get_movies_by_id(movie_ids)
+            repo.get_movies_for_title_words('stress test')
+            assert len(repo.get_comments()) >= comments
+            services.get_movies_by_year(2016, repo)
+            services.get_movie_ids_for_genre('Stress', repo)
+
+    first_ids = range(10000, 10000 + writers * movies_per_writer, movies_per_writer)
+    targets = [lambda first_id=first_id: writer(first_id) for first_id in first_ids] + [reader] * 4
+    assert run_threads(targets) == []
+
+    added = writers * movies_per_writer
+    assert repo.get_number_of_movies() == 1000 + added
+    assert len(repo.get_movies_by_year(2016)) == movies_in_2016 + added
+    assert len(repo.get_movie_ids_for_year(2016)) == movies_in_2016 + added
+    assert len(repo.get_movie_ids_for_genre('Stress')) == added
+    assert len(repo.get_movies_for_title_words('stress test')) == added
+    assert len(repo.get_comments()) == comments + added
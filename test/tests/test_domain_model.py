@@ -0,0 +1,139 @@
+import weakref
+
+from movie_web_app.domainmodel import compact
+from movie_web_app.domainmodel.model import Movie, Actor, Genre, Director, User, EntityRegistry, WatchList, make_review
+
+
+def test_registry_returns_one_object_per_name():
+    registry = EntityRegistry()
+
+    assert registry.actor('Chris Pratt') is registry.actor(' Chris Pratt')
+    assert registry.director('James Gunn') is registry.director('James Gunn')
+    assert registry.genre('Action') is registry.genre('Action')
+    assert registry.genre('Action') is not registry.genre('Drama')
+
+
+def test_registry_entities_equal_plain_entities():
+    registry = EntityRegistry()
+
+    assert registry.actor('Chris Pratt') == Actor('Chris Pratt')
+    assert registry.director('James Gunn') == Director('James Gunn')
+    assert registry.genre('Action') == Genre('Action')
+
+
+def test_movie_keeps_shared_entities():
+    registry = EntityRegistry()
+    first = Movie('Guardians of the Galaxy', 2014)
+    second = Movie('Passengers', 2016)
+
+    first.actors = [registry.actor('Chris Pratt'), 'Zoe Saldana']
+    second.actors = [registry.actor('Chris Pratt')]
+    first.genres = [registry.genre('Sci-Fi')]
+    second.genres = [registry.genre('Sci-Fi')]
+
+    assert first.actors[0] is second.actors[0]
+    assert first.actors[1] == Actor('Zoe Saldana')
+    assert first.genres[0] is second.genres[0]
+
+
+def test_compact_classes_have_no_instance_dict():
+    movie = compact.Movie('Guardians of the Galaxy', 2014, 1)
+    user = compact.User('Dave', '123456789')
+
+    assert not hasattr(movie, '__dict__')
+    assert not hasattr(user, '__dict__')
+    assert not hasattr(WatchList(), '__dict__')
+    assert movie._Movie__year == 2014
+    assert user._User__user_name == 'dave'
+    assert weakref.ref(movie)() is movie
+
+
+def test_compact_classes_behave_like_the_regular_classes():
+    movie = compact.Movie('Guardians of the Galaxy', 2014, 1)
+    user = compact.User('Dave', '123456789')
+    registry = compact.EntityRegistry()
+    movie.actors = [registry.actor('Chris Pratt'), 'Zoe Saldana']
+    movie.genres = [registry.genre('Action')]
+
+    assert type(registry.actor('Chris Pratt')) is compact.Actor
+    assert movie == Movie('Guardians of the Galaxy', 2014)
+    assert hash(movie) == hash(Movie('Guardians of the Galaxy', 2014))
+    assert movie.is_genred_by(Genre('Action'))
+    assert movie.actors[1] == compact.Actor('Zoe Saldana')
+
+    review = make_review('Great', user, movie)
+    user.add_watch_list(movie)
+    assert review in user.reviews and review in movie.reviews
+    assert review.movie is movie
+    assert list(user.watch_list) == [movie]
+    assert user == User('Dave', 'another password')
+
+
+def test_memory_repository_loads_compact_entities(in_memory_repo):
+    movie = in_memory_repo.get_movie(1)
+
+    assert type(movie) is compact.Movie
+    assert type(movie.actors[0]) is compact.Actor
+    assert all(type(director) is compact.Director for director in in_memory_repo.directors)
+    assert type(in_memory_repo.get_user('thorke')) is compact.User
+
+
+def test_movie_identity_key_is_computed_once():
+    movie = Movie('Guardians of the Galaxy', 2014, 1)
+
+    assert movie.concate() == 'Guardians of the Galaxy2014'
+    assert movie.concate() is movie.concate()
+    assert hash(movie) == hash(Movie('Guardians of the Galaxy', 2014, 2))
+    assert movie == Movie('Guardians of the Galaxy', 2014, 2)
+    assert movie != Movie('Guardians of the Galaxy', 2015, 1)
+    assert movie != 'Guardians of the Galaxy2014'
+
+
+def make_rated_movie(title, year, rating):
+    movie = Movie(title, year, None)
+    movie.rating = rating
+    return movie
+
+
+def test_watch_list_keeps_insertion_order_without_duplicates():
+    watch_list = WatchList()
+    first, second, third = (make_rated_movie('First', 2010, '6.0'), make_rated_movie('Second', 2011, '8.5'),
+                            make_rated_movie('Third', 2012, None))
+    for movie in (first, second, third, second):
+        watch_list.add_movie(movie)
+
+    assert watch_list.watch_list == [first, second, third]
+    assert len(watch_list) == watch_list.size() == 3
+    assert second in watch_list and make_rated_movie('Fourth', 2013, '1.0') not in watch_list
+    assert watch_list.first_movie_in_watchlist() is first
+    assert watch_list.select_movie_to_watch(2) is third
+    assert watch_list.select_movie_to_watch(3) is None
+    assert [movie for movie in watch_list] == [first, second, third]
+
+
+def test_watch_list_maintains_a_rating_sorted_view():
+    watch_list = WatchList()
+    movies = [make_rated_movie('Unrated', 2010, None), make_rated_movie('Good', 2011, '8.1'),
+              make_rated_movie('Fine', 2012, 6.5), make_rated_movie('Also Good', 2013, '8.1')]
+    for movie in movies:
+        watch_list.add_movie(movie)
+
+    assert [movie.title for movie in watch_list.by_rating] == ['Good', 'Also Good', 'Fine', 'Unrated']
+    watch_list.remove_movie(movies[1])
+    watch_list.remove_movie(movies[1])
+    assert [movie.title for movie in watch_list.by_rating] == ['Also Good', 'Fine', 'Unrated']
+    assert movies[1] not in watch_list.watch_list
+
+    watch_list.watch_list = [movies[2], movies[1]]
+    assert [movie.title for movie in watch_list.by_rating] == ['Good', 'Fine']
+
+
+def test_watch_list_can_change_while_being_iterated():
+    watch_list = WatchList()
+    movies = [make_rated_movie(f'Movie {rank}', 2010, '5.0') for rank in range(3)]
+    for movie in movies:
+        watch_list.add_movie(movie)
+
+    for movie in watch_list:
+        watch_list.remove_movie(movie)
+    assert len(watch_list) == 0
@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import NullPool, QueuePool, StaticPool
+
+from movie_web_app.adapters.engine import create_database_engine
+
+
+def test_file_databases_get_a_configurable_queue_pool(tmp_path):
+    engine = create_database_engine(f'sqlite:///{tmp_path / "movies.db"}', pool_size=3, max_overflow=2,
+                                    pool_recycle=600, pool_pre_ping=True)
+
+    assert isinstance(engine.pool, QueuePool)
+    assert engine.pool.size() == 3
+    assert engine.pool._max_overflow == 2
+    assert engine.pool._recycle == 600
+    assert engine.pool._pre_ping
+
+    # A connection returned to the pool is handed out again rather than reopened.
+    with engine.connect() as connection:
+        first = connection.connection.connection
+    with engine.connect() as connection:
+        assert connection.connection.connection is first
+
+
+def test_in_memory_databases_share_one_connection():
+    engine = create_database_engine('sqlite://')
+
+    assert isinstance(engine.pool, StaticPool)
+    engine.execute('CREATE TABLE movies (id INTEGER)')
+    assert engine.execute('SELECT COUNT(*) FROM movies').scalar() == 0
+
+
+def test_null_pool_is_opt_in(tmp_path):
+    assert isinstance(create_database_engine(f'sqlite:///{tmp_path / "movies.db"}', pool='null').pool, NullPool)
+    with pytest.raises(ValueError):
+        create_database_engine('sqlite://', pool='singleton')
+
+
+def test_performance_profile_tunes_every_connection(tmp_path):
+    engine = create_database_engine(f'sqlite:///{tmp_path / "movies.db"}', sqlite_profile='performance')
+
+    with engine.connect() as connection:
+        assert connection.execute('PRAGMA journal_mode').scalar() == 'wal'
+        assert connection.execute('PRAGMA synchronous').scalar() == 1  # NORMAL
+        assert connection.execute('PRAGMA cache_size').scalar() == -65536
+        assert connection.execute('PRAGMA mmap_size').scalar() == 268435456
+        assert connection.execute('PRAGMA temp_store').scalar() == 2  # MEMORY
+    with pytest.raises(ValueError):
+        create_database_engine('sqlite://', sqlite_profile='fastest')
+
+
+def test_read_only_connections_refuse_writes(tmp_path):
+    database_uri = f'sqlite:///{tmp_path / "movies.db"}'
+    writer = create_database_engine(database_uri, sqlite_profile='performance')
+    writer.execute('CREATE TABLE movies (id INTEGER)')
+    writer.execute('INSERT INTO movies VALUES (1)')
+
+    reader = create_database_engine(database_uri, sqlite_profile='performance', read_only=True)
+    assert reader.execute('SELECT COUNT(*) FROM movies').scalar() == 1
+    with pytest.raises(OperationalError):
+        reader.execute('INSERT INTO movies VALUES (2)')
+    assert writer.execute('SELECT COUNT(*) FROM movies').scalar() == 1
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from movie_web_app.adapters.movie_columns import MovieColumns
+from movie_web_app.domainmodel.model import Movie
+
+
+def make_movie(movie_id, year, rating, votes):
+    movie = Movie(f'Movie {movie_id}', year, movie_id)
+    movie.rating = rating
+    movie.votes = votes
+    return movie
+
+
+@pytest.fixture
+def columns():
+    columns = MovieColumns(capacity=2)
+    columns.add(make_movie(1, 2010, '7.5', '1000'))
+    columns.add(make_movie(2, 2012, '8.1', '50'))
+    columns.add(make_movie(3, 2014, None, None))
+    columns.add(make_movie(4, 2016, '7.5', '5000'))
+    return columns
+
+
+def test_columns_grow_and_hand_out_dense_ordinals(columns):
+    assert len(columns) == 4
+    assert [columns.ordinal(movie_id) for movie_id in (1, 2, 3, 4)] == [0, 1, 2, 3]
+    assert columns.ordinal(5) is None
+    assert columns.years.tolist() == [2010, 2012, 2014, 2016]
+    assert np.isnan(columns.ratings[2])
+
+
+def test_columns_views_are_read_only(columns):
+    with pytest.raises(ValueError):
+        columns.ratings[0] = 10
+
+
+def test_columns_sort_ids_by_rating_keeping_ties_in_order(columns):
+    assert columns.ids_by_rating().tolist() == [2, 1, 4, 3]
+    assert columns.ids_by_rating([3, 0, 1]).tolist() == [2, 4, 1]
+
+
+def test_columns_select_top_ids_breaking_ties_by_id(columns):
+    assert columns.top_ids([0, 1, 2, 3], 'rating', 2).tolist() == [2, 1]
+    assert columns.top_ids([3, 0, 1, 2], 'rating', 3).tolist() == [2, 1, 4]
+    assert columns.top_ids([0, 1, 2, 3], 'rating').tolist() == [2, 1, 4, 3]
+    assert columns.top_ids([0, 1, 2, 3], 'votes', 1).tolist() == [4]
+    assert columns.top_ids([0, 1], 'votes', 0).tolist() == []
+
+
+def test_columns_select_by_bounds(columns):
+    assert columns.select(first_year=2012).tolist() == [1, 2, 3]
+    assert columns.select(first_year=2011, last_year=2015).tolist() == [1, 2]
+    assert columns.select(min_votes=1000).tolist() == [0, 3]
+    assert columns.select(min_rating=8).tolist() == [1]
+
+
+def test_columns_average_rating_ignores_unrated_movies(columns):
+    assert columns.mean_rating([0, 1, 2]) == pytest.approx((7.5 + 8.1) / 2)
+    assert columns.mean_rating([2]) is None
+
+
+def test_columns_overwrite_a_movie_added_again(columns):
+    assert columns.add(make_movie(2, 2012, '9.0', '60')) == 1
+    assert len(columns) == 4
+    assert columns.ratings[1] == 9.0
+
+
+def test_columns_convert_ordinals_to_and_from_bits(columns):
+    assert columns.to_bits([0, 3]) == 0b1001
+    assert columns.all_bits() == 0b1111
+    assert columns.rating_bits(7.5) == 0b1011
+    assert columns.from_bits(0b0110).tolist() == [1, 2]
+    assert columns.from_bits(0).tolist() == []
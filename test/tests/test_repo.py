@@ -3,7 +3,8 @@ from typing import List
 
 import pytest
 
-from movie_web_app.adapters.repository import RepositoryException
+from movie_web_app.adapters.repository import LoadPlan, MovieFilter, MOVIE_ORDER_KEYS, RepositoryException, \
+    title_words
 from movie_web_app.domainmodel.model import User, Movie, Genre, Director, Actor, make_review, Review
 
 
@@ -14,6 +15,15 @@ def test_repository_can_add_a_user(in_memory_repo):
     assert in_memory_repo.get_user('jane') is user
 
 
+def test_repository_can_add_users_in_bulk(in_memory_repo):
+    users = [User('Dave', '123456789'), User('Martin', '123456789')]
+    in_memory_repo.add_users(users)
+
+    assert in_memory_repo.get_user('dave') is users[0]
+    assert in_memory_repo.get_user('martin') is users[1]
+    assert users[1] in in_memory_repo.users
+
+
 def test_repository_can_retrieve_a_user(in_memory_repo):
     user = in_memory_repo.get_user('fmercury')
     assert user == User('fmercury', '8734gfe2058v')
@@ -136,7 +146,7 @@ def test_repository_returns_an_empty_list_for_non_existent_ids(in_memory_repo):
 def test_repository_returns_movie_ids_for_existing_genre(in_memory_repo):
     article_ids = in_memory_repo.get_movie_ids_for_genre('War')
 
-    assert article_ids == [78, 231, 714, 511, 114, 241, 644, 763, 895, 821, 480, 187, 161]
+    assert list(article_ids) == [78, 231, 714, 511, 114, 241, 644, 763, 895, 821, 480, 187, 161]
 
 
 def test_repository_returns_an_empty_list_for_non_existent_genre(in_memory_repo):
@@ -226,3 +236,327 @@ def test_repository_can_add_or_remove_movie_to_or_from_watch_list(in_memory_repo
     in_memory_repo.remove_from_watch_list(user, movie)
     assert len(user.watch_list.watch_list) == 0
 
+
+def test_repository_searches_names_case_insensitively(in_memory_repo):
+    assert len(in_memory_repo.get_movies_for_actor('noomi rapace')) == 5
+    assert len(in_memory_repo.get_movies_for_director('ADAM WINGARD')) == 2
+    assert len(in_memory_repo.get_movies_for_genre('war')) == 13
+    assert in_memory_repo.get_movies_for_actor('nobody at all') == []
+
+
+def test_repository_indexes_names_of_added_entities(in_memory_repo):
+    actor = Actor('New Actor')
+    in_memory_repo.add_actor(actor)
+    movie = in_memory_repo.get_movie(2)
+    in_memory_repo.add_movie_to_actor_dict(movie, actor)
+
+    assert in_memory_repo.get_movies_for_actor('new actor') == [movie]
+
+
+def test_repository_can_retrieve_movies_by_exact_title(in_memory_repo):
+    movies = in_memory_repo.get_movies('prometheus')
+
+    assert len(movies) == 1
+    assert movies[0].id == 2
+
+
+def test_repository_can_retrieve_movies_by_title_words(in_memory_repo):
+    movies = in_memory_repo.get_movies_for_title_words('Galaxy guardians')
+    assert [movie.id for movie in movies] == [1]
+
+    movies = in_memory_repo.get_movies_for_title_words('the')
+    assert len(movies) > 1
+    assert all('the' in title_words(movie.title) for movie in movies)
+    assert movies == sorted(movies)
+
+
+def test_repository_returns_an_empty_list_for_unknown_title_words(in_memory_repo):
+    assert in_memory_repo.get_movies_for_title_words('Guardians Zzyzx') == []
+    assert in_memory_repo.get_movies_for_title_words('  ') == []
+
+
+def test_repository_indexes_title_of_added_movie(in_memory_repo):
+    movie = Movie("Whale Rider", 2002, 1001)
+    in_memory_repo.add_movie(movie)
+
+    assert in_memory_repo.get_movies('WHALE RIDER') == [movie]
+    assert in_memory_repo.get_movies_for_title_words('rider whale') == [movie]
+
+
+def test_repository_returns_movie_ids_for_year_by_descending_rating(in_memory_repo):
+    movie_ids = in_memory_repo.get_movie_ids_for_year(2006)
+    ratings = [float(in_memory_repo.get_movie(movie_id).rating) for movie_id in movie_ids]
+
+    assert len(movie_ids) == 44
+    assert movie_ids[0] == 65
+    assert ratings == sorted(ratings, reverse=True)
+    assert in_memory_repo.get_movie_ids_for_year(2023) == ()
+
+
+def test_repository_movie_ids_for_genre_are_not_changed_by_callers(in_memory_repo):
+    movie_ids = in_memory_repo.get_movie_ids_for_genre('War')
+
+    with pytest.raises(TypeError):
+        movie_ids[0] = 1
+    in_memory_repo.get_movies_by_genre(Genre('War')).reverse()
+
+    assert in_memory_repo.get_movie_ids_for_genre('War') == movie_ids
+
+
+def test_repository_ranks_movie_added_to_genre(in_memory_repo):
+    movie = Movie("Whale Rider", 2002, 1001)
+    movie.rating = '9.9'
+    in_memory_repo.add_movie(movie)
+    in_memory_repo.add_movie_to_genre_dict(movie, Genre('War'))
+    in_memory_repo.add_movie_to_year_dict(movie, 2002)
+
+    assert in_memory_repo.get_movie_ids_for_genre('War')[0] == 1001
+    assert len(in_memory_repo.get_movie_ids_for_genre('War')) == 14
+    assert in_memory_repo.get_movie_ids_for_year(2002) == (1001,)
+
+
+def test_repository_ranks_tied_movies_by_id_between_reads(in_memory_repo):
+    later, earlier = Movie("Tie", 2002, 1003), Movie("Tie", 2003, 1002)
+    for movie in (later, earlier):
+        movie.rating = '8.3'
+
+    in_memory_repo.add_movie(later)
+    in_memory_repo.add_movie_to_genre_dict(later, Genre('War'))
+    assert in_memory_repo.get_movie_ids_for_genre('War')[:3] == (78, 1003, 231)
+    in_memory_repo.add_movie(earlier)
+    in_memory_repo.add_movie_to_genre_dict(earlier, Genre('War'))
+    assert in_memory_repo.get_movie_ids_for_genre('War')[:4] == (78, 1002, 1003, 231)
+
+
+def test_repository_returns_sorted_year_list(in_memory_repo):
+    years = in_memory_repo.get_year_list()
+
+    assert years == sorted(in_memory_repo.year_dict.keys())
+    assert years[0] == 2006 and years[-1] == 2016
+
+
+def test_repository_tracks_year_of_added_movie(in_memory_repo):
+    movie = Movie("Whale Rider", 2002, 1001)
+    in_memory_repo.add_movie(movie)
+    in_memory_repo.add_movie_to_year_dict(movie, 2002)
+
+    assert in_memory_repo.get_year_list()[0] == 2002
+    assert in_memory_repo.get_year_of_previous_movie(movie) is None
+    assert in_memory_repo.get_year_of_next_movie(movie) == 2006
+    assert in_memory_repo.get_year_of_previous_movie(in_memory_repo.get_movie(65)) == 2002
+
+
+def test_repository_does_not_duplicate_entities_or_bucket_entries(in_memory_repo):
+    number_of_genres = len(in_memory_repo.get_genre_list())
+    movie = in_memory_repo.get_movie(78)
+
+    in_memory_repo.add_genre(Genre('War'))
+    in_memory_repo.add_movie_to_genre_dict(movie, Genre('War'))
+    in_memory_repo.add_movie_to_year_dict(movie, movie.year)
+
+    assert len(in_memory_repo.get_genre_list()) == number_of_genres
+    assert len(in_memory_repo.get_movies_by_genre(Genre('War'))) == 13
+    assert in_memory_repo.get_movies_by_year(movie.year).count(movie) == 1
+
+
+def test_repository_movies_share_actor_and_genre_objects(in_memory_repo):
+    movies = in_memory_repo.get_movies_by_actor(Actor("Noomi Rapace"))
+    actors = [next(actor for actor in movie.actors if actor.actor_full_name == "Noomi Rapace") for movie in movies]
+
+    assert all(actor is actors[0] for actor in actors)
+    assert len(actors[0].movies) == 5
+
+    war = in_memory_repo.get_movies_for_genre('War')
+    genres = [next(genre for genre in movie.genres if genre.genre_name == 'War') for movie in war]
+    assert all(genre is genres[0] for genre in genres)
+    assert genres[0].number_of_movies() == 13
+
+
+def test_repository_returns_movie_ids_by_rating_within_bounds(in_memory_repo):
+    movie_ids = in_memory_repo.get_movie_ids_by_rating(first_year=2010, last_year=2012, min_votes=100000)
+    movies = in_memory_repo.get_movies_by_id(movie_ids)
+
+    assert len(movies) > 0
+    assert all(2010 <= movie.year <= 2012 and int(movie.votes) >= 100000 for movie in movies)
+    ratings = [float(movie.rating) for movie in movies]
+    assert ratings == sorted(ratings, reverse=True)
+
+    all_ids = in_memory_repo.get_movie_ids_by_rating()
+    assert len(all_ids) == 1000
+    assert in_memory_repo.get_movie(all_ids[0]).title == 'The Dark Knight'
+    assert in_memory_repo.get_movie_ids_by_rating(min_rating=9.5) == []
+
+
+def test_repository_returns_average_rating_for_genre(in_memory_repo):
+    war = in_memory_repo.get_movies_for_genre('War')
+    expected = sum(float(movie.rating) for movie in war) / len(war)
+
+    assert in_memory_repo.get_average_rating_for_genre('War') == pytest.approx(expected)
+    assert in_memory_repo.get_average_rating_for_genre('United States') is None
+
+
+def test_repository_iterates_movies_independently(in_memory_repo):
+    first = in_memory_repo.iter_movies(batch_size=10)
+    second = in_memory_repo.iter_movies(batch_size=10)
+    assert next(first).id == 1
+    assert next(first).id == 2
+    assert next(second).id == 1
+    assert [movie.id for movie in first] == list(range(3, 1001))
+    assert [movie.id for movie in in_memory_repo] == list(range(1, 1001))
+
+
+def test_repository_iterates_movies_in_order(in_memory_repo):
+    by_year = [(movie.year, movie.id) for movie in in_memory_repo.iter_movies(batch_size=64, order_by='year')]
+    assert by_year == sorted(by_year) and len(by_year) == 1000
+
+    by_rating = list(in_memory_repo.iter_movies(order_by='rating'))
+    ratings = [float(movie.rating) for movie in by_rating]
+    assert ratings == sorted(ratings, reverse=True)
+
+    by_title = [movie.title for movie in in_memory_repo.iter_movies(batch_size=1000, order_by='title')]
+    assert by_title == sorted(by_title)
+
+    with pytest.raises(RepositoryException):
+        in_memory_repo.iter_movies(order_by='votes')
+
+
+def test_repository_iteration_sees_movies_added_after_the_cursor(in_memory_repo):
+    movies = in_memory_repo.iter_movies(batch_size=5)
+    assert next(movies).id == 1
+    in_memory_repo.add_movie(Movie('Whale Rider', 2002, 1001))
+    assert [movie.id for movie in movies][-2:] == [1000, 1001]
+
+
+def test_repository_intersects_facets(in_memory_repo):
+    movie_ids = in_memory_repo.get_movie_ids_for_facets(['Action', 'Sci-Fi'], 2010, 2016, 7)
+
+    expected = [movie for movie in in_memory_repo.iter_movies()
+                if {'Action', 'Sci-Fi'} <= {genre.genre_name for genre in movie.genres}
+                and 2010 <= movie.year <= 2016 and float(movie.rating) >= 7]
+    expected.sort(key=lambda movie: -float(movie.rating))
+    assert movie_ids == [movie.id for movie in expected]
+    assert len(movie_ids) > 0
+
+
+def test_repository_facets_are_optional(in_memory_repo):
+    assert len(in_memory_repo.get_movie_ids_for_facets()) == 1000
+    assert in_memory_repo.get_movie_ids_for_facets(['War']) == list(in_memory_repo.get_movie_ids_for_genre('War'))
+    assert in_memory_repo.get_movie_ids_for_facets(first_year=2016, last_year=2016) == \
+        list(in_memory_repo.get_movie_ids_for_year(2016))
+    assert in_memory_repo.get_movie_ids_for_facets(last_year=2005) == []
+    assert in_memory_repo.get_movie_ids_for_facets(['War', 'United States']) == []
+
+
+def test_repository_pages_movies_by_keyset(in_memory_repo):
+    movie_filter = MovieFilter(['Action'], 2010, 2016)
+    movie_ids = in_memory_repo.get_movie_ids_for_facets(['Action'], 2010, 2016)
+    assert in_memory_repo.count_movies(movie_filter) == len(movie_ids)
+    assert in_memory_repo.count_movies() == in_memory_repo.get_number_of_movies()
+
+    pages = [in_memory_repo.page_movies(movie_filter, limit=10)]
+    while len(pages[-1]) == 10:
+        pages.append(in_memory_repo.page_movies(movie_filter, after_key=MOVIE_ORDER_KEYS['rating'](pages[-1][-1])))
+    assert [movie.id for page in pages for movie in page] == movie_ids
+
+    before_key = MOVIE_ORDER_KEYS['rating'](pages[1][0])
+    assert in_memory_repo.page_movies(movie_filter, before_key=before_key, limit=10) == pages[0]
+    assert [movie.id for movie in in_memory_repo.page_movies(movie_filter, limit=3, from_end=True)] == movie_ids[-3:]
+    assert [movie.id for movie in in_memory_repo.page_movies(order_by='id', after_key=(5,), limit=2)] == [6, 7]
+    with pytest.raises(RepositoryException):
+        in_memory_repo.page_movies(order_by='votes')
+
+
+def test_repository_selects_top_k_movies(in_memory_repo):
+    movie_filter = MovieFilter(['Action'], 2010, 2016)
+    expected = sorted((movie for movie in in_memory_repo.iter_movies()
+                       if 'Action' in {genre.genre_name for genre in movie.genres} and 2010 <= movie.year <= 2016),
+                      key=lambda movie: (-int(movie.votes), movie.id))
+
+    assert in_memory_repo.top_k(movie_filter, 'votes', 5) == expected[:5]
+    assert in_memory_repo.top_k(movie_filter, 'votes', None) == expected
+    assert [movie.id for movie in in_memory_repo.top_k(k=20)] == in_memory_repo.get_movie_ids_by_rating()[:20]
+    assert in_memory_repo.top_k(MovieFilter(['War', 'United States'])) == []
+    with pytest.raises(RepositoryException):
+        in_memory_repo.top_k(key='title')
+
+
+def test_load_plan_rejects_unknown_paths_and_strategies(in_memory_repo):
+    plan = LoadPlan({'reviews': 'selectin', 'reviews.user': 'joined'})
+    assert in_memory_repo.get_movies_by_id([1, 2], plan) == in_memory_repo.get_movies_by_id([1, 2])
+
+    with pytest.raises(RepositoryException):
+        LoadPlan({'writers': 'selectin'})
+    with pytest.raises(RepositoryException):
+        LoadPlan({'genres': 'lazy'})
+    with pytest.raises(RepositoryException):
+        LoadPlan({'reviews.user': 'joined'})
+
+
+def test_repository_finds_similar_movies(in_memory_repo):
+    similar_ids = in_memory_repo.get_similar_movie_ids(1, 5)
+
+    assert len(similar_ids) == 5 and 1 not in similar_ids
+    # Star Trek Beyond shares Zoe Saldana and all three genres with Guardians of the Galaxy.
+    assert similar_ids[0] == 49
+    assert in_memory_repo.get_similar_movie_ids(1, 2) == similar_ids[:2]
+    assert in_memory_repo.get_similar_movie_ids(5000) == []
+
+    movie = Movie('Guardians of the Galaxy Vol. 3', 2023, 1001)
+    movie.actors = [actor for actor in in_memory_repo.get_movie(1).actors]
+    movie.genres = in_memory_repo.get_movie(1).genres
+    in_memory_repo.add_movie(movie)
+    assert in_memory_repo.get_similar_movie_ids(1, 5)[0] == 1001
+    assert in_memory_repo.get_similar_movie_ids(1001, 1) == [1]
+
+
+def test_repository_links_actors_who_worked_together(in_memory_repo):
+    assert in_memory_repo.actors_worked_together('Chris Pratt', 'Vin Diesel')
+    assert not in_memory_repo.actors_worked_together('Chris Pratt', 'Matt Damon')
+    pratt = in_memory_repo.get_movie(1).actors[0]
+    assert pratt.check_if_this_actor_worked_with(in_memory_repo.get_movie(1).actors[1])
+
+    path = in_memory_repo.get_actor_path('Chris Pratt', 'Matt Damon')
+    assert path[0] == 'Chris Pratt' and path[-1] == 'Matt Damon' and len(path) == 3
+    assert all(in_memory_repo.actors_worked_together(name, next_name) for name, next_name in zip(path, path[1:]))
+    assert in_memory_repo.get_actor_path('Chris Pratt', 'Nobody') is None
+
+
+def test_repository_links_the_cast_of_an_added_movie(in_memory_repo):
+    movie = Movie("Whale Rider", 2002, 1001)
+    movie.actors = ['Keisha Castle-Hughes', 'Rawiri Paratene']
+    in_memory_repo.add_movie(movie)
+    for actor in movie.actors:
+        in_memory_repo.add_movie_to_actor_dict(movie, actor)
+
+    assert in_memory_repo.actors_worked_together('Keisha Castle-Hughes', 'Rawiri Paratene')
+    assert movie.actors[0].check_if_this_actor_worked_with(movie.actors[1])
+    # Filing an actor who is not in the cast does not link them to it.
+    in_memory_repo.add_movie_to_actor_dict(movie, Actor('Cliff Curtis'))
+    assert not in_memory_repo.actors_worked_together('Cliff Curtis', 'Rawiri Paratene')
+
+
+def test_repository_searches_titles_and_descriptions(in_memory_repo):
+    movie_ids = in_memory_repo.search_movie_ids('intergalactic criminals')
+    assert movie_ids[0] == 1
+    assert in_memory_repo.search_movie_ids('galaxy guardians', limit=1) == [1]
+    assert in_memory_repo.search_movie_ids('xyzzy') == []
+
+    movie = Movie('Whale Rider', 2002, 1001)
+    movie.description = 'A girl of the Maori people dreams of leading her tribe.'
+    in_memory_repo.add_movie(movie)
+    assert in_memory_repo.search_movie_ids('maori tribe')[0] == 1001
+
+
+def test_repository_completes_names_by_votes(in_memory_repo):
+    completions = in_memory_repo.get_completions('chris p', kinds=['actor'])
+    assert [name for kind, name, votes in completions][:2] == ['Chris Pratt', 'Chris Pine']
+    assert completions[0][2] == sum(int(movie.votes) for movie in in_memory_repo.get_movies_for_actor('Chris Pratt'))
+
+    assert in_memory_repo.get_completions('galaxy', kinds=['title'])[0][1] == 'Guardians of the Galaxy'
+    assert in_memory_repo.get_completions('sci')[0][:2] == ('genre', 'Sci-Fi')
+    assert in_memory_repo.get_completions('xyzzy') == []
+
+    movie = Movie('Whale Rider', 2002, 1001)
+    movie.votes = '50000'
+    in_memory_repo.add_movie(movie)
+    assert in_memory_repo.get_completions('whale') == [('title', 'Whale Rider', 50000)]
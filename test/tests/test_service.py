@@ -220,3 +220,100 @@ def test_can_add_or_remove_movie_to_from_watch_listif_user_is_none(in_memory_rep
 
     with pytest.raises(UnknownUserException):
         movie_services.remove_from_watch_list(movie_id, username, in_memory_repo)
+
+
+def test_can_parse_year_ranges():
+    assert movie_services.parse_year_range('2010..2016') == (2010, 2016)
+    assert movie_services.parse_year_range('2012') == (2012, 2012)
+    assert movie_services.parse_year_range('2012..') == (2012, None)
+    assert movie_services.parse_year_range('..2012') == (None, 2012)
+    assert movie_services.parse_year_range(None) == (None, None)
+    with pytest.raises(ValueError):
+        movie_services.parse_year_range('recent')
+
+
+def test_can_get_movie_ids_for_facets(in_memory_repo):
+    movie_ids = movie_services.get_movie_ids_for_facets(['Action', 'Sci-Fi'], '2010..2016', '7', in_memory_repo)
+    movies = movie_services.get_movies_by_id(movie_ids, in_memory_repo)
+
+    assert 1 in movie_ids
+    for movie in movies:
+        assert 2010 <= movie['year'] <= 2016
+        assert {'Action', 'Sci-Fi'} <= {genre['name'] for genre in movie['genres']}
+
+
+def test_can_get_top_movies(in_memory_repo):
+    movies = movie_services.get_top_movies(['Action'], '2010..2016', None, 'rating', 3, in_memory_repo)
+    all_movies = movie_services.get_top_movies(['Action'], '2010..2016', None, 'rating', None, in_memory_repo)
+
+    assert movies == all_movies[:3]
+    assert [float(movie['rate']) for movie in all_movies] == sorted((float(movie['rate']) for movie in all_movies),
+                                                                    reverse=True)
+
+
+def test_can_page_through_movies(in_memory_repo):
+    movie_filter = movie_services.parse_facets(['Action'], None, None)
+    movie_ids = in_memory_repo.get_movie_ids_for_facets(['Action'])
+
+    page = movie_services.get_movie_page(movie_filter, None, None, None, 10, in_memory_repo)
+    assert page['count'] == len(movie_ids) and page['previous'] is None
+    pages = [page]
+    while pages[-1]['next'] is not None:
+        pages.append(movie_services.get_movie_page(movie_filter, pages[-1]['next'], None, None, 10, in_memory_repo))
+    assert [movie['id'] for page in pages for movie in page['movies']] == movie_ids
+
+    # Stepping back from the last page lands on the pages stepped forward to.
+    last = movie_services.get_movie_page(movie_filter, None, None, '1', 10, in_memory_repo)
+    assert last['movies'] == pages[-1]['movies'] and last['next'] is None
+    previous = movie_services.get_movie_page(movie_filter, None, last['previous'], None, 10, in_memory_repo)
+    assert previous['movies'] == pages[-2]['movies'] and previous['next'] == pages[-2]['next']
+
+    with pytest.raises(ValueError):
+        movie_services.get_movie_page(movie_filter, 'next', None, None, 10, in_memory_repo)
+
+
+def test_can_get_similar_movies(in_memory_repo):
+    movies = movie_services.get_similar_movies(1, 3, in_memory_repo)
+
+    assert [movie['id'] for movie in movies] == in_memory_repo.get_similar_movie_ids(1, 3)
+    assert movies[0]['title'] == 'Star Trek Beyond'
+
+
+def test_can_get_actor_path(in_memory_repo):
+    path = movie_services.get_actor_path('Chris Pratt', 'Matt Damon', in_memory_repo)
+
+    assert path['degrees'] == 2
+    assert len(path['movies']) == 2
+    for movie, names in zip(path['movies'], zip(path['actors'], path['actors'][1:])):
+        actors = {actor.actor_full_name for actor in in_memory_repo.get_movie(movie['id']).actors}
+        assert set(names) <= actors
+    assert movie_services.get_actor_path('Chris Pratt', 'Nobody', in_memory_repo) is None
+
+
+def test_search_ranks_description_matches_before_actor_and_genre_matches(in_memory_repo):
+    movies = movie_services.get_search_info('intergalactic', in_memory_repo)
+    assert movies[0]['id'] == 1
+
+    movies = movie_services.get_search_info('Chris Pratt', in_memory_repo)
+    assert 1 in [movie['id'] for movie in movies]
+
+    movies = movie_services.get_search_info('War', in_memory_repo)
+    ids = [movie['id'] for movie in movies]
+    assert len(ids) == len(set(ids))
+    assert set(in_memory_repo.get_movie_ids_for_genre('War')) <= set(ids)
+
+
+def test_search_ranks_title_matches_before_description_matches(in_memory_repo):
+    # 'Adoration' mentions a fall in its description and is the best description match.
+    assert movie_services.get_search_info('the fall', in_memory_repo)[0]['title'] == 'The Fall'
+    titles = [movie['title'] for movie in movie_services.get_search_info('fall', in_memory_repo)]
+    assert titles[0] == 'The Fall' and 'Adoration' in titles
+    titles = [movie['title'] for movie in movie_services.get_search_info('order', in_memory_repo)]
+    assert titles[0] == 'Harry Potter and the Order of the Phoenix'
+
+
+def test_can_get_completions(in_memory_repo):
+    completions = movie_services.get_completions('chris p', [], 2, in_memory_repo)
+
+    assert [completion['name'] for completion in completions] == ['Chris Pratt', 'Chris Pine']
+    assert completions[0]['kind'] == 'actor' and completions[0]['votes'] > 0
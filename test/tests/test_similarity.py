@@ -0,0 +1,39 @@
+import pytest
+
+from movie_web_app.adapters.similarity import SimilarityIndex
+
+
+@pytest.fixture
+def similarity():
+    similarity = SimilarityIndex(cached=2)
+    similarity.add(1, [('actor', 'Chris Pratt'), ('genre', 'Action'), ('genre', 'Sci-Fi')])
+    similarity.add(2, [('actor', 'Chris Pratt'), ('genre', 'Action')])
+    similarity.add(3, [('genre', 'Action'), ('genre', 'Sci-Fi')])
+    similarity.add(4, [('genre', 'Action')])
+    similarity.add(5, [('genre', 'Drama')])
+    return similarity
+
+
+def test_index_ranks_movies_by_shared_features(similarity):
+    # The actor is shared by 2 movies and Sci-Fi by 2, so each outweighs Action, which 4 movies share.
+    assert [key for key, score in similarity.similar(1, 5)] == [2, 3, 4]
+    assert [key for key, score in similarity.similar(4, 5)] == [1, 2, 3]
+    assert similarity.similar(5) == []
+    assert similarity.similar(6) == []
+
+
+def test_index_serves_short_lists_from_its_cache(similarity):
+    assert similarity.similar(1, 1) == similarity.similar(1, 5)[:1]
+    assert similarity.similar(1, 2) is not similarity.similar(1, 2)
+    assert 0 in similarity._neighbours
+
+
+def test_index_refreshes_neighbours_sharing_an_added_feature(similarity):
+    assert [key for key, score in similarity.similar(4, 2)] == [1, 2]
+    assert [key for key, score in similarity.similar(5, 2)] == []
+
+    similarity.add(6, [('genre', 'Drama'), ('director', 'James Gunn')])
+    similarity.add(4, [('director', 'James Gunn')])
+
+    assert [key for key, score in similarity.similar(4, 2)] == [6, 1]
+    assert [key for key, score in similarity.similar(5, 2)] == [6]
@@ -0,0 +1,88 @@
+import os
+import pickle
+import threading
+
+from movie_web_app.adapters import snapshot
+from movie_web_app.adapters.Movie_repo import MovieRepo
+
+
+def test_snapshot_is_written_on_first_start_and_loaded_on_the_next(memory_data_path, tmp_path, in_memory_repo):
+    snapshot_path = str(tmp_path / 'repo.snapshot')
+    cold_repo = snapshot.load_or_populate(memory_data_path, snapshot_path)
+    assert os.path.exists(snapshot_path)
+
+    warm_repo = snapshot.load_snapshot(snapshot_path, snapshot.source_checksum(memory_data_path))
+    assert isinstance(warm_repo, MovieRepo)
+    assert warm_repo is not cold_repo
+    assert warm_repo.get_number_of_movies() == in_memory_repo.get_number_of_movies()
+    assert warm_repo.get_year_list() == in_memory_repo.get_year_list()
+    assert list(warm_repo.get_movie_ids_for_genre('War')) == list(in_memory_repo.get_movie_ids_for_genre('War'))
+    assert warm_repo.get_user('thorke').user_name == 'thorke'
+
+    movie = warm_repo.get_movie(5)
+    assert movie == in_memory_repo.get_movie(5)
+    # Entities stay shared between movies after the round trip.
+    actor = movie.actors[0]
+    assert movie in warm_repo.get_movies_for_actor(actor.actor_full_name)
+    assert all(actor in other.actors for other in warm_repo.get_movies_for_actor(actor.actor_full_name))
+    assert warm_repo.registry.actor(actor.actor_full_name) is actor
+    # Sets of entities are rebuilt after the entities they hash.
+    assert all(actor.check_if_this_actor_worked_with(other) for other in movie.actors if other != actor)
+    assert warm_repo.get_actor_path('Chris Pratt', 'Matt Damon') == in_memory_repo.get_actor_path('Chris Pratt',
+                                                                                                   'Matt Damon')
+
+
+def test_concurrent_saves_publish_a_whole_snapshot(memory_data_path, tmp_path, in_memory_repo):
+    (tmp_path / 'snapshots').mkdir()
+    snapshot_path = str(tmp_path / 'snapshots' / 'repo.snapshot')
+    checksum = snapshot.source_checksum(memory_data_path)
+    writers = [threading.Thread(target=snapshot.save_snapshot, args=(in_memory_repo, snapshot_path, checksum))
+               for _ in range(4)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+
+    assert os.listdir(tmp_path / 'snapshots') == ['repo.snapshot']
+    assert snapshot.load_snapshot(snapshot_path, checksum).get_number_of_movies() == \
+        in_memory_repo.get_number_of_movies()
+
+
+def test_snapshot_is_rebuilt_when_the_csv_files_change(memory_data_path, tmp_path):
+    snapshot_path = str(tmp_path / 'repo.snapshot')
+    snapshot.load_or_populate(memory_data_path, snapshot_path)
+    stale_checksum = snapshot.source_checksum(memory_data_path)
+
+    with open(os.path.join(memory_data_path, 'comments.csv'), 'a', newline='') as comments_file:
+        comments_file.write('\n')
+    assert snapshot.load_snapshot(snapshot_path, snapshot.source_checksum(memory_data_path)) is None
+
+    repo = snapshot.load_or_populate(memory_data_path, snapshot_path)
+    assert repo.get_number_of_movies() == 1000
+    assert snapshot.load_snapshot(snapshot_path, stale_checksum) is None
+    assert snapshot.load_snapshot(snapshot_path, snapshot.source_checksum(memory_data_path)) is not None
+
+
+def test_missing_or_corrupt_snapshot_is_ignored(tmp_path):
+    snapshot_path = str(tmp_path / 'repo.snapshot')
+    assert snapshot.load_snapshot(snapshot_path, 'checksum') is None
+
+    with open(snapshot_path, 'wb') as snapshot_file:
+        snapshot_file.write(b'not a snapshot')
+    assert snapshot.load_snapshot(snapshot_path, 'checksum') is None
+
+
+def test_snapshot_of_garbage_bytes_falls_back_to_the_csv_files(memory_data_path, tmp_path):
+    snapshot_path = str(tmp_path / 'repo.snapshot')
+    checksum = snapshot.source_checksum(memory_data_path)
+    header = pickle.dumps({'version': snapshot.SNAPSHOT_VERSION, 'checksum': checksum})
+
+    # An unknown pickle protocol and a malformed INT opcode both raise ValueError from the unpickler.
+    for garbage in (b'\x80\x09garbage', header + b'\x80\x09garbage', header + b'I1x\n.'):
+        with open(snapshot_path, 'wb') as snapshot_file:
+            snapshot_file.write(garbage)
+        assert snapshot.load_snapshot(snapshot_path, checksum) is None
+
+    repo = snapshot.load_or_populate(memory_data_path, snapshot_path)
+    assert repo.get_number_of_movies() == 1000
+    assert snapshot.load_snapshot(snapshot_path, checksum) is not None
@@ -0,0 +1,38 @@
+import pytest
+
+from movie_web_app.adapters.text_index import BM25Index
+
+
+@pytest.fixture
+def text_index():
+    text_index = BM25Index()
+    text_index.add(1, 'Guardians of the Galaxy', 'A group of intergalactic criminals must pull together.')
+    text_index.add(2, 'Prometheus', 'Following clues to the origin of mankind, a team finds a structure.')
+    text_index.add(3, 'Split', 'Three girls are kidnapped by a man with a diagnosed 23 distinct personalities.')
+    text_index.add(4, 'The Lost City of Z', 'A true-life drama about a galaxy of explorers, and a lost city.')
+    return text_index
+
+
+def test_index_ranks_matching_documents_by_relevance(text_index):
+    ranked = text_index.search('galaxy')
+
+    # The title counts for more than the description.
+    assert [key for key, score in ranked] == [1, 4]
+    assert ranked[0][1] > ranked[1][1] > 0
+
+
+def test_index_favours_rare_words_and_ignores_unknown_ones(text_index):
+    assert [key for key, score in text_index.search('lost mankind')][:1] == [4]
+    assert text_index.search('submarine') == []
+    assert text_index.search('') == []
+    assert text_index.search('the a lost', limit=2) == text_index.search('the a lost')[:2]
+
+
+def test_index_replaces_and_removes_documents(text_index):
+    text_index.add(2, 'Prometheus', 'A galaxy far away.')
+    assert {key for key, score in text_index.search('galaxy')} == {1, 2, 4}
+    assert text_index.search('mankind') == []
+
+    text_index.remove(1)
+    assert len(text_index) == 3
+    assert {key for key, score in text_index.search('galaxy guardians')} == {2, 4}